@@ -0,0 +1,95 @@
+# ai_scheduler.py
+import time
+from constants import AI_BUDGET_MS, AI_NEAR_DISTANCE, AI_FAR_INTERVAL
+
+class AIScheduler:
+    """Decides which opponents re-plan on each frame, within a time budget
+
+    Opponents near the player re-plan every frame, distant ones every
+    `far_interval` frames on staggered frames. Plans that do not fit in the
+    budget are deferred to the next frame, most overdue first. Every opponent
+    acts on its last plan every frame, so movement never stalls.
+
+    With an AIWorker, the due opponents are planned on the worker instead and
+    their plans used on the next frame; late or stale plans are made on the
+    spot with the greedy planner.
+    """
+
+    def __init__(self, budget_ms=AI_BUDGET_MS, near_distance=AI_NEAR_DISTANCE, far_interval=AI_FAR_INTERVAL,
+                 worker=None):
+        self.budget_ms = budget_ms
+        self.worker = worker
+        self.near_distance = near_distance
+        self.far_interval = far_interval
+        self.frame = 0
+        self.last_planned = {}  # opponent -> frame of its last plan
+        # Statistics of the last frame, and a running average of the AI time
+        self.ai_ms = 0.0
+        self.average_ai_ms = 0.0
+        self.planned = 0
+        self.deferred = 0
+
+    def _due(self, player, opponents):
+        """Return the opponents that should re-plan this frame, most urgent first"""
+        px, py = player.get_tile_position()
+        due = []
+        for opponent in opponents:
+            last = self.last_planned.get(opponent)
+            if last is None:
+                due.append((float('inf'), 0, opponent))
+                continue
+            ox, oy = opponent.get_tile_position()
+            distance = abs(ox - px) + abs(oy - py)
+            interval = 1 if distance <= self.near_distance else self.far_interval
+            overdue = (self.frame - last) / interval
+            if overdue >= 1:
+                due.append((overdue, -distance, opponent))
+        due.sort(key=lambda entry: entry[:2], reverse=True)
+        return [opponent for _, _, opponent in due]
+
+    def update(self, opponents, player, tilemap):
+        """Re-plan the due opponents within the budget, then let every opponent act"""
+        start = time.perf_counter()
+        deadline = start + self.budget_ms / 1000
+        self.planned = self.deferred = 0
+        if self.worker is not None:
+            self._use_worker_plans(player, tilemap)
+        due = self._due(player, opponents)
+        if self.worker is not None:
+            due = self._submit_to_worker(due, player, tilemap)
+        for index, opponent in enumerate(due):
+            first_plan = opponent not in self.last_planned
+            if not first_plan and time.perf_counter() > deadline:
+                self.deferred = len(due) - index
+                break
+            opponent.plan(player, tilemap)
+            # Spread the first plans over the interval so far opponents re-plan on different frames
+            self.last_planned[opponent] = self.frame - (len(self.last_planned) % self.far_interval if first_plan else 0)
+            self.planned += 1
+
+        for opponent in opponents:
+            opponent.act(tilemap)
+
+        self.ai_ms = (time.perf_counter() - start) * 1000
+        self.average_ai_ms += (self.ai_ms - self.average_ai_ms) * 0.05
+        self.frame += 1
+
+    def _use_worker_plans(self, player, tilemap):
+        """Apply the worker's plans from the previous frame, planning late and stale ones now"""
+        for opponent, keys in self.worker.collect(player, tilemap):
+            if keys is None:
+                opponent.plan(player, tilemap)
+            else:
+                opponent.use_plan(keys)
+
+    def _submit_to_worker(self, due, player, tilemap):
+        """Hand the due opponents to the worker. Returns those that must be planned now"""
+        # Opponents without any plan yet cannot wait a frame
+        first = [opponent for opponent in due if opponent not in self.last_planned]
+        waiting = self.worker.waiting()
+        ready = [opponent for opponent in due if opponent in self.last_planned and opponent not in waiting]
+        if not self.worker.submit(ready, player, tilemap):
+            return first + ready
+        for opponent in ready:
+            self.last_planned[opponent] = self.frame
+        return first
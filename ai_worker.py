@@ -0,0 +1,198 @@
+# ai_worker.py
+import atexit
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
+import multiprocessing
+from multiprocessing import shared_memory
+from constants import GRID_WIDTH, GRID_HEIGHT
+from tile_grid import TileGrid
+from greedy_ai import decide_keys
+from opponent import Opponent
+
+WORKER_MODES = ("thread", "process")
+
+# Worker latencies kept for the statistics
+LATENCY_SAMPLES = 300
+
+# State of a planning process: its own TileGrid, kept in sync with the shared tile buffer
+_process_memory = None
+_process_tilemap = None
+_process_sync_id = None
+
+def _init_process(memory_name):
+    global _process_memory, _process_tilemap
+    _process_memory = shared_memory.SharedMemory(name=memory_name)
+    _process_tilemap = TileGrid(_process_memory.buf[:GRID_WIDTH * GRID_HEIGHT])
+
+def _plan_in_process(sync_id, requests):
+    """Plan (opponent tile, player tile) requests against the shared tile buffer"""
+    global _process_sync_id
+    tilemap = _process_tilemap
+    if sync_id != _process_sync_id:
+        # Apply only the differences, so the ladder index is updated instead of rebuilt
+        shared = _process_memory.buf
+        for index, code in enumerate(tilemap.tiles):
+            if shared[index] != code:
+                tilemap.set(index % GRID_WIDTH, index // GRID_WIDTH, chr(shared[index]))
+        _process_sync_id = sync_id
+    return [decide_keys(opponent_position, player_position, tilemap, Opponent)
+            for opponent_position, player_position in requests]
+
+def _plan_in_thread(tilemap, requests):
+    return [decide_keys(opponent_position, player_position, tilemap, Opponent)
+            for opponent_position, player_position in requests]
+
+class AIWorker:
+    """Plans opponents off the render thread, one batch per frame
+
+    The scheduler submits the opponents due for a plan together with their
+    tiles and the player's tile, and takes the results on the next frame. A
+    batch that is not finished by then (or within `patience` frames) is late, and a result whose tiles or
+    map version no longer match the game is stale; in both cases the
+    scheduler falls back to planning on the spot.
+
+    The worker never reads the live tilemap, which the game thread changes
+    meanwhile. In "thread" mode it plans on a TileGrid copy, in "process"
+    mode on a copy of the tile buffer in shared memory; either is refreshed
+    only when the map changed. A batch that fails counts as no plans.
+    """
+
+    def __init__(self, mode="thread", patience=1):
+        self.mode = mode
+        # Frames a batch may take before its plans count as late
+        self.patience = patience
+        self.memory = None
+        self.executor = self._create_executor()
+        self.synced = None   # (tilemap, version) last copied for the worker
+        self.grid = None     # the worker's TileGrid copy in "thread" mode
+        self.sync_id = 0
+        self.pending = None  # (future, opponents, requests, map version, submit frame count)
+        self.running = None  # future of the last batch, which may still run after being late
+
+        # Statistics
+        self.latencies = deque(maxlen=LATENCY_SAMPLES)  # seconds from submit to result
+        self.batches = 0
+        self.late = 0
+        self.results = 0
+        self.stale = 0
+        atexit.register(self.shutdown)
+
+    def _create_executor(self):
+        if self.mode == "process":
+            self.memory = shared_memory.SharedMemory(create=True, size=GRID_WIDTH * GRID_HEIGHT)
+            # Spawned rather than forked: the game process runs SDL and other threads
+            executor = ProcessPoolExecutor(max_workers=1, mp_context=multiprocessing.get_context("spawn"),
+                                           initializer=_init_process, initargs=(self.memory.name,))
+            # Start the process now instead of on the first (then certainly late) batch
+            executor.submit(int)
+            return executor
+        if self.mode == "thread":
+            return ThreadPoolExecutor(max_workers=1, thread_name_prefix="ai-worker")
+        raise ValueError(f"Unknown AI worker mode {self.mode!r}, expected one of {WORKER_MODES}")
+
+    def _start(self, opponents, player, tilemap, requests):
+        """Start planning a batch. Returns a future of the keys per request"""
+        if self.mode == "process":
+            if self.synced != (tilemap, tilemap.version):
+                self.memory.buf[:len(tilemap.tiles)] = tilemap.tiles
+                self.synced = (tilemap, tilemap.version)
+                self.sync_id += 1
+            return self.executor.submit(_plan_in_process, self.sync_id, requests)
+        if self.synced != (tilemap, tilemap.version):
+            # Build the ladder index here, so the copy shares it instead of building its own
+            tilemap.ladder_index()
+            self.grid = tilemap.copy()
+            self.synced = (tilemap, tilemap.version)
+        return self.executor.submit(_plan_in_thread, self.grid, requests)
+
+    def submit(self, opponents, player, tilemap):
+        """Start planning `opponents` for the next frame
+
+        Returns False without submitting while an earlier batch is still
+        running, so a slow worker never builds up a backlog.
+        """
+        if not opponents:
+            return True
+        if self.running is not None and not self.running.done():
+            return False
+        player_position = player.get_tile_position()
+        requests = [(opponent.get_tile_position(), player_position) for opponent in opponents]
+        future = self._start(opponents, player, tilemap, requests)
+
+        submitted = time.perf_counter()
+        future.add_done_callback(lambda _: self.latencies.append(time.perf_counter() - submitted))
+        self.pending = (future, opponents, requests, tilemap.version, 0)
+        self.running = future
+        self.batches += 1
+        return True
+
+    def reset(self):
+        """Forget the pending batch, e.g. when the worker moves on to a new game
+
+        Its plans were made for the old game's opponents. A batch that is
+        still running keeps the worker busy until it finishes.
+        """
+        self.pending = None
+
+    def waiting(self):
+        """Opponents whose plans are still being made"""
+        return set(self.pending[1]) if self.pending is not None else set()
+
+    def collect(self, player, tilemap):
+        """Take the plans of the pending batch once it is done
+
+        Returns (opponent, keys) pairs, where keys is None for plans that are
+        late or stale and have to be made on the spot. A batch is late once it
+        took more than `patience` frames.
+        """
+        if self.pending is None:
+            return []
+        future, opponents, requests, version, frames = self.pending
+        if not future.done():
+            if frames + 1 < self.patience:
+                # Still in time: the opponents keep acting on their previous plans
+                self.pending = (future, opponents, requests, version, frames + 1)
+                return []
+            # Nobody waits for it; the worker is free again once it finishes
+            self.pending = None
+            self.late += 1
+            return [(opponent, None) for opponent in opponents]
+        self.pending = None
+        try:
+            results = future.result()
+        except Exception:
+            # A failed batch has no plans; they are made on the spot
+            results = [None] * len(requests)
+
+        player_position = player.get_tile_position()
+        plans = []
+        for opponent, request, keys in zip(opponents, requests, results):
+            self.results += 1
+            if keys is None:
+                pass  # the planner gave up on this one
+            elif (tilemap.version != version or request[1] != player_position
+                    or request[0] != opponent.get_tile_position()):
+                self.stale += 1
+                keys = None
+            plans.append((opponent, keys))
+        return plans
+
+    def late_rate(self):
+        return self.late / self.batches if self.batches else 0.0
+
+    def stale_rate(self):
+        return self.stale / self.results if self.results else 0.0
+
+    def latency_ms(self):
+        """Average and worst latency over the recent batches, in milliseconds"""
+        if not self.latencies:
+            return 0.0, 0.0
+        return sum(self.latencies) * 1000 / len(self.latencies), max(self.latencies) * 1000
+
+    def shutdown(self):
+        self.executor.shutdown(wait=True, cancel_futures=True)
+        if self.memory is not None:
+            self.memory.close()
+            self.memory.unlink()
+            self.memory = None
@@ -26,6 +26,9 @@ TILE_COLORS = {
     DIAMOND: (255, 255, 0),  # Yellow for diamonds
 }
 
+# Character states (the index is used as a compact code when serializing)
+CHARACTER_STATES = ("idle", "running", "climbing", "falling", "")
+
 # Directions
 DIR_LEFT = -1
 DIR_RIGHT = 1
@@ -38,3 +41,14 @@ OPPONENT_COLOR = (180, 180, 255)
 MOVE_SPEED = 1
 GRAVITY = 0.33
 MOVE_INTERVAL = 150  # ms
+
+# Opponent AI scheduling (see ai_scheduler.py)
+AI_BUDGET_MS = 2.0        # time opponents may spend planning per frame
+AI_NEAR_DISTANCE = 12     # opponents within this many tiles of the player re-plan every frame
+AI_FAR_INTERVAL = 4       # the others re-plan every this many frames
+
+# Hard difficulty: Monte Carlo lookahead for opponents near the player (see lookahead_ai.py)
+LOOKAHEAD_RANGE = 16      # opponents farther away (in tiles) stay greedy
+LOOKAHEAD_ROLLOUTS = 100  # rollouts per decision and process, spread over the candidate moves and nearby opponents
+LOOKAHEAD_DEPTH = 48      # frames simulated per rollout (three tiles of running)
+LOOKAHEAD_PATIENCE = 8    # frames a decision may take before the greedy AI steps in
@@ -36,9 +36,31 @@ def draw_debug_overlay(screen, game, y_offset=0):
         pygame.draw.rect(screen, (255,0,0), (tx*TILE_SIZE, ty*TILE_SIZE + y_offset, TILE_SIZE, TILE_SIZE), 1)
         
         # Display both tile and pixel coordinates
-        opp_text = font.render(f"O{idx}: ({tx},{ty}) px=({int(px)},{int(py)})", True, (255,0,0))
+        opp_text = font.render(f"O{idx}: ({tx},{ty}) px=({int(px)},{int(py)}) "
+                               f"ai {opponent.decision_hits}h/{opponent.decision_misses}m", True, (255,0,0))
         screen.blit(opp_text, (int(px)+TILE_SIZE, int(py) + y_offset))
     
+    # AI decision cache totals
+    hits = sum(opponent.decision_hits for opponent in game.opponents)
+    misses = sum(opponent.decision_misses for opponent in game.opponents)
+    if hits + misses:
+        cache_text = font.render(f"AI cache: {hits} hits, {misses} misses ({100 * hits // (hits + misses)}%)",
+                                 True, (255,255,0))
+        screen.blit(cache_text, (5, 5 + y_offset))
+    
+    # AI time of the last frame and on average, with the plans the scheduler ran and put off
+    scheduler = game.ai_scheduler
+    ai_text = font.render(f"AI: {scheduler.ai_ms:.2f} ms (avg {scheduler.average_ai_ms:.2f}, budget {scheduler.budget_ms:g}) "
+                          f"planned {scheduler.planned}, deferred {scheduler.deferred}", True, (255,255,0))
+    screen.blit(ai_text, (5, 20 + y_offset))
+    worker = scheduler.worker
+    if worker is not None:
+        average, worst = worker.latency_ms()
+        worker_text = font.render(f"AI {worker.mode}: latency {average:.2f} ms (max {worst:.2f}), "
+                                  f"late {100 * worker.late_rate():.0f}%, stale {100 * worker.stale_rate():.0f}%",
+                                  True, (255,255,0))
+        screen.blit(worker_text, (5, 35 + y_offset))
+    
     # Draw grid points
     for x in range(GRID_WIDTH):
         for y in range(GRID_HEIGHT):
@@ -0,0 +1,309 @@
+# difficulty.py
+"""Estimate how hard each level is by letting bots play it many times
+
+Three bots play every level headless (see vec_env.py), spread over a
+process pool:
+    random   holds a random move for a random number of frames
+    greedy   heads for the nearest diamond, then the exit or the top row,
+             with the planner the opponents chase the player with
+    planner  follows the shortest path on the tile graph (see
+             reachability.py) to the nearest diamond, then out; it ignores
+             the opponents and does not dig
+The greedy and planner bots make a random move now and then, so no two runs
+are the same.
+
+Runs get TIMER_SLACK times the level's timer, so wins that come too late
+are seen too. A level's timer is reported as tight when many wins need the
+extra time or the slow wins come close to the limit. A run that collects
+no diamond for STALL_SECONDS of game time is stopped as stalled.
+
+Runs are played in rounds of RUNS_PER_TASK per level and bot, until the
+95% confidence interval of the win rate is within --margin either way or
+--runs runs were played. Levels a bot nearly always wins or loses settle
+after MIN_RUNS runs.
+
+The report lists, per level and bot, the win rate with its margin, the
+time-to-win distribution, how runs were lost and where players died most,
+and suggests an order from easiest to hardest.
+
+Usage:
+    python difficulty.py levels --runs 400 --margin 0.05 --json difficulty.json
+"""
+import argparse
+import glob
+import json
+import math
+import multiprocessing
+import os
+import random
+import time
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+from constants import *
+from greedy_ai import decide_keys
+from level_parser import load_level
+from reachability import distances_to, moves_from, tile_masks
+from sim import SimCharacter
+from vec_env import (VecEnv, ACTION_KEYS, STEP_SECONDS,
+                     ACTION_NONE, ACTION_LEFT, ACTION_RIGHT, ACTION_UP, ACTION_DOWN)
+
+BOTS = ("random", "greedy", "planner")
+
+TIMER_SLACK = 2.0      # runs may take this many times the level's timer
+STALL_SECONDS = 30     # a run without a diamond for this long is given up
+TIGHT_LATE_WINS = 0.2  # the timer is tight if this share of wins comes too late ...
+TIGHT_P90 = 0.9        # ... or the 90th percentile win takes this share of the timer
+RUNS_PER_TASK = 50
+MIN_RUNS = 100         # runs per level and bot before the margin is checked
+DEFAULT_RUNS = 400     # at most this many runs per level and bot
+DEFAULT_MARGIN = 0.05  # stop once the win rate is known this precisely (95% confidence)
+DEATH_SPOTS = 5        # most common death locations listed per bot
+
+# Random moves hold for this many frames; the other bots make one with this chance per frame
+HOLD_FRAMES = (TILE_SIZE // 2, TILE_SIZE * 2)
+GREEDY_NOISE = 0.02
+# Planner routes kept per process, keyed by tiles and targets
+ROUTE_CACHE_SIZE = 256
+
+_ACTION_FOR_KEYS = {frozenset(keys): action for action, keys in enumerate(ACTION_KEYS)}
+
+class RandomBot:
+    def __init__(self, snapshot, rng):
+        self.rng = rng
+        self.action = 0
+        self.hold = 0
+
+    def act(self, game):
+        if self.hold == 0:
+            self.action = self.rng.randrange(len(ACTION_KEYS))
+            self.hold = self.rng.randint(*HOLD_FRAMES)
+        self.hold -= 1
+        return self.action
+
+class GreedyBot(RandomBot):
+    def __init__(self, snapshot, rng):
+        super().__init__(snapshot, rng)
+        self.diamonds = snapshot.diamond_positions
+        self.exits = [(index % GRID_WIDTH, index // GRID_WIDTH)
+                      for index, code in enumerate(snapshot.tiles) if code == ord(EXIT)]
+
+    def _target(self, game, position):
+        x, y = position
+        tilemap = game.tilemap
+        targets = [diamond for diamond in self.diamonds if tilemap.get(*diamond) == DIAMOND]
+        if not targets:
+            targets = self.exits or [(x, 0)]
+        return min(targets, key=lambda target: abs(target[0] - x) + abs(target[1] - y))
+
+    def act(self, game):
+        if self.hold > 0 or self.rng.random() < GREEDY_NOISE:
+            return super().act(game)
+        position = game.player.get_tile_position()
+        pressed = decide_keys(position, self._target(game, position), game.tilemap, SimCharacter)
+        return _ACTION_FOR_KEYS.get(pressed, 0)
+
+_MOVE_ACTIONS = {"left": ACTION_LEFT, "right": ACTION_RIGHT, "up": ACTION_UP, "down": ACTION_DOWN,
+                 "fall": ACTION_NONE}
+_route_cache = {}
+
+def planner_route(tilemap, targets):
+    """Return {tile: action} leading every tile that can reach a target one move closer
+
+    Built once from a distance field and the move table (see reachability),
+    so a planner step is a single lookup.
+    """
+    field = distances_to(tilemap, targets)
+    masks = tile_masks(tilemap)
+    width = masks.width
+    route = {}
+    for (x, y), distance in field.items():
+        if distance == 0:
+            route[(x, y)] = ACTION_NONE
+            continue
+        for index, move in moves_from(masks, y * width + x):
+            if field.get((index % width, index // width), distance) < distance:
+                route[(x, y)] = _MOVE_ACTIONS[move]
+                break
+    return route
+
+class PlannerBot(GreedyBot):
+    def __init__(self, snapshot, rng):
+        super().__init__(snapshot, rng)
+        self.route_version = None
+        self.route = {}
+
+    def _targets(self, game):
+        tilemap = game.tilemap
+        targets = tuple(diamond for diamond in self.diamonds if tilemap.get(*diamond) == DIAMOND)
+        return targets or tuple(self.exits) or tuple((x, 0) for x in range(tilemap.width))
+
+    def _route(self, game):
+        """The route to the targets on the current map, shared by the runs in this process"""
+        tilemap = game.tilemap
+        if self.route_version != tilemap.version:
+            targets = self._targets(game)
+            key = (bytes(tilemap.tiles), targets)
+            if key not in _route_cache:
+                if len(_route_cache) >= ROUTE_CACHE_SIZE:
+                    _route_cache.clear()
+                _route_cache[key] = planner_route(tilemap, targets)
+            self.route = _route_cache[key]
+            self.route_version = tilemap.version
+        return self.route
+
+    def act(self, game):
+        if self.hold > 0 or self.rng.random() < GREEDY_NOISE:
+            return RandomBot.act(self, game)
+        action = self._route(game).get(game.player.get_tile_position())
+        if action is None:
+            return RandomBot.act(self, game)
+        return action
+
+_BOT_CLASSES = {"random": RandomBot, "greedy": GreedyBot, "planner": PlannerBot}
+
+def play(snapshot, bot_name, runs, seed):
+    """Play `runs` runs of one level with one bot. Returns (reason, seconds, tile) per run"""
+    rng = random.Random(seed)
+    env = VecEnv([snapshot._replace(timer_seconds=snapshot.timer_seconds * TIMER_SLACK)], 1)
+    env.reset()
+    stall_steps = int(STALL_SECONDS / STEP_SECONDS)
+    results = []
+    while len(results) < runs:
+        bot = _BOT_CLASSES[bot_name](snapshot, rng)
+        steps = last_pickup = 0
+        while True:
+            game = env.envs[0].game
+            _, rewards, dones, infos = env.step([bot.act(game)])
+            steps += 1
+            if rewards[0] > 0:
+                last_pickup = steps
+            if dones[0]:
+                info = infos[0]
+                results.append((info['reason'], steps * STEP_SECONDS, info['position']))
+                break
+            if steps - last_pickup >= stall_steps:
+                results.append(("stalled", steps * STEP_SECONDS, game.player.get_tile_position()))
+                env.reset()
+                break
+    return results
+
+def _percentile(values, fraction):
+    if not values:
+        return None
+    return round(sorted(values)[min(len(values) - 1, int(fraction * len(values)))], 1)
+
+def summarize(snapshot, results):
+    """Turn the runs of one bot into its part of the level report"""
+    timer = snapshot.timer_seconds
+    win_times = [seconds for reason, seconds, _ in results if reason == "won"]
+    in_time = [seconds for seconds in win_times if seconds <= timer]
+    deaths = Counter(tuple(tile) for reason, _, tile in results if reason in ("caught", "fell"))
+    p90 = _percentile(win_times, 0.9)
+    late_share = (len(win_times) - len(in_time)) / len(win_times) if win_times else 0.0
+    return {
+        'runs': len(results),
+        'win_rate': round(len(in_time) / len(results), 3),
+        'win_rate_margin': round(win_rate_margin(results), 3),
+        'late_win_rate': round((len(win_times) - len(in_time)) / len(results), 3),
+        'time_to_win': {'p10': _percentile(win_times, 0.1), 'p50': _percentile(win_times, 0.5), 'p90': p90},
+        'outcomes': dict(Counter(reason for reason, _, _ in results)),
+        'death_spots': [{'tile': list(tile), 'count': count} for tile, count in deaths.most_common(DEATH_SPOTS)],
+        'timer_tight': bool(win_times) and (late_share >= TIGHT_LATE_WINS or p90 >= TIGHT_P90 * timer),
+    }
+
+def win_rate_margin(results):
+    """Half width of the 95% confidence interval of the win rate (normal approximation)"""
+    wins = sum(1 for reason, _, _ in results if reason == "won")
+    rate = wins / len(results)
+    return 1.96 * math.sqrt(max(rate * (1 - rate), 0.25 / len(results)) / len(results))
+
+def estimate(level_files, runs=DEFAULT_RUNS, processes=None, seed=0, margin=DEFAULT_MARGIN):
+    """Play every level with every bot. Returns the report, easiest level first
+
+    Each level and bot gets MIN_RUNS runs (or `runs` if fewer), then more in
+    rounds of RUNS_PER_TASK until the win rate is within `margin` or `runs`
+    runs were played.
+    """
+    snapshots = {}
+    report = []
+    for filename in level_files:
+        snapshot = load_level(filename)
+        if snapshot.player_spawn is None:
+            report.append({'level': filename, 'error': "level has no player (P)"})
+        else:
+            snapshots[filename] = snapshot
+
+    results = {(filename, bot): [] for filename in snapshots for bot in BOTS}
+    # Runs still to play per level and bot in the current round
+    wanted = {key: min(MIN_RUNS, runs) for key in results}
+    # Spawned rather than forked, like the AI workers
+    with ProcessPoolExecutor(max_workers=processes, mp_context=multiprocessing.get_context("spawn")) as executor:
+        while wanted:
+            tasks = []
+            for (filename, bot), count in wanted.items():
+                for first in range(0, count, RUNS_PER_TASK):
+                    seed += 1
+                    task = executor.submit(play, snapshots[filename], bot, min(RUNS_PER_TASK, count - first), seed)
+                    tasks.append(((filename, bot), task))
+            for key, task in tasks:
+                results[key].extend(task.result())
+            wanted = {key: min(RUNS_PER_TASK, runs - len(played)) for key, played in results.items()
+                      if len(played) < runs and win_rate_margin(played) > margin}
+
+    levels = []
+    for filename, snapshot in snapshots.items():
+        bots = {bot: summarize(snapshot, results[filename, bot]) for bot in BOTS}
+        levels.append({
+            'level': filename,
+            'timer_seconds': snapshot.timer_seconds,
+            'diamonds': snapshot.diamond_count,
+            'opponents': len(snapshot.opponent_spawns),
+            'timer_tight': any(summary['timer_tight'] for summary in bots.values()),
+            'bots': bots,
+        })
+    # Easiest first: the best bot's chances decide, the random bot breaks ties
+    levels.sort(key=lambda level: (-max(summary['win_rate'] for summary in level['bots'].values()),
+                                   -level['bots']['random']['win_rate']))
+    return levels + report
+
+def print_report(report):
+    for level in report:
+        if 'error' in level:
+            print(f"{level['level']}: skipped, {level['error']}")
+            continue
+        tight = ", timer too tight" if level['timer_tight'] else ""
+        print(f"{level['level']} ({level['diamonds']} diamonds, {level['opponents']} opponents, "
+              f"{level['timer_seconds']} s{tight})")
+        for bot, summary in level['bots'].items():
+            times = summary['time_to_win']
+            spots = ", ".join(f"{tuple(spot['tile'])} x{spot['count']}" for spot in summary['death_spots'][:3])
+            print(f"  {bot:7s} win {summary['win_rate']:6.1%} ±{summary['win_rate_margin']:.1%}"
+                  f" (+{summary['late_win_rate']:.1%} late) in {summary['runs']} runs"
+                  f"  time to win p10/p50/p90 {times['p10']}/{times['p50']}/{times['p90']} s"
+                  f"  outcomes {summary['outcomes']}  deaths at {spots or '-'}")
+    ordered = [level['level'] for level in report if 'error' not in level]
+    print("Suggested order: " + " ".join(os.path.basename(name) for name in ordered))
+
+def main():
+    parser = argparse.ArgumentParser(description='Estimate the difficulty of Climb Up levels with bot playthroughs')
+    parser.add_argument('level_dir', nargs='?', default='levels')
+    parser.add_argument('--runs', type=int, default=DEFAULT_RUNS, help='At most this many runs per level and bot')
+    parser.add_argument('--margin', type=float, default=DEFAULT_MARGIN,
+                        help='Stop once the win rate is known to within this (95%% confidence)')
+    parser.add_argument('--processes', type=int, default=None, help='Worker processes (default: one per CPU)')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--json', default=None, help='Also write the report to this JSON file')
+    args = parser.parse_args()
+
+    started = time.perf_counter()
+    report = estimate(sorted(glob.glob(os.path.join(args.level_dir, '*.lvl'))), args.runs, args.processes, args.seed,
+                      args.margin)
+    print_report(report)
+    played = sum(summary['runs'] for level in report if 'bots' in level for summary in level['bots'].values())
+    print(f"Played {played} runs in {time.perf_counter() - started:.0f} s")
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump(report, f, indent=2)
+
+if __name__ == "__main__":
+    main()
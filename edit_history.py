@@ -0,0 +1,115 @@
+# edit_history.py
+"""Undo and redo for the level editor
+
+Every editor action (a brush stroke from press to release, a rectangle,
+a flood fill, a paste) becomes one entry holding only what it changed: the
+tiles as flat indices with their old and new codes, and the entities as the
+player's position before and after plus the opponents removed and added.
+Undoing or redoing an entry touches just those tiles.
+
+The history is bounded: at most UNDO_STEPS entries and UNDO_TILES changed
+tiles are kept, the oldest entries going first.
+"""
+from array import array
+from collections import deque, namedtuple
+
+UNDO_STEPS = 200
+UNDO_TILES = 250000  # about 6 bytes each
+
+# `player_before`/`player_after` are tile positions or None; the opponent
+# fields are tuples of the tile positions removed and added by the action
+Edit = namedtuple('Edit', ['indices', 'old', 'new', 'player_before', 'player_after',
+                           'opponents_removed', 'opponents_added'])
+
+class EditHistory:
+    """Undo/redo stacks for the edits of one tilemap"""
+
+    def __init__(self, tilemap, steps=UNDO_STEPS, tiles=UNDO_TILES):
+        self.tilemap = tilemap
+        self.steps = steps
+        self.tiles = tiles
+        self.undo_stack = deque()
+        self.redo_stack = []
+        self.size = 0  # tiles held by undo_stack
+        self.changes = None  # TileChanges of the open action
+        self.entities = None  # entity positions when the action began
+        self.applying = False
+        tilemap.subscribe_batches(self._on_changes)
+
+    def _on_changes(self, changes):
+        if self.applying:
+            return
+        if self.changes is not None:
+            self.changes.extend(changes)
+        else:
+            # A change made outside any action is an action of its own
+            self._push(changes, None, None)
+
+    def begin(self, entities):
+        """Start an action; `entities` is (player position or None, opponent positions)"""
+        if self.changes is None:
+            self.changes = []
+            self.entities = entities
+
+    def end(self, entities):
+        """Finish the open action and record it, if it changed anything"""
+        if self.changes is None:
+            return
+        changes, before = self.changes, self.entities
+        self.changes = self.entities = None
+        self._push(changes, before, entities)
+
+    def _push(self, changes, before, after):
+        player_before = player_after = None
+        removed = added = ()
+        if before is not None and before != after:
+            player_before, player_after = before[0], after[0]
+            removed = tuple(set(before[1]) - set(after[1]))
+            added = tuple(set(after[1]) - set(before[1]))
+        if not changes and player_before == player_after and not removed and not added:
+            return
+        width = self.tilemap.width
+        edit = Edit(array('I', [change.y * width + change.x for change in changes]),
+                    ''.join(change.old for change in changes).encode('latin-1'),
+                    ''.join(change.new for change in changes).encode('latin-1'),
+                    player_before, player_after, removed, added)
+        self.undo_stack.append(edit)
+        self.size += len(changes)
+        self.redo_stack.clear()
+        while len(self.undo_stack) > 1 and (len(self.undo_stack) > self.steps or self.size > self.tiles):
+            self.size -= len(self.undo_stack.popleft().indices)
+
+    def _apply(self, indices, codes):
+        tilemap = self.tilemap
+        width = tilemap.width
+        self.applying = True
+        try:
+            with tilemap.batch():
+                for index, code in zip(indices, codes):
+                    tilemap.set(index % width, index // width, chr(code))
+        finally:
+            self.applying = False
+
+    def undo(self):
+        """Restore the tiles of the last action. Returns its Edit for the caller to restore the entities, or None"""
+        if not self.undo_stack:
+            return None
+        edit = self.undo_stack.pop()
+        self.size -= len(edit.indices)
+        # Backwards, so a tile changed twice ends up as it was first
+        self._apply(reversed(edit.indices), reversed(edit.old))
+        self.redo_stack.append(edit)
+        return edit
+
+    def redo(self):
+        """Make the last undone action again. Returns its Edit, or None"""
+        if not self.redo_stack:
+            return None
+        edit = self.redo_stack.pop()
+        self._apply(edit.indices, edit.new)
+        self.undo_stack.append(edit)
+        self.size += len(edit.indices)
+        return edit
+
+    def close(self):
+        self.tilemap.unsubscribe_batches(self._on_changes)
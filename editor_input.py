@@ -0,0 +1,301 @@
+# editor_input.py
+"""Mouse and keyboard editing for the level editor
+
+EditorInput turns the editor's mouse and key events into edits of the level
+being edited: brush strokes, the rectangle, flood fill and copy tools,
+paste and mirror, and undo/redo through the editor's EditHistory. The
+editor keeps the screen, the palette and the files; it hands the events on
+the grid to this class and draws its drag outline.
+"""
+import pygame
+from constants import *
+from player import Player
+from opponent import Opponent
+from editor_tools import line_tiles, rect_spans, flood_spans, span_positions, copy_region, mirror_region
+
+DRAG_COLOR = (255, 255, 0)  # the editor's highlight yellow
+
+# Bulk tools and the keys that switch to them; the same key switches back to the brush
+TOOL_KEYS = {
+    pygame.K_r: 'rectangle',
+    pygame.K_f: 'flood fill',
+    pygame.K_c: 'copy',
+}
+
+class EditorInput:
+    """Tool state and tile editing of a LevelEditor
+
+    Works on the editor's current game_state and history, which change when
+    a level is loaded, and sets the editor's modified flag on every change.
+    """
+
+    def __init__(self, editor):
+        self.editor = editor
+        self.is_drawing = False
+        self.is_erasing = False
+        # Tiles the mouse moved over since the last frame, painted together by flush_stroke()
+        self.stroke_points = []
+        self.stroke_end = None  # last tile of the stroke painted so far
+        self.tool = 'brush'
+        # Rectangle and copy tools: the tile where the drag started, the button and where it is now
+        self.drag_start = None
+        self.drag_button = None
+        self.drag_end = None
+        self.clipboard = None  # the Region the copy tool took, pasted with V
+
+    def active(self):
+        """Whether a stroke or a drag is under way, so the screen follows the mouse"""
+        return self.is_drawing or self.is_erasing or self.drag_start is not None
+
+    def stop(self):
+        """Forget the stroke in progress, when a dialog took the mouse release"""
+        self.is_drawing = False
+        self.is_erasing = False
+
+    def mouse_down(self, event):
+        """Start a stroke, a drag or a flood fill on the grid"""
+        grid_pos = self.editor.get_tile_at_position(event.pos)
+        if grid_pos and event.button in (1, 3):
+            self.begin_action()
+        if self.tool in ('rectangle', 'copy'):
+            if grid_pos and event.button in (1, 3):
+                self.drag_start = self.drag_end = grid_pos
+                self.drag_button = event.button
+        elif self.tool == 'flood fill':
+            if event.button == 1:
+                self.flood_fill(grid_pos, self.editor.selected_tile())
+            elif event.button == 3:
+                self.flood_fill(grid_pos, AIR)
+        elif event.button == 1:  # Left click
+            self.is_drawing = True
+            self.stroke_end = grid_pos
+            self.place_tile(grid_pos, self.editor.selected_tile())
+        elif event.button == 3:  # Right click
+            self.is_erasing = True
+            self.stroke_end = grid_pos
+            self.place_tile(grid_pos, AIR)
+
+    def mouse_up(self, event):
+        # Paint the rest of the stroke before it ends
+        self.flush_stroke()
+        if event.button == self.drag_button:
+            self.finish_drag()
+        self.end_action()
+        if event.button == 1:
+            self.is_drawing = False
+        elif event.button == 3:
+            self.is_erasing = False
+
+    def mouse_motion(self, event):
+        # Continue drawing/erasing if mouse button is held (painted after the event loop)
+        if self.is_drawing or self.is_erasing:
+            self.stroke_points.append(self.editor.get_tile_at_position(event.pos))
+        elif self.drag_start is not None:
+            # Off the grid the rectangle keeps its last corner
+            self.drag_end = self.editor.get_tile_at_position(event.pos) or self.drag_end
+
+    def key_down(self, event):
+        """Handle the tool, undo, paste and mirror keys. Returns False for any other key"""
+        if event.key in TOOL_KEYS:
+            tool = TOOL_KEYS[event.key]
+            self.tool = 'brush' if self.tool == tool else tool
+            self.drag_start = self.drag_end = self.drag_button = None
+        elif event.key == pygame.K_z and event.mod & pygame.KMOD_CTRL:
+            if event.mod & pygame.KMOD_SHIFT:
+                self.redo()
+            else:
+                self.undo()
+        elif event.key == pygame.K_y and event.mod & pygame.KMOD_CTRL:
+            self.redo()
+        elif event.key == pygame.K_v:
+            self.end_action()
+            self.begin_action()
+            self.paste(self.editor.get_tile_at_position(pygame.mouse.get_pos()))
+            self.end_action()
+        elif event.key == pygame.K_m:
+            if self.clipboard:
+                # M mirrors left-right, Shift+M top-bottom
+                self.clipboard = mirror_region(self.clipboard, not event.mod & pygame.KMOD_SHIFT)
+        else:
+            return False
+        return True
+
+    def place_tile(self, grid_pos, tile):
+        """Place a tile at the specified grid position"""
+        if grid_pos:
+            self.paint_tiles([grid_pos], tile)
+
+    def paint_tiles(self, positions, tile):
+        """Place a tile at each of the grid positions, as one edit of the tilemap"""
+        positions = list(dict.fromkeys(positions))  # each tile once, in stroke order
+        if not positions:
+            return
+        game_state = self.editor.game_state
+
+        # First check if we're placing AIR and there are entities to remove
+        if tile == AIR:
+            self.clear_entities(set(positions))
+
+        # Handle special tiles (player, opponent) separately
+        if tile == PLAYER:
+            # Create or move the player; in a stroke it ends up on the last tile
+            x, y = positions[-1]
+            if game_state.player:
+                game_state.player.rect.x = x * TILE_SIZE
+                game_state.player.rect.y = y * TILE_SIZE
+            else:
+                game_state.player = Player(x, y)
+                game_state.all_sprites.add(game_state.player)
+            self.editor.modified = True
+            return
+
+        elif tile == OPPONENT:
+            # Create a new opponent on every tile that has none yet
+            occupied = {opponent.get_tile_position() for opponent in game_state.opponents}
+            for x, y in positions:
+                if (x, y) not in occupied:
+                    new_opponent = Opponent(x, y)
+                    game_state.opponents.append(new_opponent)
+                    game_state.opponents_group.add(new_opponent)
+                    game_state.all_sprites.add(new_opponent)
+                    self.editor.modified = True
+            return
+
+        # For regular tiles, update the tilemap
+        tilemap = game_state.tilemap
+        with tilemap.batch():
+            for x, y in positions:
+                if tilemap.get(x, y) != tile:
+                    tilemap.set(x, y, tile)
+                    self.editor.modified = True
+
+    def clear_entities(self, positions, player=True):
+        """Remove the opponents, and the player unless player=False, standing on any of the positions"""
+        game_state = self.editor.game_state
+        if player and game_state.player and game_state.player.get_tile_position() in positions:
+            game_state.player = None
+            self.editor.modified = True
+        for opponent in [opponent for opponent in game_state.opponents
+                         if opponent.get_tile_position() in positions]:
+            opponent.kill()  # Remove from sprite groups
+            game_state.opponents.remove(opponent)
+            self.editor.modified = True
+
+    def fill_spans(self, spans, tile):
+        """Fill row spans (see editor_tools) with a tile, as one edit of the tilemap"""
+        if tile in (PLAYER, OPPONENT):
+            self.paint_tiles(span_positions(spans), tile)
+            return
+        if tile == AIR:
+            self.clear_entities(set(span_positions(spans)))
+        tilemap = self.editor.game_state.tilemap
+        version = tilemap.version
+        code = tile.encode()
+        with tilemap.batch():
+            for y, left, right in spans:
+                tilemap.write(left, y, code * (right - left))
+        if tilemap.version != version:
+            self.editor.modified = True
+
+    def flood_fill(self, grid_pos, tile):
+        """Fill the area of equal tiles around grid_pos"""
+        if grid_pos:
+            tilemap = self.editor.game_state.tilemap
+            self.fill_spans(flood_spans(tilemap.tiles, tilemap.width, tilemap.height, grid_pos), tile)
+
+    def finish_drag(self):
+        """Fill or copy the rectangle the rectangle or copy tool was dragged over"""
+        start, end, button = self.drag_start, self.drag_end, self.drag_button
+        self.drag_start = self.drag_end = self.drag_button = None
+        if start is None or end is None:
+            return
+        if self.tool == 'rectangle':
+            tile = self.editor.selected_tile() if button == 1 else AIR
+            self.fill_spans(rect_spans(start, end), tile)
+        elif self.tool == 'copy':
+            game_state = self.editor.game_state
+            self.clipboard = copy_region(game_state.tilemap, game_state.opponents, start, end)
+
+    def paste(self, grid_pos):
+        """Paste the clipboard with its top-left corner at grid_pos, as one edit; the player stays"""
+        region = self.clipboard
+        if not region or not grid_pos:
+            return
+        left, top = grid_pos
+        tilemap = self.editor.game_state.tilemap
+        version = tilemap.version
+        with tilemap.batch():
+            for dy, row in enumerate(region.rows):
+                tilemap.write(left, top + dy, row)
+        if tilemap.version != version:
+            self.editor.modified = True
+        # The pasted opponents replace those in the pasted area
+        inside = span_positions(rect_spans((left, top), (left + region.width - 1, top + region.height - 1)))
+        self.clear_entities(set(inside), player=False)
+        pasted = [(left + x, top + y) for x, y in region.opponents
+                  if 0 <= left + x < GRID_WIDTH and 0 <= top + y < GRID_HEIGHT]
+        self.paint_tiles(pasted, OPPONENT)
+
+    def entity_positions(self):
+        """The player's tile (or None) and the opponents' tiles, as the undo history records them"""
+        game_state = self.editor.game_state
+        player = game_state.player
+        return (player.get_tile_position() if player else None,
+                tuple(opponent.get_tile_position() for opponent in game_state.opponents))
+
+    def begin_action(self):
+        """Start an action that undo takes back as a whole"""
+        self.editor.history.begin(self.entity_positions())
+
+    def end_action(self):
+        self.editor.history.end(self.entity_positions())
+
+    def undo(self):
+        self.end_action()
+        edit = self.editor.history.undo()
+        if edit:
+            self.restore_entities(edit.player_after, edit.player_before, edit.opponents_added, edit.opponents_removed)
+
+    def redo(self):
+        self.end_action()
+        edit = self.editor.history.redo()
+        if edit:
+            self.restore_entities(edit.player_before, edit.player_after, edit.opponents_removed, edit.opponents_added)
+
+    def restore_entities(self, player_from, player_to, opponents_gone, opponents_back):
+        """Move the entities back or forward by an undo entry; the tiles are done already"""
+        self.clear_entities(set(opponents_gone), player=False)
+        self.paint_tiles(opponents_back, OPPONENT)
+        if player_from != player_to:
+            if player_to is None:
+                self.editor.game_state.player = None
+            else:
+                self.paint_tiles([player_to], PLAYER)
+        self.editor.modified = True
+
+    def draw(self, screen):
+        """Outline the rectangle being dragged with the rectangle or copy tool"""
+        if self.drag_start is None or self.drag_end is None:
+            return
+        (x1, y1), (x2, y2) = self.drag_start, self.drag_end
+        rect = pygame.Rect(min(x1, x2) * TILE_SIZE, min(y1, y2) * TILE_SIZE,
+                           (abs(x2 - x1) + 1) * TILE_SIZE, (abs(y2 - y1) + 1) * TILE_SIZE)
+        pygame.draw.rect(screen, DRAG_COLOR, rect, 2)
+
+    def flush_stroke(self):
+        """Paint the tiles the mouse moved over since the last frame
+
+        Mouse motion events are collected per frame and joined into lines,
+        so fast drags leave no gaps and the whole frame is a single edit.
+        """
+        points, self.stroke_points = self.stroke_points, []
+        if not points or not (self.is_drawing or self.is_erasing):
+            return
+        positions = []
+        for point in points:
+            if point is not None:
+                positions += line_tiles(self.stroke_end, point) if self.stroke_end else [point]
+            # Leaving the grid ends the line; it starts again where the mouse comes back
+            self.stroke_end = point
+        tile = self.editor.selected_tile() if self.is_drawing else AIR
+        self.paint_tiles(positions, tile)
@@ -0,0 +1,104 @@
+# editor_tools.py
+"""Tile geometry for the level editor's painting and bulk tools"""
+from collections import namedtuple
+
+def line_tiles(start, end):
+    """Return the tiles on the line from `start` to `end`, both included, as Bresenham's algorithm picks them"""
+    x, y = start
+    end_x, end_y = end
+    dx = abs(end_x - x)
+    dy = -abs(end_y - y)
+    step_x = 1 if x < end_x else -1
+    step_y = 1 if y < end_y else -1
+    error = dx + dy
+    tiles = [(x, y)]
+    while (x, y) != (end_x, end_y):
+        doubled = 2 * error
+        if doubled >= dy:
+            error += dy
+            x += step_x
+        if doubled <= dx:
+            error += dx
+            y += step_y
+        tiles.append((x, y))
+    return tiles
+
+# Bulk tools work on spans: (y, first x, x past the end) runs of tiles in one row
+
+def rect_spans(corner, other_corner):
+    """Return the spans covering the rectangle between two corner tiles, both included"""
+    (x1, y1), (x2, y2) = corner, other_corner
+    left, right = min(x1, x2), max(x1, x2) + 1
+    return [(y, left, right) for y in range(min(y1, y2), max(y1, y2) + 1)]
+
+def flood_spans(tiles, width, height, start):
+    """Return the spans of the 4-connected area of equal tiles around `start`
+
+    `tiles` is a tile buffer (one byte per cell, rows of `width`). This is a
+    scanline fill: each row run is found with a byte search on a mask of the
+    area's tile code, so the Python work grows with the number of runs,
+    not the number of tiles.
+    """
+    x, y = start
+    if not (0 <= x < width and 0 <= y < height):
+        return []
+    code = tiles[y * width + x]
+    table = bytearray(256)
+    table[code] = 1
+    mask = bytearray(bytes(tiles).translate(table))  # 1 = still to fill
+    spans = []
+    seeds = [(x, y)]
+    while seeds:
+        x, y = seeds.pop()
+        row = y * width
+        if not mask[row + x]:
+            continue
+        left = max(mask.rfind(0, row, row + x) + 1, row)
+        right = mask.find(0, row + x, row + width)
+        if right < 0:
+            right = row + width
+        mask[left:right] = bytes(right - left)
+        spans.append((y, left - row, right - row))
+        # Seed every run still to fill right above and below the span
+        for neighbour in (y - 1, y + 1):
+            if 0 <= neighbour < height:
+                offset = neighbour * width - row
+                position = left + offset
+                end = right + offset
+                while True:
+                    position = mask.find(1, position, end)
+                    if position < 0:
+                        break
+                    seeds.append((position - neighbour * width, neighbour))
+                    position = mask.find(0, position, end)
+                    if position < 0:
+                        break
+    return spans
+
+def span_positions(spans):
+    return [(x, y) for y, left, right in spans for x in range(left, right)]
+
+# A copied part of the level: `rows` holds `height` byte strings of tile
+# codes, `opponents` the opponent tiles relative to the top-left corner
+Region = namedtuple('Region', ['width', 'height', 'rows', 'opponents'])
+
+def copy_region(tilemap, opponents, corner, other_corner):
+    """Copy the tiles and opponents of a rectangle into a Region"""
+    spans = rect_spans(corner, other_corner)
+    top = spans[0][0]
+    left, right = spans[0][1], spans[0][2]
+    rows = [bytes(tilemap.tiles[y * tilemap.width + left:y * tilemap.width + right]) for y, _, _ in spans]
+    inside = []
+    for opponent in opponents:
+        x, y = opponent.get_tile_position()
+        if left <= x < right and top <= y < top + len(spans):
+            inside.append((x - left, y - top))
+    return Region(right - left, len(spans), rows, tuple(inside))
+
+def mirror_region(region, horizontal=True):
+    """Return the region flipped left-right, or top-bottom with horizontal=False"""
+    if horizontal:
+        return region._replace(rows=[row[::-1] for row in region.rows],
+                               opponents=tuple((region.width - 1 - x, y) for x, y in region.opponents))
+    return region._replace(rows=region.rows[::-1],
+                           opponents=tuple((x, region.height - 1 - y) for x, y in region.opponents))
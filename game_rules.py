@@ -0,0 +1,51 @@
+# game_rules.py
+from abc import ABC, abstractmethod
+from constants import DIAMOND, AIR, EXIT
+
+class GameRules(ABC):
+    """Win, loss and pickup rules, shared by Game and the pygame-free SimGame
+
+    Classes using it provide player, opponents, tilemap, diamonds_remaining,
+    diamonds_collected and time_remaining, and say how a catch is detected.
+    """
+
+    @abstractmethod
+    def _player_caught(self):
+        """True if an opponent touches the player"""
+
+    def check_game_over(self):
+        return self.game_over_reason() is not None
+
+    def game_over_reason(self):
+        """Return why the game is lost ("caught", "timeout" or "fell"), or None while it goes on"""
+        # Check if player collided with an opponent
+        if self._player_caught():
+            return "caught"
+        
+        # Check if time ran out
+        if self.time_remaining <= 0:
+            return "timeout"
+        
+        # Check if player fell to the bottom of the level
+        player_x, player_y = self.player.get_tile_position()
+        if player_y >= self.tilemap.height - 1:
+            return "fell"
+            
+        return None
+
+    def check_win_condition(self):
+        # Can only win if all diamonds are collected
+        if self.diamonds_remaining > 0:
+            return False
+        
+        # Win condition: All diamonds collected and player reached the top row
+        player_x, player_y = self.player.get_tile_position()
+        return player_y == 0 or self.tilemap.get(player_x, player_y) == EXIT
+
+    def check_diamond_collection(self):
+        # Check if player is on a diamond
+        player_x, player_y = self.player.get_tile_position()
+        if self.tilemap.get(player_x, player_y) == DIAMOND:
+            self.tilemap.set(player_x, player_y, AIR)
+            self.diamonds_remaining -= 1
+            self.diamonds_collected += 1
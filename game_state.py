@@ -2,24 +2,41 @@
 import pygame
 import time
 from tilemap import TileMap
-from constants import PLAYER, OPPONENT, DIAMOND, AIR, EXIT
+from level_parser import LevelSnapshot, parse_grid, format_level, write_atomic
+from level_cache import get_cache, load_level_cached
+from game_rules import GameRules
+import observation
+from constants import AIR
 from player import Player
 from opponent import Opponent
+from ai_scheduler import AIScheduler
 from constants import TILE_SIZE
 
 # Define status bar height as a constant
 STATUS_BAR_HEIGHT = 30
 
-class Game:
-    def __init__(self, level_filename):
-        self.tilemap = TileMap(level_filename)
+class Game(GameRules):
+    def __init__(self, level_source):
+        """Create a game from a level file, a tile grid or a LevelSnapshot
+
+        Restoring from a snapshot skips all file reading and tile scanning,
+        which makes restarting a level practically free.
+        """
+        if isinstance(level_source, LevelSnapshot):
+            self.snapshot = level_source
+        elif isinstance(level_source, str):
+            self.snapshot = load_level_cached(level_source)
+        else:
+            self.snapshot = parse_grid(level_source)
+
+        self.tilemap = TileMap(self.snapshot.tiles)
         self.player = None
         self.opponents = []
         self.running = True
-        self.diamonds_remaining = 0
+        self.diamonds_remaining = self.snapshot.diamond_count
         
         # Timer initialization
-        self.timer_seconds = self.tilemap.timer_seconds
+        self.timer_seconds = self.snapshot.timer_seconds
         self.start_time = time.time()
         self.time_remaining = self.timer_seconds
         
@@ -30,60 +47,45 @@ class Game:
         self.all_sprites = pygame.sprite.Group()
         self.opponents_group = pygame.sprite.Group()
         
-        # Find player, opponents, and count diamonds in the level
-        for y in range(self.tilemap.height):
-            for x in range(self.tilemap.width):
-                tile = self.tilemap.get(x, y)
-                if tile == PLAYER:
-                    self.player = Player(x, y)
-                    self.all_sprites.add(self.player)
-                    self.tilemap.set(x, y, AIR)
-                elif tile == OPPONENT:
-                    # Create opponent at the correct tile position
-                    opponent = Opponent(x, y)  # Removed incorrect +1 offset
-                    self.opponents.append(opponent)
-                    self.opponents_group.add(opponent)
-                    self.all_sprites.add(opponent)
-                    self.tilemap.set(x, y, AIR)
-                elif tile == DIAMOND:
-                    self.diamonds_remaining += 1
+        # Create player and opponents at their spawn tiles
+        if self.snapshot.player_spawn:
+            self.player = Player(*self.snapshot.player_spawn)
+            self.all_sprites.add(self.player)
+        for x, y in self.snapshot.opponent_spawns:
+            opponent = Opponent(x, y)
+            self.opponents.append(opponent)
+            self.opponents_group.add(opponent)
+            self.all_sprites.add(opponent)
         
         # Set total diamonds after counting them in the level
         self.total_diamonds = self.diamonds_remaining
+        
+        # Decides which opponents re-plan on each frame
+        self.ai_scheduler = AIScheduler()
 
-    def check_game_over(self):
-        # Check if player collided with an opponent
-        if pygame.sprite.spritecollideany(self.player, self.opponents_group):
-            return True
-        
-        # Check if time ran out
-        if self.time_remaining <= 0:
-            return True
-        
-        # Check if player fell to the bottom of the level
-        player_x, player_y = self.player.get_tile_position()
-        if player_y >= self.tilemap.height - 1:
-            return True
-            
-        return False
+        # NumPy arrays for bots and tools, created on first use
+        self._tile_array = None
+        self._entity_array = None
+
+    def _player_caught(self):
+        return pygame.sprite.spritecollideany(self.player, self.opponents_group) is not None
 
-    def check_win_condition(self):
-        # Can only win if all diamonds are collected
-        if self.diamonds_remaining > 0:
-            return False
-        
-        # Win condition: All diamonds collected and player reached the top row
-        player_x, player_y = self.player.get_tile_position()
-        return player_y == 0 or self.tilemap.get(player_x, player_y) == EXIT
+    def tile_array(self):
+        """Read-only NumPy view of the live tile codes (see observation.py)"""
+        if self._tile_array is None:
+            self._tile_array = observation.tile_array(self.tilemap)
+        return self._tile_array
 
-    def check_diamond_collection(self):
-        # Check if player is on a diamond
-        player_x, player_y = self.player.get_tile_position()
-        if self.tilemap.get(player_x, player_y) == DIAMOND:
-            self.tilemap.set(player_x, player_y, AIR)
-            self.diamonds_remaining -= 1
-            self.diamonds_collected += 1
+    def entity_array(self):
+        """NumPy array marking the player's and opponents' tiles, refilled on each call"""
+        self._entity_array = observation.entity_array(self.player, self.opponents, out=self._entity_array)
+        return self._entity_array
             
+    def start_timer(self):
+        # (Re)start the countdown from the current time remaining, e.g. once a
+        # preloaded level begins or after a rewind or quick-load
+        self.start_time = time.time() - (self.timer_seconds - self.time_remaining)
+
     def update_timer(self):
         # Calculate time remaining
         elapsed = time.time() - self.start_time
@@ -159,29 +161,20 @@ class Game:
         # Check if player collected a diamond
         self.check_diamond_collection()
         
-        # Update each opponent individually
-        for opponent in self.opponents:
-            opponent.update(self.player, self.tilemap)
+        # Update the opponents, re-planning as many as the AI budget allows
+        self.ai_scheduler.update(self.opponents, self.player, self.tilemap)
             
         # Update the timer
         self.update_timer()
         
+    def serialize_level(self):
+        """Return the level as it is now, with the characters' tiles as spawns, as level file contents (bytes)"""
+        player_pos = self.player.get_tile_position() if self.player else None
+        opponent_positions = [opponent.get_tile_position() for opponent in self.opponents]
+        return format_level(self.tilemap.tiles, self.timer_seconds, player_pos, opponent_positions)
+
     def save_level(self, filename):
-        """Save the current level state to a file"""
-        with open(filename, 'w') as f:
-            # Write the timer as the first line
-            minutes = int(self.timer_seconds) // 60
-            seconds = int(self.timer_seconds) % 60
-            f.write(f"{minutes:02d}:{seconds:02d}\n")
-            
-            # Get player and opponent positions
-            player_pos = None
-            if self.player:
-                player_pos = self.player.get_tile_position()
-                
-            opponent_positions = []
-            for opponent in self.opponents:
-                opponent_positions.append(opponent.get_tile_position())
-            
-            # Use the tilemap's save_to_file method to write the level data
-            self.tilemap.save_to_file(f, True, player_pos, opponent_positions)
+        """Save the current level state to a file, atomically"""
+        write_atomic(filename, self.serialize_level())
+        # Never serve the previous version of this level from the compiled level cache
+        get_cache().invalidate(filename)
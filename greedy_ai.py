@@ -0,0 +1,59 @@
+# greedy_ai.py
+from constants import *
+
+def decide_keys(opponent_position, player_position, tilemap, keys):
+    """Return the keys an opponent on `opponent_position` presses to chase the player
+
+    This is the greedy planner. It only reads the map, so it can also run on a
+    worker (see ai_worker.py) or in a simulation (see sim.py). `keys` is the
+    character class whose KEY_* codes are returned.
+    """
+    pressed = set()
+    player_x, player_y = player_position
+    opponent_x, opponent_y = opponent_position
+
+    # Calculate distances
+    dx = player_x - opponent_x
+    dy = player_y - opponent_y
+
+    # Check surroundings
+    current_tile = tilemap.get(opponent_x, opponent_y)
+    below_tile = tilemap.get(opponent_x, opponent_y + 1)
+    above_tile = tilemap.get(opponent_x, opponent_y - 1)
+    left_tile = tilemap.get(opponent_x - 1, opponent_y)
+    right_tile = tilemap.get(opponent_x + 1, opponent_y)
+
+    # Check if we're on or near a ladder
+    on_ladder = current_tile == LADDER
+    ladder_below = below_tile == LADDER
+    ladder_above = above_tile == LADDER
+
+    # DECISION 1: Vertical movement (ladders)
+    if on_ladder or ladder_below:
+        # If player is above us, try to climb up
+        if dy < 0 and (on_ladder or ladder_above):
+            pressed.add(keys.KEY_UP)
+        # If player is below us, try to climb down
+        elif dy > 0 and (on_ladder or ladder_below):
+            pressed.add(keys.KEY_DOWN)
+
+    # DECISION 2: Horizontal movement
+    # Prioritize vertical movement if significant vertical distance
+    if abs(dy) <= 3 or not (on_ladder or ladder_below):
+        # Move left toward player
+        if dx < 0 and left_tile not in [EARTH, STONE]:
+            pressed.add(keys.KEY_LEFT)
+        # Move right toward player
+        elif dx > 0 and right_tile not in [EARTH, STONE]:
+            pressed.add(keys.KEY_RIGHT)
+
+    # DECISION 3: Head for the nearest ladder going the player's way if significant vertical distance
+    if abs(dy) > 3 and not on_ladder:
+        ladder_x = tilemap.ladder_index().nearest_ladder(
+            opponent_x, opponent_y, 1 if dy > 0 else -1, player_y)
+        if ladder_x is not None and ladder_x != opponent_x:
+            pressed.discard(keys.KEY_LEFT)
+            pressed.discard(keys.KEY_RIGHT)
+            pressed.add(keys.KEY_LEFT if ladder_x < opponent_x else keys.KEY_RIGHT)
+
+    return frozenset(pressed)
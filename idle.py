@@ -0,0 +1,35 @@
+# idle.py
+import time
+from contextlib import contextmanager
+import pygame
+
+# Idle screens wake up at least this often even without input
+IDLE_TIMEOUT_MS = 500
+
+# Set by `main.py --cpu-stats` to print the CPU usage of every idle screen
+report_cpu = False
+
+def wait_events(timeout=IDLE_TIMEOUT_MS):
+    """Block until an event arrives or the timeout passes, then return all pending events
+
+    Menus, messages and dialogs use this instead of spinning on
+    pygame.event.get(), so they use no CPU while nothing happens.
+    """
+    event = pygame.event.wait(timeout)
+    if event.type == pygame.NOEVENT:
+        return []
+    return [event] + pygame.event.get()
+
+@contextmanager
+def measure_cpu(label):
+    """Print how much CPU a screen used while it was shown, if report_cpu is enabled"""
+    if not report_cpu:
+        yield
+        return
+    wall_start, cpu_start = time.perf_counter(), time.process_time()
+    try:
+        yield
+    finally:
+        wall = time.perf_counter() - wall_start
+        cpu = time.process_time() - cpu_start
+        print(f"{label}: {100 * cpu / max(wall, 1e-9):.1f}% CPU over {wall:.1f} s")
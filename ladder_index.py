@@ -0,0 +1,103 @@
+# ladder_index.py
+from bisect import bisect_left, bisect_right, insort
+from constants import *
+
+_WALLS = (EARTH, STONE)
+
+class LadderIndex:
+    """Sorted ladder positions per row and per column of a TileMap
+
+    Built once from the tile buffer and kept current through the tilemap's
+    change subscription, so ladder queries are a few bisects instead of a
+    scan of the map.
+    """
+
+    def __init__(self, tilemap):
+        self.width = tilemap.width
+        self.height = tilemap.height
+        self.rows = [[] for _ in range(self.height)]      # y -> sorted x of ladders
+        self.columns = [[] for _ in range(self.width)]    # x -> sorted y of ladders
+        self.walls = [[] for _ in range(self.height)]     # y -> sorted x of earth and stone
+        for y in range(self.height):
+            for x in range(self.width):
+                self._add(x, y, tilemap.get(x, y))
+        tilemap.subscribe(self._on_change)
+
+    def copy(self, tilemap):
+        """Return an index for `tilemap`, a copy of the map this index follows
+
+        The sorted lists are copied instead of rebuilt from the tiles, and the
+        new index follows the changes made to `tilemap`.
+        """
+        index = LadderIndex.__new__(LadderIndex)
+        index.width = self.width
+        index.height = self.height
+        index.rows = [row[:] for row in self.rows]
+        index.columns = [column[:] for column in self.columns]
+        index.walls = [walls[:] for walls in self.walls]
+        tilemap.subscribe(index._on_change)
+        return index
+
+    def _add(self, x, y, tile):
+        if tile == LADDER:
+            insort(self.rows[y], x)
+            insort(self.columns[x], y)
+        elif tile in _WALLS:
+            insort(self.walls[y], x)
+
+    def _remove(self, x, y, tile):
+        if tile == LADDER:
+            row, column = self.rows[y], self.columns[x]
+            del row[bisect_left(row, x)]
+            del column[bisect_left(column, y)]
+        elif tile in _WALLS:
+            walls = self.walls[y]
+            del walls[bisect_left(walls, x)]
+
+    def _on_change(self, change):
+        self._remove(change.x, change.y, change.old)
+        self._add(change.x, change.y, change.new)
+
+    def is_span(self, x, y1, y2):
+        """True if column x has a ladder on every row from y1 to y2"""
+        if not 0 <= x < self.width:
+            return False
+        top, bottom = min(y1, y2), max(y1, y2)
+        column = self.columns[x]
+        return bisect_right(column, bottom) - bisect_left(column, top) == bottom - top + 1
+
+    def _walkable(self, y, x1, x2):
+        """True if there is no wall in row y between x1 and x2"""
+        if not 0 <= y < self.height:
+            return False
+        walls = self.walls[y]
+        i = bisect_left(walls, min(x1, x2))
+        return i == len(walls) or walls[i] > max(x1, x2)
+
+    def nearest_ladder(self, x, y, direction, target_y=None):
+        """Return the column of the nearest ladder reachable by walking along row y
+
+        direction -1 looks for ladders going up (a ladder tile in row y),
+        +1 for ladders going down (a ladder tile just below row y). When
+        ladders on both sides are reachable, one that spans all the way to
+        `target_y` wins over a nearer one that does not. Returns None if no
+        ladder can be reached.
+        """
+        ladder_row = y if direction < 0 else y + 1
+        if not 0 <= ladder_row < self.height:
+            return None
+        row = self.rows[ladder_row]
+        i = bisect_left(row, x)
+        candidates = []
+        if i < len(row):
+            candidates.append(row[i])
+        if i > 0:
+            candidates.append(row[i - 1])
+        candidates = [lx for lx in candidates if self._walkable(y, x, lx)]
+        if not candidates:
+            return None
+        if target_y is not None and len(candidates) == 2:
+            spanning = [lx for lx in candidates if self.is_span(lx, ladder_row, target_y)]
+            if len(spanning) == 1:
+                return spanning[0]
+        return min(candidates, key=lambda lx: abs(lx - x))
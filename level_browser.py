@@ -0,0 +1,267 @@
+# level_browser.py
+import os
+import queue
+import sys
+import threading
+from collections import OrderedDict, namedtuple
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+import pygame
+from constants import *
+from level_parser import content_hash, raw_buffer
+from level_cache import load_level_cached
+import idle
+
+# Colors
+BLACK = (0, 0, 0)
+WHITE = (255, 255, 255)
+GRAY = (150, 150, 150)
+HIGHLIGHT = (255, 255, 0)  # Yellow for the selected level
+
+THUMBNAIL_DIR = ".thumbnail_cache"
+THUMBNAIL_SCALE = 2  # pixels per tile
+THUMBNAIL_WIDTH = GRID_WIDTH * THUMBNAIL_SCALE
+THUMBNAIL_HEIGHT = GRID_HEIGHT * THUMBNAIL_SCALE
+
+# Thumbnail colors per tile, including the spawns
+THUMBNAIL_COLORS = dict(TILE_COLORS)
+THUMBNAIL_COLORS.update({
+    LADDER: (139, 69, 19),
+    PLAYER: PLAYER_COLOR,
+    OPPONENT: OPPONENT_COLOR,
+    EXIT: (0, 255, 255),
+})
+# RGB bytes for every possible tile code, unknown tiles in red
+_TILE_RGB = [bytes(THUMBNAIL_COLORS.get(chr(code), (255, 0, 0))) for code in range(256)]
+
+CELL_WIDTH = THUMBNAIL_WIDTH + 20
+CELL_HEIGHT = THUMBNAIL_HEIGHT + 30
+HEADER_HEIGHT = 50
+SCROLL_STEP = 40
+# Rendered thumbnails kept in memory, least recently used dropped first
+MAX_THUMBNAILS = 256
+
+# Posted by the thumbnail worker so the browser can sleep until there is something to draw
+THUMBNAIL_READY = pygame.event.custom_type()
+
+# One level in the browser: what picking it returns, its label, a key that
+# changes whenever the level changes, and a callable returning its raw buffer
+# (tile buffer with the spawns, see level_parser.raw_buffer)
+BrowserEntry = namedtuple('BrowserEntry', ['value', 'label', 'key', 'read_raw'])
+
+def render_thumbnail(raw):
+    """Render a raw level buffer as a small surface with THUMBNAIL_SCALE pixels per tile"""
+    rgb = b''.join(_TILE_RGB[code] for code in raw)
+    surface = pygame.image.frombuffer(rgb, (GRID_WIDTH, GRID_HEIGHT), 'RGB')
+    return pygame.transform.scale(surface, (THUMBNAIL_WIDTH, THUMBNAIL_HEIGHT))
+
+class ThumbnailCache:
+    """Generates level thumbnails lazily on a background thread
+
+    Rendered thumbnails are stored as PNG files named after the hash of the
+    level's raw buffer, so an edited level gets a new thumbnail and unchanged
+    levels are never rendered twice, whether they come from files or a pack.
+    A level whose thumbnail cannot be made is not tried again until it
+    changes (its entry key changes with it).
+    """
+
+    def __init__(self, cache_dir=THUMBNAIL_DIR):
+        self.cache_dir = cache_dir
+        self.executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="thumbnails")
+        self.surfaces = OrderedDict()  # entry key -> Surface, least recently used first
+        self.requested = set()
+        self.failed = set()  # keys of entries whose level could not be read
+        self.finished = queue.Queue()  # keys completed by the worker
+
+    def get(self, entry):
+        """Return the thumbnail of a BrowserEntry, queueing it if it is not ready yet"""
+        surface = self.surfaces.get(entry.key)
+        if surface is not None:
+            self.surfaces.move_to_end(entry.key)
+        elif entry.key not in self.requested and entry.key not in self.failed:
+            self.requested.add(entry.key)
+            self.executor.submit(self._generate, entry)
+        return surface
+
+    def collect(self):
+        """Take over thumbnails finished by the worker. Returns True if any new one can be drawn"""
+        collected = False
+        while not self.finished.empty():
+            key, surface = self.finished.get()
+            self.requested.discard(key)
+            if surface is None:
+                # Nothing new to draw; the placeholder stays
+                self.failed.add(key)
+                continue
+            self.surfaces[key] = surface
+            if len(self.surfaces) > MAX_THUMBNAILS:
+                self.surfaces.popitem(last=False)
+            collected = True
+        return collected
+
+    def _generate(self, entry):
+        surface = None
+        try:
+            raw = entry.read_raw()
+            cache_file = os.path.join(self.cache_dir, content_hash(raw).hex() + ".png")
+            if os.path.exists(cache_file):
+                surface = pygame.image.load(cache_file)
+            else:
+                surface = render_thumbnail(raw)
+                try:
+                    os.makedirs(self.cache_dir, exist_ok=True)
+                    pygame.image.save(surface, cache_file)
+                except (OSError, pygame.error):
+                    pass  # e.g. a read-only cache directory; the thumbnail is still shown
+        except (OSError, pygame.error):
+            pass
+        self.finished.put((entry.key, surface))
+        try:
+            pygame.event.post(pygame.event.Event(THUMBNAIL_READY))
+        except pygame.error:
+            pass  # no display, nobody is waiting for it
+
+# Shared so thumbnails survive closing and reopening the browser
+_thumbnails = None
+_thumbnails_lock = threading.Lock()
+
+def get_thumbnail_cache():
+    global _thumbnails
+    with _thumbnails_lock:
+        if _thumbnails is None:
+            _thumbnails = ThumbnailCache()
+    return _thumbnails
+
+def _read_level_file(path):
+    return raw_buffer(load_level_cached(path))
+
+def list_levels(directory):
+    """Return a BrowserEntry for every .lvl file in a directory, sorted by name, picking its path"""
+    files = sorted((entry for entry in os.scandir(directory) if entry.name.endswith('.lvl')), key=lambda e: e.name)
+    return [BrowserEntry(entry.path, entry.name, (entry.path, entry.stat().st_mtime_ns),
+                         partial(_read_level_file, entry.path))
+            for entry in files]
+
+def list_pack_levels(pack):
+    """Return a BrowserEntry for every level of a LevelPack, picking its level id"""
+    return [BrowserEntry(level_id, f"level{level_id:03d}", (pack.filename, level_id, pack.version(level_id)),
+                         partial(pack.record, level_id))
+            for level_id in pack.level_ids()]
+
+class LevelBrowser:
+    """Scrollable grid of level thumbnails to pick a level from"""
+
+    def __init__(self, screen, levels, title="Choose a Level"):
+        self.screen = screen
+        self.title = title
+        self.levels = levels  # BrowserEntries
+        self.thumbnails = get_thumbnail_cache()
+        self.columns = max(1, SCREEN_WIDTH // CELL_WIDTH)
+        self.rows = (len(self.levels) + self.columns - 1) // self.columns
+        self.visible_height = SCREEN_HEIGHT - HEADER_HEIGHT
+        self.scroll = 0
+        self.selected = 0
+        self.font = pygame.font.SysFont(None, 20)
+        self.title_font = pygame.font.SysFont(None, 36)
+        self.labels = {}  # level index -> rendered file name
+
+    def _max_scroll(self):
+        return max(0, self.rows * CELL_HEIGHT - self.visible_height)
+
+    def _scroll_to_selected(self):
+        top = (self.selected // self.columns) * CELL_HEIGHT
+        if top < self.scroll:
+            self.scroll = top
+        elif top + CELL_HEIGHT > self.scroll + self.visible_height:
+            self.scroll = top + CELL_HEIGHT - self.visible_height
+
+    def _cell_rect(self, index):
+        row, column = divmod(index, self.columns)
+        return pygame.Rect(column * CELL_WIDTH + 10, HEADER_HEIGHT + row * CELL_HEIGHT - self.scroll,
+                           THUMBNAIL_WIDTH, THUMBNAIL_HEIGHT)
+
+    def _index_at(self, pos):
+        x, y = pos
+        if y < HEADER_HEIGHT:
+            return None
+        row = (y - HEADER_HEIGHT + self.scroll) // CELL_HEIGHT
+        column = x // CELL_WIDTH
+        index = row * self.columns + column
+        if column < self.columns and 0 <= index < len(self.levels):
+            return index
+        return None
+
+    def _visible_range(self):
+        """Indices of the levels in the visible rows, plus one row ahead for smooth scrolling"""
+        first_row = self.scroll // CELL_HEIGHT
+        last_row = (self.scroll + self.visible_height) // CELL_HEIGHT + 1
+        return range(first_row * self.columns, min(len(self.levels), (last_row + 1) * self.columns))
+
+    def draw(self):
+        self.screen.fill(BLACK)
+        for index in self._visible_range():
+            rect = self._cell_rect(index)
+            entry = self.levels[index]
+            thumbnail = self.thumbnails.get(entry)
+            if thumbnail:
+                self.screen.blit(thumbnail, rect)
+            else:
+                pygame.draw.rect(self.screen, GRAY, rect, 1)
+            border = HIGHLIGHT if index == self.selected else GRAY
+            pygame.draw.rect(self.screen, border, rect.inflate(4, 4), 2 if index == self.selected else 1)
+            label = self.labels.get(index)
+            if label is None:
+                label = self.labels[index] = self.font.render(entry.label, True, WHITE)
+            self.screen.blit(label, label.get_rect(midtop=(rect.centerx, rect.bottom + 5)))
+
+        # Header drawn last so scrolled cells slide underneath it
+        pygame.draw.rect(self.screen, BLACK, (0, 0, SCREEN_WIDTH, HEADER_HEIGHT))
+        title = self.title_font.render(self.title, True, WHITE)
+        self.screen.blit(title, (10, 12))
+        hint = self.font.render("Arrows/Wheel: Move | ENTER/Click: Open | ESC: Cancel", True, GRAY)
+        self.screen.blit(hint, hint.get_rect(midright=(SCREEN_WIDTH - 10, HEADER_HEIGHT // 2)))
+        pygame.display.flip()
+
+    def run(self):
+        """Show the browser until a level is picked. Returns its entry's value, or None if cancelled"""
+        if not self.levels:
+            return None
+        dirty = True
+        while True:
+            # Only redraw when something changed: input or newly finished thumbnails
+            if self.thumbnails.collect() or dirty:
+                self.draw()
+                dirty = False
+
+            for event in idle.wait_events():
+                if event.type != pygame.MOUSEMOTION:
+                    dirty = True
+                if event.type == pygame.QUIT:
+                    pygame.quit()
+                    sys.exit()
+                elif event.type == pygame.MOUSEWHEEL:
+                    self.scroll = min(self._max_scroll(), max(0, self.scroll - event.y * SCROLL_STEP))
+                elif event.type == pygame.MOUSEBUTTONDOWN and event.button == 1:
+                    index = self._index_at(event.pos)
+                    if index is not None:
+                        return self.levels[index].value
+                elif event.type == pygame.KEYDOWN:
+                    if event.key == pygame.K_ESCAPE:
+                        return None
+                    elif event.key == pygame.K_RETURN:
+                        return self.levels[self.selected].value
+                    moves = {pygame.K_LEFT: -1, pygame.K_RIGHT: 1,
+                             pygame.K_UP: -self.columns, pygame.K_DOWN: self.columns}
+                    if event.key in moves:
+                        self.selected = min(len(self.levels) - 1, max(0, self.selected + moves[event.key]))
+                        self._scroll_to_selected()
+
+def browse_levels(screen, directory="levels", title="Choose a Level"):
+    """Entry point to pick a level file with the browser. Returns its path, or None"""
+    with idle.measure_cpu("level browser"):
+        return LevelBrowser(screen, list_levels(directory), title).run()
+
+def browse_pack(screen, pack, title="Choose a Level"):
+    """Pick a level of a LevelPack with the browser. Returns its level id, or None"""
+    with idle.measure_cpu("level browser"):
+        return LevelBrowser(screen, list_pack_levels(pack), title).run()
@@ -0,0 +1,129 @@
+# level_cache.py
+import atexit
+import marshal
+import os
+import threading
+from collections import OrderedDict, namedtuple
+from level_parser import (LevelError, parse_level, decode_level, snapshot_from_buffer, raw_buffer,
+                          content_hash, write_atomic)
+
+CACHE_DIR = ".level_cache"
+CACHE_FILE = "levels.cache"
+CACHE_FORMAT_VERSION = 3
+DEFAULT_MAX_BYTES = 64 * 1024 * 1024
+
+# Compiled level: what the file looked like when it was parsed, and the parse result
+CacheEntry = namedtuple('CacheEntry', ['mtime_ns', 'size', 'digest', 'timer_seconds', 'raw', 'errors'])
+
+def _snapshot(entry, filename):
+    """Rebuild the LevelSnapshot of a cached level, with the errors the parser reported"""
+    return snapshot_from_buffer(entry.raw, entry.timer_seconds, filename)._replace(errors=entry.errors)
+
+class LevelCache:
+    """Persistent cache of compiled levels, so unchanged levels are never re-parsed
+
+    Entries are keyed by the level's absolute path and validated with a single
+    stat (mtime and size). If the stat changed but the content hash did not,
+    the compiled entry is reused without parsing. All entries live in one file
+    in the cache directory, read once on startup, and the least recently used
+    entries are evicted when the cache exceeds `max_bytes`.
+    """
+
+    def __init__(self, cache_dir=CACHE_DIR, max_bytes=DEFAULT_MAX_BYTES):
+        self.filename = os.path.join(cache_dir, CACHE_FILE)
+        self.max_bytes = max_bytes
+        self.entries = OrderedDict()  # absolute path -> CacheEntry, least recently used first
+        self.total_bytes = 0
+        self.dirty = False
+        self.lock = threading.Lock()  # levels are also loaded by the preloader thread
+        self._read()
+
+    def _read(self):
+        # The cache file only holds plain values (marshal cannot run code on
+        # load); anything unexpected in it just drops the cache
+        try:
+            with open(self.filename, 'rb') as f:
+                version, records = marshal.load(f)
+            if version != CACHE_FORMAT_VERSION:
+                return
+            entries = OrderedDict(
+                (path, CacheEntry(mtime_ns, size, digest, timer_seconds, bytes(raw),
+                                  tuple(LevelError(*error) for error in errors)))
+                for path, mtime_ns, size, digest, timer_seconds, raw, errors in records
+            )
+        except (OSError, EOFError, ValueError, TypeError):
+            return
+        self.entries = entries
+        self.total_bytes = sum(len(entry.raw) for entry in entries.values())
+
+    def save(self):
+        """Write the cache atomically if it changed"""
+        with self.lock:
+            if not self.dirty:
+                return
+            records = [
+                (path, entry.mtime_ns, entry.size, entry.digest, entry.timer_seconds, entry.raw,
+                 tuple(tuple(error) for error in entry.errors))
+                for path, entry in self.entries.items()
+            ]
+            data = marshal.dumps((CACHE_FORMAT_VERSION, records))
+            self.dirty = False
+        os.makedirs(os.path.dirname(self.filename), exist_ok=True)
+        write_atomic(self.filename, data)
+
+    def load(self, filename):
+        """Return the LevelSnapshot of a level file, parsing it only if it changed"""
+        path = os.path.abspath(filename)
+        stat = os.stat(path)
+        with self.lock:
+            entry = self.entries.get(path)
+            if entry and entry.mtime_ns == stat.st_mtime_ns and entry.size == stat.st_size:
+                self.entries.move_to_end(path)
+                return _snapshot(entry, filename)
+
+        with open(path, 'rb') as f:
+            data = f.read()
+        digest = content_hash(data)
+        if entry and entry.digest == digest:
+            # Touched but not changed
+            snapshot = _snapshot(entry, filename)
+        else:
+            snapshot = parse_level(decode_level(data), filename)
+        self._store(path, CacheEntry(stat.st_mtime_ns, stat.st_size, digest,
+                                     snapshot.timer_seconds, raw_buffer(snapshot), snapshot.errors))
+        return snapshot
+
+    def _store(self, path, entry):
+        with self.lock:
+            self._remove(path)
+            self.entries[path] = entry
+            self.total_bytes += len(entry.raw)
+            while self.total_bytes > self.max_bytes and len(self.entries) > 1:
+                self._remove(next(iter(self.entries)))
+            self.dirty = True
+
+    def _remove(self, path):
+        entry = self.entries.pop(path, None)
+        if entry:
+            self.total_bytes -= len(entry.raw)
+            self.dirty = True
+
+    def invalidate(self, filename):
+        """Forget a level, e.g. right after it was saved"""
+        with self.lock:
+            self._remove(os.path.abspath(filename))
+
+_default_cache = None
+_default_cache_lock = threading.Lock()
+
+def get_cache():
+    """Return the shared level cache, saved automatically at exit"""
+    global _default_cache
+    with _default_cache_lock:
+        if _default_cache is None:
+            _default_cache = LevelCache()
+            atexit.register(_default_cache.save)
+    return _default_cache
+
+def load_level_cached(filename):
+    return get_cache().load(filename)
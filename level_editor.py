@@ -8,8 +8,14 @@ from tkinter import filedialog
 from constants import *
 from tilemap import TileMap
 from game_state import Game
-from player import Player
-from opponent import Opponent
+from level_parser import load_level
+from level_browser import browse_levels
+from telemetry import load_heatmaps, level_name
+from reachability_overlay import ReachabilityOverlay, REACHABILITY_READY
+from edit_history import EditHistory
+from autosave import Autosaver, autosave_filename, UNTITLED_AUTOSAVE
+from editor_input import EditorInput
+import idle
 
 # Colors
 BLACK = (0, 0, 0)
@@ -30,21 +36,35 @@ PALETTE_TILES = [
     {'tile': EXIT, 'name': 'Exit', 'color': (0, 255, 255)}  # Cyan for exit
 ]
 
+# Telemetry heatmaps the H key cycles through, with their colors
+HEATMAP_COLORS = {
+    'death': (255, 0, 0),
+    'stall': (255, 160, 0),
+    'dig': (0, 200, 0),
+}
+HEATMAP_MAX_ALPHA = 200
+
 class LevelEditor:
     def __init__(self, screen):
         self.screen = screen
         self.clock = pygame.time.Clock()
         self.running = True
+        self.reachability = None  # ReachabilityOverlay while it is shown (O key)
         
         # Create a new empty level with default settings
         self.create_new_level()
         
         # Editor state
         self.selected_tile_index = 0  # Start with AIR selected
-        self.is_drawing = False
-        self.is_erasing = False
+        self.input = EditorInput(self)  # brush, bulk tools, paste and undo
         self.grid_visible = True
         self.modified = False  # Track if level has been modified
+        self.autosaver = Autosaver()
+        
+        # Telemetry heatmap shown over the map (None = off)
+        self.heatmap_kind = None
+        self.heatmap_surface = None
+        self.heatmap_events = 0
         
         # Palette area dimensions
         self.palette_width = 150
@@ -94,6 +114,10 @@ class LevelEditor:
                 
         return False
     
+    def selected_tile(self):
+        """The tile the palette has selected"""
+        return PALETTE_TILES[self.selected_tile_index]['tile']
+    
     def get_palette_item_at_position(self, pos):
         """Check if position is on a palette item and return its index"""
         x, y = pos
@@ -245,6 +269,54 @@ class LevelEditor:
         temp_level = [[AIR for _ in range(GRID_WIDTH)] for _ in range(GRID_HEIGHT)]
         self.game_state = Game(temp_level)
         self.game_state.timer_seconds = 120  # Default 2 minutes
+        self.level_filename = None
+        self.history = EditHistory(self.game_state.tilemap)
+        self.restart_reachability()
+    
+    def toggle_heatmap(self):
+        """Show the next telemetry heatmap of this level, or none after the last"""
+        kinds = [None] + list(HEATMAP_COLORS)
+        self.heatmap_kind = kinds[(kinds.index(self.heatmap_kind) + 1) % len(kinds)]
+        self.update_heatmap()
+    
+    def update_heatmap(self):
+        """Build the overlay for the current heatmap from the aggregated telemetry"""
+        self.heatmap_surface = None
+        self.heatmap_events = 0
+        if self.heatmap_kind is None or self.level_filename is None:
+            return
+        # Read on every toggle so freshly aggregated telemetry shows up
+        counts = load_heatmaps().get(level_name(self.level_filename), {}).get(self.heatmap_kind, {})
+        if not counts:
+            return
+        self.heatmap_events = sum(counts.values())
+        highest = max(counts.values())
+        color = HEATMAP_COLORS[self.heatmap_kind]
+        self.heatmap_surface = pygame.Surface((GRID_WIDTH * TILE_SIZE, GRID_HEIGHT * TILE_SIZE), pygame.SRCALPHA)
+        for (x, y), count in counts.items():
+            alpha = 40 + (HEATMAP_MAX_ALPHA - 40) * count // highest
+            self.heatmap_surface.fill(color + (alpha,), (x * TILE_SIZE, y * TILE_SIZE, TILE_SIZE, TILE_SIZE))
+    
+    def draw_heatmap(self):
+        if self.heatmap_surface is not None:
+            self.screen.blit(self.heatmap_surface, (0, 0))
+    
+    def spawn_position(self):
+        return self.game_state.player.get_tile_position() if self.game_state.player else None
+    
+    def toggle_reachability(self):
+        """Show or hide which tiles the player can reach from the spawn"""
+        if self.reachability:
+            self.reachability.close()
+            self.reachability = None
+        else:
+            self.reachability = ReachabilityOverlay(self.game_state.tilemap, self.spawn_position())
+    
+    def restart_reachability(self):
+        """Point the reachability overlay, if shown, at a newly loaded or created level"""
+        if self.reachability:
+            self.reachability.close()
+            self.reachability = ReachabilityOverlay(self.game_state.tilemap, self.spawn_position())
     
     def draw_tilemap(self):
         """Draw the current tilemap and entities"""
@@ -281,8 +353,24 @@ class LevelEditor:
         selected_text = font.render(f"Selected: {selected_name}", True, WHITE)
         self.screen.blit(selected_text, (10, SCREEN_HEIGHT - status_height + 5))
         
+        # Show the current tool and what is on the clipboard, the heatmap and reachability
+        tool = self.input.tool
+        clipboard = self.input.clipboard
+        if clipboard:
+            tool += f" (clipboard {clipboard.width}x{clipboard.height})"
+        items = [(f"Tool: {tool}", WHITE)]
+        if self.heatmap_kind is not None:
+            items.append((f"Heatmap: {self.heatmap_kind} ({self.heatmap_events} events)", HIGHLIGHT))
+        if self.reachability:
+            items.append((self.reachability.status(), HIGHLIGHT))
+        x = selected_text.get_width() + 30
+        for text, color in items:
+            item_text = font.render(text, True, color)
+            self.screen.blit(item_text, (x, SCREEN_HEIGHT - status_height + 5))
+            x += item_text.get_width() + 20
+        
         # Show controls
-        controls_text = font.render("Left-click: Draw | Right-click: Erase | G: Toggle Grid", True, WHITE)
+        controls_text = font.render("L/R click: Draw/Erase | Tools: R F C V M | Ctrl+Z/Y: Undo/Redo | G: Grid | H/O: Heatmap/Reach", True, WHITE)
         controls_rect = controls_text.get_rect(midright=(self.palette_x - 10, SCREEN_HEIGHT - status_height + 15))
         self.screen.blit(controls_text, controls_rect)
         
@@ -291,71 +379,47 @@ class LevelEditor:
             modified_text = font.render("*", True, HIGHLIGHT)
             self.screen.blit(modified_text, (self.palette_x - 30, SCREEN_HEIGHT - status_height + 5))
     
-    def place_tile(self, grid_pos, tile):
-        """Place a tile at the specified grid position"""
-        if grid_pos:
-            x, y = grid_pos
-            
-            # First check if we're placing AIR and there's an entity to remove
-            if tile == AIR:
-                # Check if player is at this position
-                if self.game_state.player:
-                    px, py = self.game_state.player.get_tile_position()
-                    if px == x and py == y:
-                        self.game_state.player = None
-                        self.modified = True
-                
-                # Check if any opponent is at this position
-                for i, opponent in enumerate(self.game_state.opponents[:]):
-                    ox, oy = opponent.get_tile_position()
-                    if ox == x and oy == y:
-                        # Remove this opponent
-                        opponent.kill()  # Remove from sprite groups
-                        self.game_state.opponents.remove(opponent)
-                        self.modified = True
-            
-            # Handle special tiles (player, opponent) separately
-            if tile == PLAYER:
-                # Create or move player
-                if self.game_state.player:
-                    # Update existing player position
-                    self.game_state.player.rect.x = x * TILE_SIZE
-                    self.game_state.player.rect.y = y * TILE_SIZE
-                else:
-                    # Create new player
-                    self.game_state.player = Player(x, y)
-                    self.game_state.all_sprites.add(self.game_state.player)
-                self.modified = True
-                return
-            
-            elif tile == OPPONENT:
-                # Create a new opponent
-                new_opponent = Opponent(x, y)
-                self.game_state.opponents.append(new_opponent)
-                self.game_state.opponents_group.add(new_opponent)
-                self.game_state.all_sprites.add(new_opponent)
-                self.modified = True
-                return
-            
-            # For regular tiles, update the tilemap
-            current_tile = self.game_state.tilemap.get(x, y)
-            if current_tile != tile:
-                self.game_state.tilemap.set(x, y, tile)
-                self.modified = True
-    
     def load_level(self):
         """Load a level from a file"""
-        filename = filedialog.askopenfilename(
-            filetypes=[("Level files", "*.lvl"), ("All files", "*.*")],
-            initialdir="levels"
-        )
+        filename = browse_levels(self.screen, title="Load Level")
         
         if filename:
-            # Use Game to load the level
-            self.game_state = Game(filename)
-            self.modified = False
-            self.is_drawing = False
-            self.is_erasing = False
+            # Use Game to load the level, or its autosave if the user wants that back
+            source = filename
+            sidecar = autosave_filename(filename)
+            if os.path.exists(sidecar) and os.path.getmtime(sidecar) > os.path.getmtime(filename):
+                if self.ask_yes_no("Autosave Found", "Restore the newer autosaved version?"):
+                    source = load_level(sidecar)
+                else:
+                    # Declined once is enough; do not ask again next time
+                    self.autosaver.discard(sidecar)
+            self.history.close()
+            self.game_state = Game(source)
+            self.level_filename = filename
+            self.history = EditHistory(self.game_state.tilemap)
+            self.restart_reachability()
+            self.update_heatmap()
+            self.modified = source is not filename
+            self.input.stop()
+    
+    def restore_untitled_autosave(self):
+        """Offer to bring back a level that was never saved, if the editor stopped with one"""
+        if not os.path.exists(UNTITLED_AUTOSAVE):
+            return
+        if not self.ask_yes_no("Autosave Found", "Restore the unsaved level from last time?"):
+            # Declined once is enough; do not ask again on every start
+            self.autosaver.discard(UNTITLED_AUTOSAVE)
+            return
+        self.history.close()
+        self.game_state = Game(load_level(UNTITLED_AUTOSAVE))
+        self.history = EditHistory(self.game_state.tilemap)
+        self.restart_reachability()
+        self.modified = True
+    
+    def autosave(self):
+        """Autosave the level in the background if it has unsaved changes and it is time to"""
+        if self.modified and self.autosaver.due():
+            self.autosaver.save(autosave_filename(self.level_filename), self.game_state.serialize_level())
     
     def save_level(self):
         """Save the current level to a file"""
@@ -368,15 +432,26 @@ class LevelEditor:
         if filename:
             # Use GameState's save_level method
             self.game_state.save_level(filename)
+            # The autosave is older than what was just saved now
+            self.autosaver.discard(autosave_filename(self.level_filename))
+            if filename != self.level_filename:
+                self.autosaver.discard(autosave_filename(filename))
+            self.level_filename = filename
             self.modified = False
-            self.is_drawing = False
-            self.is_erasing = False
+            self.input.stop()
     
     def confirm_discard_changes(self):
         """Ask user to confirm discarding changes"""
         if not self.modified:
             return True
-            
+        if self.ask_yes_no("Unsaved Changes", "You have unsaved changes. Discard them?"):
+            # They are gone for good, autosave included
+            self.autosaver.discard(autosave_filename(self.level_filename))
+            return True
+        return False
+    
+    def ask_yes_no(self, title_text, message_text):
+        """Show a question and wait for Y or N"""
         # Use pygame to show a simple confirmation dialog
         dialog_width, dialog_height = 400, 200
         dialog_x = (SCREEN_WIDTH - dialog_width) // 2
@@ -387,8 +462,8 @@ class LevelEditor:
         pygame.draw.rect(dialog_surface, BLACK, (0, 0, dialog_width, dialog_height), 2)
         
         font = pygame.font.SysFont(None, 24)
-        title = font.render("Unsaved Changes", True, WHITE)
-        message = font.render("You have unsaved changes. Discard them?", True, WHITE)
+        title = font.render(title_text, True, WHITE)
+        message = font.render(message_text, True, WHITE)
         yes_text = font.render("Yes (Y)", True, WHITE)
         no_text = font.render("No (N)", True, WHITE)
         
@@ -403,7 +478,7 @@ class LevelEditor:
         waiting = True
         result = False
         while waiting:
-            for event in pygame.event.get():
+            for event in idle.wait_events():
                 if event.type == pygame.QUIT:
                     pygame.quit()
                     sys.exit()
@@ -447,7 +522,8 @@ class LevelEditor:
         waiting = True
         new_timer = current_timer
         while waiting:
-            for event in pygame.event.get():
+            events = idle.wait_events()
+            for event in events:
                 if event.type == pygame.QUIT:
                     pygame.quit()
                     sys.exit()
@@ -461,6 +537,8 @@ class LevelEditor:
                     elif event.key == pygame.K_ESCAPE:
                         waiting = False
                         new_timer = current_timer
+            if not events:
+                continue
             
             # Redraw the dialog surface to clear previous text
             dialog_surface.fill(GRAY)
@@ -495,13 +573,35 @@ class LevelEditor:
     
     def run(self):
         """Main editor loop"""
+        self.restore_untitled_autosave()
+        # Nothing on screen changes without input, so wait for events and
+        # only redraw after some arrived
+        redraw = True
         while self.running:
+            if redraw:
+                self.screen.fill(BLACK)
+                self.draw_tilemap()
+                self.draw_heatmap()
+                if self.reachability:
+                    self.reachability.draw(self.screen)
+                self.draw_grid()
+                self.input.draw(self.screen)
+                self.draw_palette()
+                self.draw_status_bar()
+                pygame.display.flip()
+
             # Handle events
-            for event in pygame.event.get():
+            events = idle.wait_events()
+            redraw = self.input.active() or any(event.type != pygame.MOUSEMOTION for event in events)
+            for event in events:
                 if event.type == pygame.QUIT:
                     if self.confirm_discard_changes():
                         self.running = False
                 
+                elif event.type == REACHABILITY_READY:
+                    if self.reachability:
+                        self.reachability.collect()
+                
                 elif event.type == pygame.MOUSEBUTTONDOWN:
                     # Check if clicking on buttons
                     if hasattr(self, 'load_button_rect') and self.load_button_rect.collidepoint(event.pos):
@@ -518,27 +618,13 @@ class LevelEditor:
                         self.selected_tile_index = palette_index
                     else:
                         # Otherwise, place/erase tile
-                        grid_pos = self.get_tile_at_position(event.pos)
-                        if event.button == 1:  # Left click
-                            self.is_drawing = True
-                            self.place_tile(grid_pos, PALETTE_TILES[self.selected_tile_index]['tile'])
-                        elif event.button == 3:  # Right click
-                            self.is_erasing = True
-                            self.place_tile(grid_pos, AIR)
+                        self.input.mouse_down(event)
                 
                 elif event.type == pygame.MOUSEBUTTONUP:
-                    if event.button == 1:
-                        self.is_drawing = False
-                    elif event.button == 3:
-                        self.is_erasing = False
+                    self.input.mouse_up(event)
                 
                 elif event.type == pygame.MOUSEMOTION:
-                    # Continue drawing/erasing if mouse button is held
-                    grid_pos = self.get_tile_at_position(event.pos)
-                    if self.is_drawing:
-                        self.place_tile(grid_pos, PALETTE_TILES[self.selected_tile_index]['tile'])
-                    elif self.is_erasing:
-                        self.place_tile(grid_pos, AIR)
+                    self.input.mouse_motion(event)
                 
                 elif event.type == pygame.KEYDOWN:
                     if event.key == pygame.K_ESCAPE:
@@ -546,6 +632,10 @@ class LevelEditor:
                             self.running = False
                     elif event.key == pygame.K_g:
                         self.grid_visible = not self.grid_visible
+                    elif event.key == pygame.K_h:
+                        self.toggle_heatmap()
+                    elif event.key == pygame.K_o:
+                        self.toggle_reachability()
                     elif event.key == pygame.K_s:
                         self.save_level()
                     elif event.key == pygame.K_l:
@@ -555,27 +645,30 @@ class LevelEditor:
                         if self.confirm_discard_changes():
                             # Create a new empty level
                             self.create_new_level()
+                            self.update_heatmap()
                             self.modified = False
                     elif event.key == pygame.K_t:
                         # Edit the timer
                         self.edit_timer()
+                    else:
+                        self.input.key_down(event)
             
-            # Draw everything
-            self.screen.fill(BLACK)
-            self.draw_tilemap()
-            self.draw_grid()
-            self.draw_palette()
-            self.draw_status_bar()
-            
-            pygame.display.flip()
-            self.clock.tick(60)
-        
+            # All mouse motion of this frame becomes one edit
+            self.input.flush_stroke()
+            if self.reachability:
+                self.reachability.update_spawn(self.spawn_position())
+            self.autosave()
+        
+        if self.reachability:
+            self.reachability.close()
+        self.autosaver.shutdown()
         return False  # Return to main menu when done
 
 def run_level_editor(screen):
     """Entry point to run the level editor"""
     editor = LevelEditor(screen)
-    return editor.run()
+    with idle.measure_cpu("level editor"):
+        return editor.run()
 
 if __name__ == "__main__":
     # For testing the editor directly
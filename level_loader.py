@@ -0,0 +1,100 @@
+# level_loader.py
+import os
+from concurrent.futures import Future, ThreadPoolExecutor
+from game_state import Game
+from level_cache import load_level_cached
+from telemetry import level_name
+
+LEVELS_DIR = "levels"
+KEEP_LEVELS = 2  # the preloader keeps the snapshots of this many levels either side of the one being played
+
+def _file_mtime(filename):
+    try:
+        return os.stat(filename).st_mtime_ns
+    except OSError:
+        return None
+
+class LevelDirectory:
+    """Numbered levelNNN.lvl files in a directory"""
+
+    def __init__(self, directory=LEVELS_DIR):
+        self.directory = directory
+
+    def path(self, level_index):
+        return os.path.join(self.directory, f"level{level_index:03d}.lvl")
+
+    def exists(self, level_index):
+        return os.path.exists(self.path(level_index))
+
+    def name(self, level_index):
+        """The name telemetry files the level's events under"""
+        return level_name(self.path(level_index))
+
+    def version(self, level_index):
+        """The file's mtime changes whenever the level is edited"""
+        return _file_mtime(self.path(level_index))
+
+    def load(self, level_index):
+        return load_level_cached(self.path(level_index))
+
+def _completed(result):
+    future = Future()
+    future.set_result(result)
+    return future
+
+class LevelPreloader:
+    """Loads level snapshots on a background thread and keeps them for instant (re)starts
+
+    Levels come from a LevelDirectory by default, or from any source with the
+    same exists/version/load methods, such as a LevelPack. Only the levels
+    within KEEP_LEVELS of the last one played stay cached; the on-disk
+    LevelCache (or the pack's mapping) makes reloading any other one cheap.
+    """
+
+    def __init__(self, levels=None):
+        self.levels = levels or LevelDirectory()
+        self.executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="level-preloader")
+        # level index -> (level version when loaded, Future resolving to a LevelSnapshot)
+        self.snapshots = {}
+
+    def _is_current(self, level_index):
+        """A cached snapshot is only valid if the level was not edited since it was loaded"""
+        entry = self.snapshots.get(level_index)
+        return entry is not None and entry[0] == self.levels.version(level_index)
+
+    def prefetch(self, level_index):
+        """Start loading a level in the background unless it is already cached"""
+        if self._is_current(level_index) or not self.levels.exists(level_index):
+            return
+        version = self.levels.version(level_index)
+        self.snapshots[level_index] = (version, self.executor.submit(self.levels.load, level_index))
+
+    def warm(self, count, first_level=1):
+        """Queue the first `count` levels starting at `first_level`"""
+        for level_index in range(first_level, first_level + count):
+            self.prefetch(level_index)
+
+    def _trim(self, level_index):
+        """Forget the snapshots of levels far from `level_index`, cancelling their loads"""
+        for other in [other for other in self.snapshots if abs(other - level_index) > KEEP_LEVELS]:
+            self.snapshots.pop(other)[1].cancel()
+
+    def get_snapshot(self, level_index):
+        """Return the pristine snapshot of a level, loading it now if it is not cached"""
+        self._trim(level_index)
+        if self._is_current(level_index):
+            try:
+                return self.snapshots[level_index][1].result()
+            except OSError:
+                pass
+        version = self.levels.version(level_index)
+        snapshot = self.levels.load(level_index)
+        self.snapshots[level_index] = (version, _completed(snapshot))
+        return snapshot
+
+    def get(self, level_index):
+        """Return a fresh Game for the level, restored from its cached snapshot"""
+        return Game(self.get_snapshot(level_index))
+
+    def shutdown(self):
+        self.executor.shutdown(wait=False, cancel_futures=True)
@@ -0,0 +1,142 @@
+# level_pack.py
+"""Level pack archives: many levels in one memory-mapped file
+
+Layout (little endian):
+    header       magic, version, grid width, grid height, level count
+    index        one fixed-size entry per level, sorted by level id:
+                 level id, record offset, record length, timer seconds,
+                 diamond count, 16 byte content hash of the source level text
+    records      one GRID_WIDTH * GRID_HEIGHT byte tile record per level,
+                 holding the level's file characters (spawns included)
+
+Loading a level slices its record out of the mapping, so there is no file
+open and no text parse per level.
+
+Usage:
+    python level_pack.py build levels levels.pack
+    python level_pack.py extract levels.pack extracted_levels
+"""
+import argparse
+import glob
+import mmap
+import os
+import re
+import struct
+from constants import GRID_WIDTH, GRID_HEIGHT
+from level_parser import load_level, snapshot_from_buffer, raw_buffer, content_hash, format_timer
+
+PACK_MAGIC = b'CUPK'
+PACK_VERSION = 1
+
+_HEADER = struct.Struct('<4sBHHI')
+_ENTRY = struct.Struct('<IQIIH16s')
+
+_LEVEL_FILE_PATTERN = re.compile(r'level(\d+)\.lvl$')
+
+def level_id_from_path(filename):
+    """Return the number of a `levelNNN.lvl` file, or None for other names"""
+    match = _LEVEL_FILE_PATTERN.search(os.path.basename(filename))
+    return int(match.group(1)) if match else None
+
+def build_pack(level_dir, pack_filename):
+    """Pack every levelNNN.lvl file in a directory. Returns the number of levels"""
+    levels = []
+    for filename in glob.glob(os.path.join(level_dir, '*.lvl')):
+        level_id = level_id_from_path(filename)
+        if level_id is None:
+            continue
+        with open(filename, 'rb') as f:
+            digest = content_hash(f.read())
+        levels.append((level_id, load_level(filename), digest))
+    levels.sort(key=lambda level: level[0])
+
+    record_size = GRID_WIDTH * GRID_HEIGHT
+    offset = _HEADER.size + _ENTRY.size * len(levels)
+    with open(pack_filename, 'wb') as f:
+        f.write(_HEADER.pack(PACK_MAGIC, PACK_VERSION, GRID_WIDTH, GRID_HEIGHT, len(levels)))
+        for i, (level_id, snapshot, digest) in enumerate(levels):
+            f.write(_ENTRY.pack(level_id, offset + i * record_size, record_size,
+                                snapshot.timer_seconds, snapshot.diamond_count, digest))
+        for _, snapshot, _ in levels:
+            f.write(raw_buffer(snapshot))
+    return len(levels)
+
+class LevelPack:
+    """Read-only access to a level pack through a memory mapping"""
+
+    def __init__(self, pack_filename):
+        self.filename = pack_filename
+        with open(pack_filename, 'rb') as f:
+            self.data = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+        magic, version, width, height, count = _HEADER.unpack_from(self.data)
+        if magic != PACK_MAGIC or version != PACK_VERSION:
+            raise ValueError(f"{pack_filename} is not a supported level pack")
+        if (width, height) != (GRID_WIDTH, GRID_HEIGHT):
+            raise ValueError(f"{pack_filename} holds {width}x{height} levels, expected {GRID_WIDTH}x{GRID_HEIGHT}")
+
+        # level id -> (offset, length, timer seconds, diamond count, content hash)
+        self.index = {}
+        index_end = _HEADER.size + _ENTRY.size * count
+        for level_id, *entry in _ENTRY.iter_unpack(self.data[_HEADER.size:index_end]):
+            self.index[level_id] = tuple(entry)
+
+    def level_ids(self):
+        return sorted(self.index)
+
+    def exists(self, level_id):
+        return level_id in self.index
+
+    def name(self, level_id):
+        """The name telemetry files the level's events under, kept apart from the levels directory's"""
+        return f"{os.path.basename(self.filename)}:level{level_id:03d}.lvl"
+
+    def version(self, level_id):
+        """The content hash identifies a level's version inside the pack"""
+        return self.index[level_id][4]
+
+    def record(self, level_id):
+        offset, length = self.index[level_id][:2]
+        return self.data[offset:offset + length]
+
+    def load(self, level_id):
+        """Return the LevelSnapshot of a level"""
+        timer_seconds = self.index[level_id][2]
+        return snapshot_from_buffer(self.record(level_id), timer_seconds, f"{self.filename}:{level_id}")
+
+    def extract(self, output_dir):
+        """Write every level back out as a levelNNN.lvl text file"""
+        os.makedirs(output_dir, exist_ok=True)
+        for level_id in self.level_ids():
+            record = self.record(level_id).decode('ascii')
+            rows = [record[y * GRID_WIDTH:(y + 1) * GRID_WIDTH] for y in range(GRID_HEIGHT)]
+            filename = os.path.join(output_dir, f"level{level_id:03d}.lvl")
+            with open(filename, 'w') as f:
+                f.write(format_timer(self.index[level_id][2]) + '\n')
+                f.write('\n'.join(rows) + '\n')
+
+    def close(self):
+        self.data.close()
+
+def main():
+    parser = argparse.ArgumentParser(description='Build or extract Climb Up level packs')
+    commands = parser.add_subparsers(dest='command', required=True)
+    build = commands.add_parser('build', help='Pack the levelNNN.lvl files of a directory')
+    build.add_argument('level_dir')
+    build.add_argument('pack')
+    extract = commands.add_parser('extract', help='Write the levels of a pack back to .lvl files')
+    extract.add_argument('pack')
+    extract.add_argument('output_dir')
+    args = parser.parse_args()
+
+    if args.command == 'build':
+        count = build_pack(args.level_dir, args.pack)
+        print(f"Packed {count} levels into {args.pack}")
+    else:
+        pack = LevelPack(args.pack)
+        pack.extract(args.output_dir)
+        print(f"Extracted {len(pack.index)} levels to {args.output_dir}")
+        pack.close()
+
+if __name__ == "__main__":
+    main()
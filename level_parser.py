@@ -0,0 +1,260 @@
+# level_parser.py
+import hashlib
+import io
+import os
+import stat
+import tempfile
+import threading
+from collections import namedtuple
+from constants import *
+
+# File format character mappings
+FILE_CHAR_AIR = ' '
+FILE_CHAR_EARTH = '='
+FILE_CHAR_STONE = '*'
+FILE_CHAR_LADDER = '#'
+FILE_CHAR_DIAMOND = 'v'
+FILE_CHAR_PLAYER = 'P'
+FILE_CHAR_OPPONENT = 'O'
+FILE_CHAR_EXIT = 'E'
+
+# Mapping from tile types to file characters
+TILE_TO_CHAR = {
+    AIR: FILE_CHAR_AIR,
+    EARTH: FILE_CHAR_EARTH,
+    STONE: FILE_CHAR_STONE,
+    LADDER: FILE_CHAR_LADDER,
+    DIAMOND: FILE_CHAR_DIAMOND,
+    PLAYER: FILE_CHAR_PLAYER,
+    OPPONENT: FILE_CHAR_OPPONENT,
+    EXIT: FILE_CHAR_EXIT
+}
+
+# Mapping from file characters to tile types
+CHAR_TO_TILE = {char: tile for tile, char in TILE_TO_CHAR.items()}
+
+DEFAULT_TIMER_SECONDS = 120  # 02:00
+
+# Pristine, immutable state of a freshly loaded level. `tiles` is the tile
+# buffer (bytes, one byte per cell) with the player and opponent spawn tiles
+# already turned into air, so restoring a level is a single buffer copy plus
+# creating the characters.
+LevelSnapshot = namedtuple(
+    'LevelSnapshot',
+    ['name', 'tiles', 'player_spawn', 'opponent_spawns', 'diamond_count', 'timer_seconds',
+     'diamond_positions', 'errors'],
+    defaults=((), ()),
+)
+
+# A validation problem found while parsing; line and column are 1-based and
+# `check` names the kind of problem ("timer", "dimensions", "characters", "player")
+LevelError = namedtuple('LevelError', ['line', 'column', 'message', 'check'], defaults=(None,))
+
+_VALID_CHARS = frozenset(CHAR_TO_TILE)
+
+# Translation table from file bytes to tile buffer bytes: spawns become air
+# (they are returned separately) and unknown characters become air
+_TILE_TABLE = bytearray(ord(AIR) for _ in range(256))
+for _char, _tile in CHAR_TO_TILE.items():
+    if _tile not in (PLAYER, OPPONENT):
+        _TILE_TABLE[ord(_char)] = ord(_tile)
+_TILE_TABLE = bytes(_TILE_TABLE)
+
+# Translation table from tile buffer bytes to file bytes; unknown tiles are saved as air
+_FILE_TABLE = bytearray(ord(FILE_CHAR_AIR) for _ in range(256))
+for _tile, _char in TILE_TO_CHAR.items():
+    _FILE_TABLE[ord(_tile)] = ord(_char)
+_FILE_TABLE = bytes(_FILE_TABLE)
+
+def parse_timer(line):
+    """Return the timer in seconds for a `mm:ss` line, or None if it is not a timer line"""
+    parts = line.strip().split(':')
+    if len(parts) == 2 and all(part.isdigit() for part in parts):
+        return int(parts[0]) * 60 + int(parts[1])
+    return None
+
+def format_timer(seconds):
+    """Format a timer in seconds as the mm:ss first line of a level file"""
+    return f"{int(seconds) // 60:02d}:{int(seconds) % 60:02d}"
+
+def format_grid(tiles, player_spawn=None, opponent_spawns=()):
+    """Return the rows of a level file (bytes) for a tile buffer, with the spawns put in
+
+    The whole buffer is translated at once and each row is a slice of it,
+    so this takes microseconds and is safe to call every frame.
+    """
+    raw = bytearray(bytes(tiles).translate(_FILE_TABLE))
+    height = len(raw) // GRID_WIDTH
+    if player_spawn:
+        x, y = player_spawn
+        if 0 <= x < GRID_WIDTH and 0 <= y < height:
+            raw[y * GRID_WIDTH + x] = ord(FILE_CHAR_PLAYER)
+    for x, y in opponent_spawns:
+        if 0 <= x < GRID_WIDTH and 0 <= y < height:
+            raw[y * GRID_WIDTH + x] = ord(FILE_CHAR_OPPONENT)
+    return b''.join(raw[y * GRID_WIDTH:(y + 1) * GRID_WIDTH] + b'\n' for y in range(height))
+
+def format_level(tiles, timer_seconds, player_spawn=None, opponent_spawns=()):
+    """Return the complete contents of a level file (bytes)"""
+    return (format_timer(timer_seconds) + '\n').encode('ascii') + format_grid(tiles, player_spawn, opponent_spawns)
+
+_umask = None
+_umask_lock = threading.Lock()
+
+def _new_file_mode(filename):
+    """The permissions write_atomic gives a file instead of mkstemp's private ones
+
+    A file being replaced keeps its mode; a new one gets the usual 0o666
+    less the umask. The umask can only be read by setting it, so that is
+    done once, under a lock, rather than on every write.
+    """
+    try:
+        return stat.S_IMODE(os.stat(filename).st_mode)
+    except OSError:
+        pass
+    global _umask
+    with _umask_lock:
+        if _umask is None:
+            _umask = os.umask(0o022)
+            os.umask(_umask)
+    return 0o666 & ~_umask
+
+def write_atomic(filename, data):
+    """Write bytes to a file so that it holds either its old or its new contents, never a part
+
+    The data goes to a uniquely named temporary file next to it first, which
+    then replaces the file in one step, so concurrent writers never share a
+    temporary file.
+    """
+    fd, temp_filename = tempfile.mkstemp(dir=os.path.dirname(filename) or '.',
+                                         prefix=os.path.basename(filename) + '.', suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            f.write(data)
+            f.flush()
+            os.fsync(f.fileno())
+        os.chmod(temp_filename, _new_file_mode(filename))
+        os.replace(temp_filename, filename)
+    except BaseException:
+        os.unlink(temp_filename)
+        raise
+
+def _positions(buffer, char):
+    """Return (x, y) positions of every occurrence of char in the level buffer"""
+    positions = []
+    index = buffer.find(char)
+    while index != -1:
+        positions.append((index % GRID_WIDTH, index // GRID_WIDTH))
+        index = buffer.find(char, index + 1)
+    return positions
+
+def parse_level(text, name=None):
+    """Parse level file text in a single pass
+
+    Returns a LevelSnapshot holding the tile buffer (spawn tiles turned into
+    air), the player and opponent spawns, diamond count and positions, the
+    timer and a tuple of LevelErrors. Parsing is lenient like the game has
+    always been: short lines and missing rows are padded with air, unknown
+    characters become air and a malformed timer falls back to the default,
+    but each of these problems is reported in `errors`.
+    """
+    lines = text.split('\n')
+    if lines and lines[-1] == '':
+        lines.pop()
+    errors = []
+    timer_seconds = DEFAULT_TIMER_SECONDS
+    first_line = 1
+
+    # The first line may hold the timer in mm:ss format
+    if lines and ':' in lines[0]:
+        timer = parse_timer(lines[0])
+        if timer is not None:
+            timer_seconds = timer
+            lines = lines[1:]
+            first_line = 2
+        else:
+            errors.append(LevelError(1, 1, f"malformed timer line {lines[0].strip()!r}, expected mm:ss", "timer"))
+
+    # Rows beyond the grid are only a problem if they contain anything
+    while len(lines) > GRID_HEIGHT and not lines[-1].strip():
+        lines.pop()
+    if len(lines) != GRID_HEIGHT:
+        errors.append(LevelError(first_line + min(len(lines), GRID_HEIGHT), 1,
+                                 f"level has {len(lines)} rows, expected {GRID_HEIGHT}", "dimensions"))
+
+    rows = []
+    for y, line in enumerate(lines[:GRID_HEIGHT]):
+        line = line.rstrip('\r')
+        if len(line) > GRID_WIDTH:
+            if line[GRID_WIDTH:].strip():
+                errors.append(LevelError(first_line + y, GRID_WIDTH + 1,
+                                         f"row is {len(line.rstrip())} columns wide, expected {GRID_WIDTH}",
+                                         "dimensions"))
+            line = line[:GRID_WIDTH]
+        elif len(line) < GRID_WIDTH:
+            line = line.ljust(GRID_WIDTH)
+        if not _VALID_CHARS.issuperset(line):
+            for x, char in enumerate(line):
+                if char not in _VALID_CHARS:
+                    errors.append(LevelError(first_line + y, x + 1, f"unknown tile character {char!r}", "characters"))
+        rows.append(line)
+    rows.extend(FILE_CHAR_AIR * GRID_WIDTH for _ in range(GRID_HEIGHT - len(rows)))
+
+    raw = ''.join(rows).encode('ascii', 'replace')
+    return snapshot_from_buffer(raw, timer_seconds, name, errors, first_line)
+
+def snapshot_from_buffer(raw, timer_seconds, name=None, errors=None, first_line=1):
+    """Build a LevelSnapshot from a raw level buffer that still contains the spawn tiles
+
+    `raw` holds GRID_WIDTH * GRID_HEIGHT file characters as bytes. Only C-level
+    scans are used here, so this is cheap enough to run for every level load.
+    """
+    errors = list(errors or [])
+    player_spawns = _positions(raw, ord(FILE_CHAR_PLAYER))
+    if not player_spawns:
+        errors.append(LevelError(first_line, 1, "level has no player (P)", "player"))
+    for x, y in player_spawns[:-1]:
+        errors.append(LevelError(first_line + y, x + 1, "duplicate player (P); the last one is used", "player"))
+    diamond_positions = _positions(raw, ord(FILE_CHAR_DIAMOND))
+
+    return LevelSnapshot(
+        name=name,
+        tiles=bytes(raw).translate(_TILE_TABLE),
+        player_spawn=player_spawns[-1] if player_spawns else None,
+        opponent_spawns=tuple(_positions(raw, ord(FILE_CHAR_OPPONENT))),
+        diamond_count=len(diamond_positions),
+        timer_seconds=timer_seconds,
+        diamond_positions=tuple(diamond_positions),
+        errors=tuple(sorted(errors)),
+    )
+
+def raw_buffer(snapshot):
+    """Return a snapshot's tile buffer with the spawn tiles put back (the inverse of snapshot_from_buffer)"""
+    raw = bytearray(snapshot.tiles)
+    for x, y in snapshot.opponent_spawns:
+        raw[y * GRID_WIDTH + x] = ord(FILE_CHAR_OPPONENT)
+    if snapshot.player_spawn:
+        x, y = snapshot.player_spawn
+        raw[y * GRID_WIDTH + x] = ord(FILE_CHAR_PLAYER)
+    return bytes(raw)
+
+def content_hash(data):
+    """Short digest identifying the content of a level file"""
+    return hashlib.blake2b(data, digest_size=16).digest()
+
+def parse_grid(rows, name=None):
+    """Parse rows of tile characters (e.g. a grid built in the editor)"""
+    return parse_level('\n'.join(''.join(row) for row in rows), name)
+
+def decode_level(data):
+    """Decode the bytes of a level file exactly as reading it in text mode does
+
+    That is the locale encoding with undecodable bytes replaced and universal
+    newlines, so a level parses the same whether it came from disk or a cache.
+    """
+    return io.TextIOWrapper(io.BytesIO(data), errors='replace').read()
+
+def load_level(filename):
+    """Read and parse a level file into a LevelSnapshot"""
+    with open(filename, 'rb') as f:
+        return parse_level(decode_level(f.read()), filename)
@@ -0,0 +1,131 @@
+# lint_levels.py
+"""Check level files for the problems the game silently works around
+
+Every .lvl file under a directory (recursively) is checked for:
+    timer        a first line that is not a valid mm:ss timer, or a zero timer
+    dimensions   a grid other than GRID_WIDTH x GRID_HEIGHT
+    characters   unknown characters, which load as air
+    player       no player (P), or more than one
+    opponents    fewer than MIN_OPPONENTS opponents, the PRD's minimum
+    diamonds     diamonds the player cannot reach from P, even by digging
+                 (see reachability.py)
+Files are spread over a process pool in chunks, so large collections of
+levels take seconds. Problems are printed as file:line:column lines and can
+also be written as a JSON report. The exit status is 1 if any level has a
+problem.
+
+Usage:
+    python lint_levels.py levels --json lint.json
+"""
+import argparse
+import glob
+import json
+import multiprocessing
+import os
+import sys
+import time
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+from constants import *
+from level_parser import LevelError, parse_level, parse_timer
+from reachability import reachable_from
+from tile_grid import TileGrid
+
+MIN_OPPONENTS = 2
+CHECKS = ("file", "timer", "dimensions", "characters", "player", "opponents", "diamonds")
+
+CHUNK_FILES = 200    # files per task sent to a worker process
+SERIAL_FILES = 200   # fewer files than this are checked without starting a pool
+
+def lint_text(text, name=None):
+    """Return the LevelErrors of a level file's contents, sorted by position"""
+    snapshot = parse_level(text, name)
+    errors = list(snapshot.errors)
+    timer_line = text.split('\n', 1)[0]
+    timer = parse_timer(timer_line)
+    first_line = 1 if timer is None else 2
+    if timer is not None:
+        minutes, seconds = timer_line.strip().split(':')
+        if timer == 0:
+            errors.append(LevelError(1, 1, "timer is zero, the level is lost at once", "timer"))
+        elif int(seconds) >= 60:
+            errors.append(LevelError(1, len(minutes) + 2, f"timer seconds {seconds} are not below 60", "timer"))
+
+    opponents = len(snapshot.opponent_spawns)
+    if opponents < MIN_OPPONENTS:
+        errors.append(LevelError(first_line, 1, f"level has {opponents} opponents, at least {MIN_OPPONENTS} expected",
+                                 "opponents"))
+
+    if snapshot.player_spawn:
+        reachable = reachable_from(TileGrid(snapshot.tiles), snapshot.player_spawn)
+        for x, y in snapshot.diamond_positions:
+            if (x, y) not in reachable:
+                errors.append(LevelError(first_line + y, x + 1, "diamond cannot be reached from the player", "diamonds"))
+    return sorted(errors)
+
+def lint_file(filename):
+    """Return the LevelErrors of a level file"""
+    try:
+        # Read the way level_parser.load_level does, so bad bytes show up as unknown characters
+        with open(filename, 'r', errors='replace') as f:
+            text = f.read()
+    except OSError as error:
+        return [LevelError(1, 1, f"cannot read the file: {error.strerror}", "file")]
+    return lint_text(text, filename)
+
+def lint_files(filenames):
+    """Check a chunk of files in a worker. Returns [(filename, errors)]"""
+    return [(filename, [tuple(error) for error in lint_file(filename)]) for filename in filenames]
+
+def lint(filenames, processes=None):
+    """Check level files. Returns [(filename, [LevelError])] in the order given"""
+    if processes == 1 or len(filenames) < SERIAL_FILES:
+        results = lint_files(filenames)
+    else:
+        chunks = [filenames[first:first + CHUNK_FILES] for first in range(0, len(filenames), CHUNK_FILES)]
+        # Spawned rather than forked, like the other worker pools
+        with ProcessPoolExecutor(max_workers=processes, mp_context=multiprocessing.get_context("spawn")) as executor:
+            results = [result for chunk in executor.map(lint_files, chunks) for result in chunk]
+    return [(filename, [LevelError(*error) for error in errors]) for filename, errors in results]
+
+def build_report(results, seconds):
+    """The machine-readable report: totals per check and the problems of every level that has any"""
+    counts = Counter(error.check for _, errors in results for error in errors)
+    return {
+        'files': len(results),
+        'files_with_problems': sum(1 for _, errors in results if errors),
+        'seconds': round(seconds, 2),
+        'problems_per_check': {check: counts[check] for check in CHECKS if counts[check]},
+        'levels': [
+            {'level': filename,
+             'problems': [{'check': error.check, 'line': error.line, 'column': error.column, 'message': error.message}
+                          for error in errors]}
+            for filename, errors in results if errors
+        ],
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description='Check Climb Up level files for problems')
+    parser.add_argument('level_dir', nargs='?', default='levels')
+    parser.add_argument('--processes', type=int, default=None, help='Worker processes (default: one per CPU)')
+    parser.add_argument('--json', default=None, help='Also write the report to this JSON file')
+    parser.add_argument('--quiet', action='store_true', help='Only print the summary')
+    args = parser.parse_args()
+
+    started = time.perf_counter()
+    filenames = sorted(glob.glob(os.path.join(args.level_dir, '**', '*.lvl'), recursive=True))
+    results = lint(filenames, args.processes)
+    report = build_report(results, time.perf_counter() - started)
+    if not args.quiet:
+        for filename, errors in results:
+            for error in errors:
+                print(f"{filename}:{error.line}:{error.column}: [{error.check}] {error.message}")
+    print(f"Checked {report['files']} levels in {report['seconds']} s: "
+          f"{report['files_with_problems']} with problems {report['problems_per_check']}")
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump(report, f, indent=2)
+    return 1 if report['files_with_problems'] else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,164 @@
+# lookahead_ai.py
+"""Monte Carlo lookahead for opponents (hard difficulty)
+
+For each candidate move an opponent could make now (the greedy AI's choice
+and each single key), short rollouts play the
+game forward on a SimGame: the player picks random moves and holds each one
+for a while, and after committing to the candidate for one tile the opponent
+continues greedily. A catch scores more the sooner it happens; a rollout
+without one scores nothing. Distance is deliberately left out: it ignores
+walls and drops, and made opponents wait on ledges rather than fall further
+away for a moment. So opponents chase greedily until a catch is within the
+horizon, then take the move that cuts off most of the player's escapes.
+
+Rollouts run on a process pool, one task per opponent, and plug into the
+AIScheduler like an AIWorker.
+"""
+import multiprocessing
+import os
+import random
+import threading
+from concurrent.futures import Future, ProcessPoolExecutor
+from constants import *
+from ai_worker import AIWorker
+from greedy_ai import decide_keys
+from opponent import Opponent
+from sim import (SimCharacter, SimGame, sim_keys, NO_KEYS,
+                 SIM_KEY_LEFT, SIM_KEY_RIGHT, SIM_KEY_UP, SIM_KEY_DOWN)
+from tile_grid import TileGrid
+
+# Moves the simulated player picks from, and the opponent besides the greedy choice
+CANDIDATE_MOVES = ((), (SIM_KEY_LEFT,), (SIM_KEY_RIGHT,), (SIM_KEY_UP,), (SIM_KEY_DOWN,))
+_MOVE_KEYS = [sim_keys(move) for move in CANDIDATE_MOVES]
+
+# The opponent commits to its candidate move for one tile before turning greedy
+COMMIT_FRAMES = TILE_SIZE // MOVE_SPEED
+# The simulated player holds each random move for this many frames
+PLAYER_HOLD_FRAMES = (TILE_SIZE // 2, TILE_SIZE * 2)
+
+_SIM_TO_GAME_KEY = {
+    SIM_KEY_LEFT: Opponent.KEY_LEFT,
+    SIM_KEY_RIGHT: Opponent.KEY_RIGHT,
+    SIM_KEY_UP: Opponent.KEY_UP,
+    SIM_KEY_DOWN: Opponent.KEY_DOWN,
+}
+
+def rollout(sim, move_keys, depth, rng):
+    """Play one random future in which the first opponent starts with `move_keys`. Returns its score"""
+    sim = sim.copy()
+    player_keys, hold = NO_KEYS, 0
+    for frame in range(depth):
+        if hold == 0:
+            player_keys = rng.choice(_MOVE_KEYS)
+            hold = rng.randint(*PLAYER_HOLD_FRAMES)
+        hold -= 1
+        sim.step(player_keys, [move_keys] if frame < COMMIT_FRAMES else None)
+        if sim.check_game_over():
+            # Caught, or the player fell to their death
+            return 1.0 + (depth - frame) / depth
+    return 0.0
+
+def best_move(sim, rollouts=LOOKAHEAD_ROLLOUTS, depth=LOOKAHEAD_DEPTH, seed=None):
+    """Return the keys (a tuple of SIM_KEY_* flags) the first opponent should press
+
+    The candidates are the greedy AI's choice, which wins ties, and the
+    single-key moves. Every candidate plays against the same random player
+    futures, so the scores differ only by the opponent's choice.
+    """
+    candidates = [sim.greedy_keys(sim.opponents[0])]
+    candidates += [keys for keys in _MOVE_KEYS if keys != candidates[0]]
+    per_move = max(1, rollouts // len(candidates))
+    rng = random.Random(seed)
+    futures = [rng.random() for _ in range(per_move)]
+    scores = [sum(rollout(sim, keys, depth, random.Random(future)) for future in futures) for keys in candidates]
+    return candidates[scores.index(max(scores))]
+
+# The last grid a pool process planned on, reused while the tiles stay the same
+_process_grid = None
+
+def _plan_in_process(tiles, player, opponent, rollouts, depth, seed):
+    global _process_grid
+    if _process_grid is None or _process_grid.tiles != tiles:
+        _process_grid = TileGrid(tiles)
+        _process_grid.ladder_index()
+    sim = SimGame(_process_grid.copy(), SimCharacter(*player), [SimCharacter(*opponent)])
+    return best_move(sim, rollouts, depth, seed)
+
+def _character_state(character):
+    return (character.rect.x, character.rect.y, character.vx, character.vy, character.facing, character.state)
+
+class LookaheadWorker(AIWorker):
+    """AIWorker that plans opponents near the player with Monte Carlo lookahead
+
+    Each opponent within LOOKAHEAD_RANGE tiles becomes one pool task that
+    simulates only that opponent and the player; farther opponents get the
+    greedy plan right away. The rollouts are split among the opponents in
+    range so that a batch costs about as much as one decision and fits in
+    the LOOKAHEAD_PATIENCE frames a batch may take before the greedy AI
+    takes over.
+    """
+
+    def __init__(self, processes=None, rollouts=LOOKAHEAD_ROLLOUTS, depth=LOOKAHEAD_DEPTH,
+                 patience=LOOKAHEAD_PATIENCE):
+        self.processes = processes or max(1, (os.cpu_count() or 2) - 1)
+        self.rollouts = rollouts
+        self.depth = depth
+        self.seed = 0
+        super().__init__("lookahead", patience)
+
+    def _create_executor(self):
+        executor = ProcessPoolExecutor(max_workers=self.processes, mp_context=multiprocessing.get_context("spawn"))
+        # Start the processes while the menu is showing
+        for _ in range(self.processes):
+            executor.submit(int)
+        return executor
+
+    def _rollouts_per_task(self, tasks):
+        """Rollouts per opponent so a batch of `tasks` opponents takes as long as one
+
+        Each process gets about tasks / processes opponents, so the rollouts are
+        split among them, down to one per candidate move.
+        """
+        tasks_per_process = -(-tasks // self.processes)
+        return max(len(CANDIDATE_MOVES), self.rollouts // max(1, tasks_per_process))
+
+    def _start(self, opponents, player, tilemap, requests):
+        results = [None] * len(requests)
+        batch = Future()
+        near = []
+        for index, (opponent, (opponent_position, player_position)) in enumerate(zip(opponents, requests)):
+            distance = abs(opponent_position[0] - player_position[0]) + abs(opponent_position[1] - player_position[1])
+            if distance > LOOKAHEAD_RANGE:
+                results[index] = decide_keys(opponent_position, player_position, tilemap, Opponent)
+            else:
+                near.append((index, opponent))
+
+        tasks = []
+        tiles = bytes(tilemap.tiles)
+        player_state = _character_state(player)
+        rollouts = self._rollouts_per_task(len(near))
+        for index, opponent in near:
+            self.seed += 1
+            task = self.executor.submit(_plan_in_process, tiles, player_state, _character_state(opponent),
+                                        rollouts, self.depth, self.seed)
+            tasks.append((index, task))
+
+        remaining = [len(tasks)]
+        lock = threading.Lock()
+        def finished(index, task):
+            try:
+                keys = frozenset(key for code, key in _SIM_TO_GAME_KEY.items() if task.result()[code])
+            except Exception:
+                keys = None  # planned greedily by the scheduler instead
+            with lock:
+                results[index] = keys
+                remaining[0] -= 1
+                done = remaining[0] == 0
+            if done:
+                batch.set_result(results)
+
+        if not tasks:
+            batch.set_result(results)
+        for index, task in tasks:
+            task.add_done_callback(lambda task, index=index: finished(index, task))
+        return batch
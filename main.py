@@ -1,12 +1,22 @@
 # main.py
+import os
 import pygame
 import sys
 import argparse
-import os
 from constants import *
-from game_state import Game, STATUS_BAR_HEIGHT
+from game_state import STATUS_BAR_HEIGHT
 from level_editor import run_level_editor
 from debug_overlay import draw_debug_overlay
+from level_loader import LevelPreloader, LevelDirectory
+from level_pack import LevelPack, level_id_from_path
+from level_browser import browse_levels, browse_pack
+from rewind import RewindBuffer
+from quicksave import QuickSaver, read_state
+from telemetry import Telemetry
+import idle
+from ai_scheduler import AIScheduler
+from ai_worker import AIWorker, WORKER_MODES
+from lookahead_ai import LookaheadWorker
 
 # Colors
 BLACK = (0, 0, 0)
@@ -42,31 +52,40 @@ def show_message(screen, text, subtext=None, wait_for_input=True, clear=False):
     pygame.display.flip()
 
     if wait_for_input:
-        waiting = True
-        while waiting:
-            for event in pygame.event.get():
+        with idle.measure_cpu(f"message '{text}'"):
+            waiting = True
+            while waiting:
+                for event in idle.wait_events():
+                    if event.type == pygame.QUIT:
+                        pygame.quit()
+                        sys.exit()
+                    elif event.type == pygame.KEYDOWN:
+                        if event.key == pygame.K_RETURN:
+                            waiting = False
+
+def wait_for_key():
+    """Wait for any key press and return the key that was pressed"""
+    with idle.measure_cpu("wait for key"):
+        while True:
+            for event in idle.wait_events():
                 if event.type == pygame.QUIT:
                     pygame.quit()
                     sys.exit()
                 elif event.type == pygame.KEYDOWN:
-                    if event.key == pygame.K_RETURN:
-                        waiting = False
-
-def wait_for_key():
-    """Wait for any key press and return the key that was pressed"""
-    waiting = True
-    while waiting:
-        for event in pygame.event.get():
-            if event.type == pygame.QUIT:
-                pygame.quit()
-                sys.exit()
-            elif event.type == pygame.KEYDOWN:
-                waiting = False
-                return event.key
+                    return event.key
 
 def parse_arguments():
     parser = argparse.ArgumentParser(description='Climb Up - A puzzle platformer game')
     parser.add_argument('--level', type=int, default=None, help='Starting level number')
+    parser.add_argument('--preload', type=int, default=2, help='Number of levels to prepare in the background at startup')
+    parser.add_argument('--pack', default=None, help='Play the levels of a level pack instead of the levels directory')
+    parser.add_argument('--load-state', default=None, help='Start from a quick-save file')
+    parser.add_argument('--autosave', type=float, default=0, help='Quick-save every N seconds while playing (0 = off)')
+    parser.add_argument('--ai-budget', type=float, default=AI_BUDGET_MS, help='Milliseconds per frame opponents may spend planning')
+    parser.add_argument('--ai-worker', choices=WORKER_MODES, default=None, help='Plan opponents on a worker thread or process')
+    parser.add_argument('--difficulty', choices=['normal', 'hard'], default='normal', help='Hard makes opponents near the player plan with Monte Carlo lookahead')
+    parser.add_argument('--no-telemetry', action='store_true', help='Do not record where players die, stall and dig')
+    parser.add_argument('--cpu-stats', action='store_true', help='Print the CPU usage of menus and other idle screens')
     return parser.parse_args()
 
 def draw_menu(screen, menu_items, selected_index):
@@ -110,59 +129,22 @@ def draw_menu(screen, menu_items, selected_index):
     
     return menu_rects
 
-def get_level_input(screen):
-    # Draw input prompt
-    screen.fill(BLACK)
-    font = pygame.font.SysFont(None, 48)
-    prompt = font.render("Enter Level Number:", True, WHITE)
-    prompt_rect = prompt.get_rect(center=(SCREEN_WIDTH // 2, SCREEN_HEIGHT // 3))
-    screen.blit(prompt, prompt_rect)
-    
-    # Input box
-    input_box = pygame.Rect(SCREEN_WIDTH // 2 - 100, SCREEN_HEIGHT // 2, 200, 50)
-    pygame.draw.rect(screen, WHITE, input_box, 2)
-    
-    # Instructions
-    font_small = pygame.font.SysFont(None, 24)
-    instructions = font_small.render("Press ENTER when done, ESC to cancel", True, GRAY)
-    instructions_rect = instructions.get_rect(center=(SCREEN_WIDTH // 2, SCREEN_HEIGHT // 2 + 100))
-    screen.blit(instructions, instructions_rect)
-    
-    pygame.display.flip()
-    
-    # Text input handling
-    input_text = ""
-    active = True
-    
-    while active:
-        for event in pygame.event.get():
-            if event.type == pygame.QUIT:
-                pygame.quit()
-                sys.exit()
-            elif event.type == pygame.KEYDOWN:
-                if event.key == pygame.K_RETURN:
-                    try:
-                        level = int(input_text)
-                        return level
-                    except ValueError:
-                        # Invalid input, show error
-                        error_text = font_small.render("Please enter a valid number", True, (255, 0, 0))
-                        screen.blit(error_text, (input_box.x, input_box.y + 60))
-                        pygame.display.flip()
-                elif event.key == pygame.K_ESCAPE:
-                    return None
-                elif event.key == pygame.K_BACKSPACE:
-                    input_text = input_text[:-1]
-                elif event.unicode.isdigit() and len(input_text) < 3:  # Limit to 3 digits
-                    input_text += event.unicode
-        
-        # Redraw input box and text
-        pygame.draw.rect(screen, BLACK, (input_box.x + 2, input_box.y + 2, input_box.width - 4, input_box.height - 4))
-        text_surface = font.render(input_text, True, WHITE)
-        screen.blit(text_surface, (input_box.x + 10, input_box.y + 10))
-        pygame.display.flip()
-        
-        pygame.time.delay(50)  # Small delay to prevent high CPU usage
+def choose_level(screen, levels):
+    """Pick a level of the active LevelDirectory or LevelPack in the level browser
+
+    Returns its number, or None if cancelled or the picked file is not a
+    numbered levelNNN.lvl file, which the game cannot play in sequence.
+    """
+    if isinstance(levels, LevelPack):
+        return browse_pack(screen, levels)
+    filename = browse_levels(screen, levels.directory)
+    if filename is None:
+        return None
+    level_id = level_id_from_path(filename)
+    if level_id is None:
+        show_message(screen, f"{os.path.basename(filename)} is not a numbered level",
+                     "Only levelNNN.lvl files can be played", clear=True)
+    return level_id
 
 # Game status bar height is now defined in game_state.py
 
@@ -207,75 +189,86 @@ def draw_game_info(screen, game):
     diamond_rect = diamond_text.get_rect(midleft=(diamond_x + diamond_size, STATUS_BAR_HEIGHT // 2))
     screen.blit(diamond_text, diamond_rect)
 
-def main_menu(screen):
+def main_menu(screen, levels):
     menu_items = ["Start Game", "Start at Level", "Level Editor", "Quit"]
     selected_index = 0
+    # The menu only changes in response to events, so it is drawn once here
+    # and redrawn by the handlers below instead of on every pass
+    menu_rects = draw_menu(screen, menu_items, selected_index)
     
-    while True:
-        menu_rects = draw_menu(screen, menu_items, selected_index)
-        
-        for event in pygame.event.get():
-            if event.type == pygame.QUIT:
-                pygame.quit()
-                sys.exit()
-            elif event.type == pygame.MOUSEMOTION:
-                # Highlight menu item when mouse hovers over it
-                for i, rect in enumerate(menu_rects):
-                    if rect.collidepoint(event.pos):
-                        if selected_index != i:
-                            selected_index = i
-                            menu_rects = draw_menu(screen, menu_items, selected_index)
-                        break
-            elif event.type == pygame.MOUSEBUTTONDOWN:
-                if event.button == 1:  # Left mouse button
-                    # Check if clicking on a menu item
+    with idle.measure_cpu("main menu"):
+        while True:
+            for event in idle.wait_events():
+                if event.type == pygame.QUIT:
+                    pygame.quit()
+                    sys.exit()
+                elif event.type == pygame.VIDEOEXPOSE:
+                    menu_rects = draw_menu(screen, menu_items, selected_index)
+                elif event.type == pygame.MOUSEMOTION:
+                    # Highlight menu item when mouse hovers over it
                     for i, rect in enumerate(menu_rects):
                         if rect.collidepoint(event.pos):
-                            # Handle menu selection
-                            if i == 0:  # Start Game
-                                return 1  # Start at level 1
-                            elif i == 1:  # Start at Level
-                                level = get_level_input(screen)
-                                if level is not None:
-                                    return level
-                                # Redraw menu when returning from level input
+                            if selected_index != i:
+                                selected_index = i
                                 menu_rects = draw_menu(screen, menu_items, selected_index)
-                            elif i == 2:  # Level Editor
-                                # Run the level editor
-                                run_level_editor(screen)
-                                # Redraw the menu when returning from the editor
-                                menu_rects = draw_menu(screen, menu_items, selected_index)
-                            elif i == 3:  # Quit
-                                pygame.quit()
-                                sys.exit()
                             break
-            elif event.type == pygame.KEYDOWN:
-                if event.key == pygame.K_UP:
-                    selected_index = (selected_index - 1) % len(menu_items)
-                    menu_rects = draw_menu(screen, menu_items, selected_index)
-                elif event.key == pygame.K_DOWN:
-                    selected_index = (selected_index + 1) % len(menu_items)
-                    menu_rects = draw_menu(screen, menu_items, selected_index)
-                elif event.key == pygame.K_RETURN:
-                    if selected_index == 0:  # Start Game
-                        return 1  # Start at level 1
-                    elif selected_index == 1:  # Start at Level
-                        level = get_level_input(screen)
-                        if level is not None:
-                            return level
-                        # Redraw menu when returning from level input
+                elif event.type == pygame.MOUSEBUTTONDOWN:
+                    if event.button == 1:  # Left mouse button
+                        # Check if clicking on a menu item
+                        for i, rect in enumerate(menu_rects):
+                            if rect.collidepoint(event.pos):
+                                # Handle menu selection
+                                if i == 0:  # Start Game
+                                    return 1  # Start at level 1
+                                elif i == 1:  # Start at Level
+                                    level = choose_level(screen, levels)
+                                    if level is not None:
+                                        return level
+                                    # Redraw menu when returning from the level browser
+                                    menu_rects = draw_menu(screen, menu_items, selected_index)
+                                elif i == 2:  # Level Editor
+                                    # Run the level editor
+                                    run_level_editor(screen)
+                                    # Redraw the menu when returning from the editor
+                                    menu_rects = draw_menu(screen, menu_items, selected_index)
+                                elif i == 3:  # Quit
+                                    pygame.quit()
+                                    sys.exit()
+                                break
+                elif event.type == pygame.KEYDOWN:
+                    if event.key == pygame.K_UP:
+                        selected_index = (selected_index - 1) % len(menu_items)
                         menu_rects = draw_menu(screen, menu_items, selected_index)
-                    elif selected_index == 2:  # Level Editor
-                        # Run the level editor
-                        run_level_editor(screen)
-                        # Redraw the menu when returning from the editor
+                    elif event.key == pygame.K_DOWN:
+                        selected_index = (selected_index + 1) % len(menu_items)
                         menu_rects = draw_menu(screen, menu_items, selected_index)
-                    elif selected_index == 3:  # Quit
-                        pygame.quit()
-                        sys.exit()
+                    elif event.key == pygame.K_RETURN:
+                        if selected_index == 0:  # Start Game
+                            return 1  # Start at level 1
+                        elif selected_index == 1:  # Start at Level
+                            level = choose_level(screen, levels)
+                            if level is not None:
+                                return level
+                            # Redraw menu when returning from the level browser
+                            menu_rects = draw_menu(screen, menu_items, selected_index)
+                        elif selected_index == 2:  # Level Editor
+                            # Run the level editor
+                            run_level_editor(screen)
+                            # Redraw the menu when returning from the editor
+                            menu_rects = draw_menu(screen, menu_items, selected_index)
+                        elif selected_index == 3:  # Quit
+                            pygame.quit()
+                            sys.exit()
 
 def main():
     args = parse_arguments()
+    idle.report_cpu = args.cpu_stats
+    # Opponents plan on the spot unless a worker is chosen; every game shares it
+    ai_worker = None
+    if args.difficulty == 'hard':
+        ai_worker = LookaheadWorker()
+    elif args.ai_worker:
+        ai_worker = AIWorker(args.ai_worker)
 
     pygame.init()
     screen = pygame.display.set_mode((SCREEN_WIDTH, SCREEN_HEIGHT))
@@ -283,76 +276,139 @@ def main():
     clock = pygame.time.Clock()
     debug_overlay = False
 
-    # If level is provided via command line, start directly at that level
-    # Otherwise show the main menu
-    if args.level is not None:
-        level_index = args.level
-    else:
-        level_index = main_menu(screen)
+    # Prepare the first levels in the background while the menu is showing
+    levels = LevelPack(args.pack) if args.pack else LevelDirectory()
+    preloader = LevelPreloader(levels)
+    preloader.warm(args.preload, first_level=args.level or 1)
+
+    # F5 quick-saves, F9 restores the last quick-save
+    quicksaver = QuickSaver()
+    restored_state = None
+    telemetry = None if args.no_telemetry else Telemetry()
+
+    # The game is only left through pygame.quit(); sys.exit() inside the loop,
+    # so the background workers are shut down while SystemExit unwinds
+    try:
+        # If a state file or level is provided via command line, start directly there
+        # Otherwise show the main menu
+        if args.load_state is not None:
+            restored_state = read_state(args.load_state)
+            if restored_state is None:
+                show_message(screen, "Quick-save unreadable", "Press any key to continue", clear=True)
+        if restored_state is not None:
+            level_index = restored_state[0]
+        elif args.level is not None:
+            level_index = args.level
+        else:
+            level_index = main_menu(screen, levels)
     
-    while True:
-        level_file = f"levels/level{level_index:03d}.lvl"
-        
-        # Check if the level file exists
-        if not os.path.exists(level_file):
-            show_message(screen, f"Level {level_index} not found", "Press any key to return to menu")
-            level_index = main_menu(screen)
-            continue
+        while True:
+            # Check if the level file exists
+            if restored_state is None and not levels.exists(level_index):
+                show_message(screen, f"Level {level_index} not found", "Press any key to return to menu")
+                level_index = main_menu(screen, levels)
+                continue
             
-        game = Game(level_file)
+            if restored_state is not None:
+                level_index, game = restored_state
+                restored_state = None
+            else:
+                game = preloader.get(level_index)
+            # Preloaded and restored games are configured here, in one place
+            game.ai_scheduler = AIScheduler(args.ai_budget, worker=ai_worker)
+            if ai_worker:
+                ai_worker.reset()
         
-        show_message(screen, f"Level {level_index}", "Press ENTER to start", clear=True)
+            show_message(screen, f"Level {level_index}", "Press ENTER to start", clear=True)
+            game.start_timer()
+            rewind = RewindBuffer(game)
+            last_autosave = pygame.time.get_ticks()
+            tracker = telemetry.track(game, levels.name(level_index)) if telemetry else None
 
-        while game.running:
-            keys = pygame.key.get_pressed()
-            current_time = pygame.time.get_ticks()
+            while game.running:
+                keys = pygame.key.get_pressed()
+                current_time = pygame.time.get_ticks()
 
-            for event in pygame.event.get():
-                if event.type == pygame.QUIT:
-                    pygame.quit()
-                    sys.exit()
-                elif event.type == pygame.KEYDOWN:
-                    if event.key == pygame.K_F3:
-                        debug_overlay = not debug_overlay
+                for event in pygame.event.get():
+                    if event.type == pygame.QUIT:
+                        pygame.quit()
+                        sys.exit()
+                    elif event.type == pygame.KEYDOWN:
+                        if event.key == pygame.K_F3:
+                            debug_overlay = not debug_overlay
+                        elif event.key == pygame.K_F5:
+                            quicksaver.save(game, level_index)
+                        elif event.key == pygame.K_F9:
+                            restored_state = quicksaver.load()
+                            if restored_state is not None:
+                                game.running = False
+                            elif quicksaver.exists():
+                                show_message(screen, "Quick-save unreadable", "Press any key to continue")
+                                # The timer does not run while the message is showing
+                                game.start_timer()
 
-            # Update all game state in one call
-            game.update(keys, current_time)
-            
-            # Draw the game
-            game.draw(screen, debug_overlay, draw_game_info, draw_debug_overlay)
+                if not game.running:
+                    break
+
+                if args.autosave and current_time - last_autosave >= args.autosave * 1000:
+                    quicksaver.save(game, level_index)
+                    last_autosave = current_time
 
-            if game.check_game_over():
-                # Different message if time ran out
-                if game.time_remaining <= 0:
-                    show_message(screen, "Time's Up!", None, False)
+                if keys[pygame.K_BACKSPACE]:
+                    # Holding BACKSPACE steps back in time, one tick per frame
+                    rewind.step_back()
                 else:
-                    show_message(screen, "Game Over", None, False)
-                pygame.time.wait(2000)  # Wait 2 seconds
-                show_message(screen, "Game Over", "Press ENTER to try again")
-                # When player dies, restart the same level
-                break
+                    # Update all game state in one call
+                    game.update(keys, current_time)
+                    rewind.record()
+                    if tracker:
+                        tracker.frame()
+            
+                # Draw the game
+                game.draw(screen, debug_overlay, draw_game_info, draw_debug_overlay)
 
-            if game.check_win_condition():
-                show_message(screen, "You Win!", None, False)
-                pygame.time.wait(2000)  # Wait 2 seconds
-                show_message(screen, "You Win!", "Press ENTER for next level")
-                level_index += 1  # Move to the next level
-                break
+                if game.check_game_over():
+                    # Different message if time ran out
+                    if game.time_remaining <= 0:
+                        show_message(screen, "Time's Up!", None, False)
+                    else:
+                        show_message(screen, "Game Over", None, False)
+                    pygame.time.wait(2000)  # Wait 2 seconds
+                    show_message(screen, "Game Over", "Press ENTER to try again")
+                    # When player dies, restart the same level (restored from its cached snapshot)
+                    break
 
-            if current_time - game.player.anim_timer >= 16:
-                if game.player.state in ["running", "climbing"]:
-                    game.player.anim_frame = (game.player.anim_frame + 1) % 8
-                    game.player.anim_timer = current_time
+                if game.check_win_condition():
+                    # Prepare the next level while the message is showing
+                    preloader.prefetch(level_index + 1)
+                    show_message(screen, "You Win!", None, False)
+                    pygame.time.wait(2000)  # Wait 2 seconds
+                    show_message(screen, "You Win!", "Press ENTER for next level")
+                    level_index += 1  # Move to the next level
+                    break
 
-            clock.tick(60)
-        
-        # Check if we should return to the main menu after a level ends
-        if not os.path.exists(f"levels/level{level_index:03d}.lvl"):
-            show_message(screen, "No more levels!", "Press any key to return to menu")
-            level_index = main_menu(screen)
+                if current_time - game.player.anim_timer >= 16:
+                    if game.player.state in ["running", "climbing"]:
+                        game.player.anim_frame = (game.player.anim_frame + 1) % 8
+                        game.player.anim_timer = current_time
+
+                clock.tick(60)
 
-    pygame.quit()
-    sys.exit()
+            if tracker:
+                # Records the death or completion the level ended with, if any
+                tracker.finish()
+        
+            # Check if we should return to the main menu after a level ends
+            if restored_state is None and not levels.exists(level_index):
+                show_message(screen, "No more levels!", "Press any key to return to menu")
+                level_index = main_menu(screen, levels)
+    finally:
+        preloader.shutdown()
+        quicksaver.shutdown()
+        if telemetry:
+            telemetry.shutdown()
+        if ai_worker:
+            ai_worker.shutdown()
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
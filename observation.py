@@ -0,0 +1,72 @@
+# observation.py
+"""NumPy views of a game for bots, analysis tools and thumbnails
+
+The tile array shares memory with the live map: it is created once and
+always shows the current tiles, without a copy per frame. The entity layer
+and the per-type planes are refilled into arrays the caller can reuse.
+They work with a Game as well as a SimGame.
+
+NumPy is optional. The game runs without it; only these functions need it.
+"""
+from constants import *
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+# Tile types with a plane in tile_planes(), in plane order
+PLANE_TILES = (AIR, EARTH, STONE, LADDER, DIAMOND, EXIT)
+_PLANE_CODES = tuple(ord(tile) for tile in PLANE_TILES)
+
+# Values of the entity layer
+ENTITY_NONE = 0
+ENTITY_PLAYER = 1
+ENTITY_OPPONENT = 2
+
+def _require_numpy():
+    if numpy is None:
+        raise ImportError("observation arrays need NumPy (pip install numpy)")
+
+def tile_array(tilemap):
+    """Return a read-only (height, width) uint8 view of the tile codes
+
+    The codes are the tile characters' ordinals (ord(EARTH) etc.). The view
+    shares memory with `tilemap`, so it follows every later change.
+    """
+    _require_numpy()
+    view = numpy.frombuffer(tilemap.tiles, dtype=numpy.uint8).reshape(tilemap.height, tilemap.width)
+    view.flags.writeable = False
+    return view
+
+def tile_planes(tiles, out=None):
+    """Return a (len(PLANE_TILES), height, width) uint8 array, 1 where a tile has the plane's type
+
+    `tiles` is a tile_array(). Pass the previous result as `out` to refill it
+    instead of allocating.
+    """
+    _require_numpy()
+    if out is None:
+        out = numpy.empty((len(PLANE_TILES),) + tiles.shape, dtype=numpy.uint8)
+    for plane, code in zip(out, _PLANE_CODES):
+        numpy.equal(tiles, code, out=plane, casting='unsafe')
+    return out
+
+def entity_array(player, opponents, height=GRID_HEIGHT, width=GRID_WIDTH, out=None):
+    """Return a (height, width) uint8 array with ENTITY_* values at the characters' tiles
+
+    An opponent on the player's tile hides the player. Pass the previous
+    result as `out` to refill it instead of allocating.
+    """
+    _require_numpy()
+    if out is None:
+        out = numpy.zeros((height, width), dtype=numpy.uint8)
+    else:
+        out.fill(ENTITY_NONE)
+    characters = [(player, ENTITY_PLAYER)] if player else []
+    characters += [(opponent, ENTITY_OPPONENT) for opponent in opponents]
+    for character, value in characters:
+        x, y = character.get_tile_position()
+        if 0 <= x < width and 0 <= y < height:
+            out[y, x] = value
+    return out
@@ -2,6 +2,10 @@
 import pygame
 from character import Character
 from constants import *
+from greedy_ai import decide_keys
+
+# Decisions remembered per opponent before the cache is started over
+DECISION_CACHE_SIZE = 256
 
 class Opponent(Character):
     def __init__(self, x, y):
@@ -9,9 +13,21 @@ class Opponent(Character):
         # AI state variables
         self.ai_keys = {}
         self.update_timer = 0
+        # Decisions only depend on the opponent's tile, the player's tile and
+        # the map, so they are cached per (own tile, player tile) and dropped
+        # whenever the map version changes
+        self.decisions = {}
+        self.decisions_version = None
+        self.decision_hits = 0
+        self.decision_misses = 0
     
     def update(self, player, tilemap):
         """Update the opponent based on AI decisions"""
+        # Make AI decisions every frame for full speed movement
+        self.plan(player, tilemap)
+        self.act(tilemap)
+    
+    def _reset_keys(self):
         # Reset AI key presses
         self.ai_keys = {
             pygame.K_LEFT: False,
@@ -20,10 +36,20 @@ class Opponent(Character):
             pygame.K_DOWN: False,
             pygame.K_SPACE: False
         }
-        
-        # Make AI decisions every frame for full speed movement
+    
+    def plan(self, player, tilemap):
+        """Decide which keys to press until the next plan"""
+        self._reset_keys()
         self._make_ai_decisions(player, tilemap)
-        
+    
+    def use_plan(self, pressed):
+        """Press the keys of a plan made elsewhere, e.g. on the AI worker"""
+        self._reset_keys()
+        for ai_key in pressed:
+            self.ai_keys[ai_key] = True
+    
+    def act(self, tilemap):
+        """Move according to the last plan"""
         # Use the Character's handle_input method with our simulated key presses
         current_time = pygame.time.get_ticks()
         self.handle_input(self.ai_keys, tilemap, current_time)
@@ -31,52 +57,26 @@ class Opponent(Character):
     def _make_ai_decisions(self, player, tilemap):
         """Make AI decisions and set key presses accordingly"""
         # Get positions
-        player_x, player_y = player.get_tile_position()
-        opponent_x, opponent_y = self.get_tile_position()
-        
-        # Calculate distances
-        dx = player_x - opponent_x
-        dy = player_y - opponent_y
-        
-        # Check surroundings
-        current_tile = tilemap.get(opponent_x, opponent_y)
-        below_tile = tilemap.get(opponent_x, opponent_y + 1)
-        above_tile = tilemap.get(opponent_x, opponent_y - 1)
-        left_tile = tilemap.get(opponent_x - 1, opponent_y)
-        right_tile = tilemap.get(opponent_x + 1, opponent_y)
-        
-        # Check if we're on or near a ladder
-        on_ladder = current_tile == LADDER
-        ladder_below = below_tile == LADDER
-        ladder_above = above_tile == LADDER
+        player_position = player.get_tile_position()
+        opponent_position = self.get_tile_position()
         
-        # DECISION 1: Vertical movement (ladders)
-        if on_ladder or ladder_below:
-            # If player is above us, try to climb up
-            if dy < 0 and (on_ladder or ladder_above):
-                self.ai_keys[pygame.K_UP] = True
-            # If player is below us, try to climb down
-            elif dy > 0 and (on_ladder or ladder_below):
-                self.ai_keys[pygame.K_DOWN] = True
+        if self.decisions_version != tilemap.version:
+            self.decisions.clear()
+            self.decisions_version = tilemap.version
         
-        # DECISION 2: Horizontal movement
-        # Prioritize vertical movement if significant vertical distance
-        if abs(dy) <= 3 or not (on_ladder or ladder_below):
-            # Move left toward player
-            if dx < 0 and left_tile not in [EARTH, STONE]:
-                self.ai_keys[pygame.K_LEFT] = True
-            # Move right toward player
-            elif dx > 0 and right_tile not in [EARTH, STONE]:
-                self.ai_keys[pygame.K_RIGHT] = True
+        key = (opponent_position, player_position)
+        pressed = self.decisions.get(key)
+        if pressed is None:
+            self.decision_misses += 1
+            pressed = decide_keys(opponent_position, player_position, tilemap, self)
+            if len(self.decisions) >= DECISION_CACHE_SIZE:
+                self.decisions.clear()
+            self.decisions[key] = pressed
+        else:
+            self.decision_hits += 1
         
-        # DECISION 3: Look for ladders if significant vertical distance
-        if abs(dy) > 3 and not on_ladder:
-            # Check for ladders to the left
-            if left_tile == LADDER or tilemap.get(opponent_x - 1, opponent_y + 1) == LADDER:
-                self.ai_keys[pygame.K_LEFT] = True
-            # Check for ladders to the right
-            elif right_tile == LADDER or tilemap.get(opponent_x + 1, opponent_y + 1) == LADDER:
-                self.ai_keys[pygame.K_RIGHT] = True
+        for ai_key in pressed:
+            self.ai_keys[ai_key] = True
     
     def draw(self, surface):
         # Draw the sprite directly to the surface
@@ -0,0 +1,147 @@
+# quicksave.py
+import os
+import struct
+import zlib
+from concurrent.futures import ThreadPoolExecutor
+from constants import CHARACTER_STATES, TILE_SIZE, GRID_WIDTH, GRID_HEIGHT
+from game_state import Game
+from level_parser import LevelSnapshot, write_atomic
+
+# Binary quick-save layout (little endian):
+#   magic, format version
+#   header: level index, timer seconds, time remaining, diamonds remaining/collected/total,
+#           character count, compressed tile buffer length
+#   one record per character (player first, then opponents)
+#   zlib-compressed tile buffer
+QUICKSAVE_MAGIC = b'CUQS'
+QUICKSAVE_VERSION = 1
+QUICKSAVE_FILE = os.path.join("saves", "quicksave.bin")
+
+_PREAMBLE = struct.Struct('<4sB')
+_HEADER = struct.Struct('<IddHHHHI')
+# rect x, rect y, vx, vy, facing, state code, previous state code, animation frame, animation timer
+_CHARACTER = struct.Struct('<hhddbBBIq')
+
+_STATE_CODES = {state: code for code, state in enumerate(CHARACTER_STATES)}
+
+# What a truncated, corrupt or old-format save raises while being read
+_UNREADABLE_ERRORS = (OSError, ValueError, IndexError, struct.error, zlib.error)
+
+def _character_record(character):
+    return _CHARACTER.pack(
+        character.rect.x, character.rect.y, character.vx, character.vy, character.facing,
+        _STATE_CODES.get(character.state, 0), _STATE_CODES.get(character.prev_state, 0),
+        character.anim_frame, character.anim_timer,
+    )
+
+def _restore_character(character, record):
+    (character.rect.x, character.rect.y, character.vx, character.vy, character.facing,
+     state_code, prev_state_code, character.anim_frame, character.anim_timer) = record
+    character.state = CHARACTER_STATES[state_code]
+    character.prev_state = CHARACTER_STATES[prev_state_code]
+
+def serialize_game(game, level_index=0):
+    """Pack the complete dynamic state of a running game into a versioned binary blob"""
+    characters = [game.player] + game.opponents
+    tiles = zlib.compress(bytes(game.tilemap.tiles))
+    parts = [
+        _PREAMBLE.pack(QUICKSAVE_MAGIC, QUICKSAVE_VERSION),
+        _HEADER.pack(
+            level_index, game.timer_seconds, game.time_remaining,
+            game.diamonds_remaining, game.diamonds_collected, game.total_diamonds,
+            len(characters), len(tiles),
+        ),
+    ]
+    parts.extend(_character_record(character) for character in characters)
+    parts.append(tiles)
+    return b''.join(parts)
+
+def deserialize_game(blob):
+    """Rebuild a Game from a quick-save blob. Returns (level index, game)"""
+    magic, version = _PREAMBLE.unpack_from(blob)
+    if magic != QUICKSAVE_MAGIC or version != QUICKSAVE_VERSION:
+        raise ValueError(f"Unsupported quick-save format ({magic!r}, version {version})")
+    (level_index, timer_seconds, time_remaining, diamonds_remaining, diamonds_collected,
+     total_diamonds, num_characters, tiles_length) = _HEADER.unpack_from(blob, _PREAMBLE.size)
+
+    if num_characters == 0:
+        raise ValueError("Quick-save has no player")
+    offset = _PREAMBLE.size + _HEADER.size
+    records = []
+    for _ in range(num_characters):
+        records.append(_CHARACTER.unpack_from(blob, offset))
+        offset += _CHARACTER.size
+    if offset + tiles_length > len(blob):
+        raise ValueError("Quick-save is truncated")
+    tiles = zlib.decompress(blob[offset:offset + tiles_length])
+    if len(tiles) != GRID_WIDTH * GRID_HEIGHT:
+        raise ValueError(f"Quick-save holds {len(tiles)} tiles, expected {GRID_WIDTH * GRID_HEIGHT}")
+
+    # Create the characters at their tile positions, then restore their exact state
+    tile_positions = [((x + TILE_SIZE // 2) // TILE_SIZE, (y + TILE_SIZE // 2) // TILE_SIZE) for x, y, *_ in records]
+    game = Game(LevelSnapshot(
+        name=None,
+        tiles=tiles,
+        player_spawn=tile_positions[0],
+        opponent_spawns=tuple(tile_positions[1:]),
+        diamond_count=diamonds_remaining,
+        timer_seconds=timer_seconds,
+    ))
+    for character, record in zip([game.player] + game.opponents, records):
+        _restore_character(character, record)
+    game.diamonds_collected = diamonds_collected
+    game.total_diamonds = total_diamonds
+    game.time_remaining = time_remaining
+    game.start_timer()
+    return level_index, game
+
+def _try_deserialize(blob):
+    """Like deserialize_game, but returns None if the blob cannot be read"""
+    try:
+        return deserialize_game(blob)
+    except _UNREADABLE_ERRORS:
+        return None
+
+def read_state(filename):
+    """Load (level index, game) from a quick-save file, or None if it is unreadable"""
+    try:
+        with open(filename, 'rb') as f:
+            blob = f.read()
+    except OSError:
+        return None
+    return _try_deserialize(blob)
+
+class QuickSaver:
+    """Writes quick-saves atomically on a background thread and keeps the latest in memory"""
+
+    def __init__(self, filename=QUICKSAVE_FILE):
+        self.filename = filename
+        self.executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="quicksave")
+        self.last_blob = None
+
+    def save(self, game, level_index):
+        # Serializing is cheap and must see a consistent state, so it happens on the caller's thread
+        self.last_blob = serialize_game(game, level_index)
+        self.executor.submit(self._write, self.last_blob)
+
+    def _write(self, blob):
+        directory = os.path.dirname(self.filename)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        write_atomic(self.filename, blob)
+
+    def exists(self):
+        """True if there is a quick-save to load, readable or not"""
+        return self.last_blob is not None or os.path.exists(self.filename)
+
+    def load(self):
+        """Return (level index, game) from the latest quick-save, or None if there is none or it is unreadable"""
+        if self.last_blob is not None:
+            return _try_deserialize(self.last_blob)
+        if os.path.exists(self.filename):
+            return read_state(self.filename)
+        return None
+
+    def shutdown(self):
+        # Let a pending write finish so the last save is not lost
+        self.executor.shutdown(wait=True)
@@ -0,0 +1,123 @@
+# reachability.py
+"""Where the player can get to, on a graph of tiles
+
+A tile is a node when a character fits in it (it is not EARTH or STONE) and
+it is not on the bottom row, which kills. The moves follow MovementRules:
+a character without support (nothing standable below, no ladder here) can
+only fall; a supported one walks left and right, climbs up from a ladder
+tile and climbs down onto a ladder or off its bottom. Digging removes the
+EARTH tile diagonally below and behind, so with `dig` a character can also
+drop into the EARTH tile below either neighbour, as if it had been dug out.
+
+The graph does not follow the map changes that digging makes, so with `dig`
+the results are an estimate: tiles found are reachable by some sequence of
+digs, but a hole dug on the way may be needed again later.
+"""
+from collections import deque, namedtuple
+from constants import *
+
+_WALLS = (EARTH, STONE)
+_STANDABLE = (EARTH, STONE, LADDER)
+
+MOVES = ("left", "right", "up", "down", "fall", "dig_left", "dig_right")
+
+def is_node(tilemap, x, y):
+    return 0 <= x < tilemap.width and 0 <= y < tilemap.height - 1 and tilemap.get(x, y) not in _WALLS
+
+def _mask(*tiles):
+    table = bytearray(256)
+    for tile in tiles:
+        table[ord(tile)] = 1
+    return bytes(table)
+
+_WALL_MASK = _mask(*_WALLS)
+_STANDABLE_MASK = _mask(*_STANDABLE)
+_LADDER_MASK = _mask(LADDER)
+_EARTH_MASK = _mask(EARTH)
+
+# Byte masks of a tile buffer (1 where the tile is of that kind), the row
+# width, and `end`, the first tile index of the bottom row, where no node is
+TileMasks = namedtuple('TileMasks', ['width', 'end', 'wall', 'standable', 'ladder', 'earth'])
+
+def tile_masks(tilemap):
+    tiles = bytes(tilemap.tiles)
+    return TileMasks(tilemap.width, (tilemap.height - 1) * tilemap.width,
+                     tiles.translate(_WALL_MASK), tiles.translate(_STANDABLE_MASK),
+                     tiles.translate(_LADDER_MASK), tiles.translate(_EARTH_MASK))
+
+def moves_from(masks, index, dig=False):
+    """Return the (tile index, move) a character on the node at `index` can get to next
+
+    This is the only place the movement rules of the graph live; neighbors,
+    reachable_from and distances_to all follow it.
+    """
+    width, end, wall, standable, ladder, earth = masks
+    below = index + width
+    if not (standable[below] or ladder[index]):
+        return [(below, "fall")] if below < end and not wall[below] else []
+    result = []
+    x = index % width
+    if x > 0 and not wall[index - 1]:
+        result.append((index - 1, "left"))
+        if dig and earth[below - 1] and below - 1 < end:
+            result.append((below - 1, "dig_left"))
+    if x < width - 1 and not wall[index + 1]:
+        result.append((index + 1, "right"))
+        if dig and earth[below + 1] and below + 1 < end:
+            result.append((below + 1, "dig_right"))
+    if ladder[index] and index >= width and not wall[index - width]:
+        result.append((index - width, "up"))
+    if (ladder[index] or ladder[below]) and not wall[below] and below < end:
+        result.append((below, "down"))
+    return result
+
+def neighbors(tilemap, x, y, dig=False):
+    """Return the (x, y, move) a character on tile (x, y) can get to next"""
+    width = tilemap.width
+    return [(index % width, index // width, move)
+            for index, move in moves_from(tile_masks(tilemap), y * width + x, dig)]
+
+def reachable_from(tilemap, start, dig=True):
+    """Return {tile: moves needed} for every tile reachable from `start`
+
+    A search on tile indices and byte masks of the tile buffer.
+    """
+    if not is_node(tilemap, *start):
+        return {}
+    masks = tile_masks(tilemap)
+    width = masks.width
+    first = start[1] * width + start[0]
+    steps = {first: 0}
+    queue = deque([first])
+    while queue:
+        index = queue.popleft()
+        distance = steps[index] + 1
+        for tile, _ in moves_from(masks, index, dig):
+            if tile not in steps:
+                steps[tile] = distance
+                queue.append(tile)
+    return {(index % width, index // width): distance for index, distance in steps.items()}
+
+def distances_to(tilemap, targets, dig=False):
+    """Return {tile: moves needed to reach the nearest target} for every tile that can reach one"""
+    masks = tile_masks(tilemap)
+    width, end, wall = masks.width, masks.end, masks.wall
+    predecessors = {}
+    for index in range(end):
+        # With `dig`, an EARTH tile may have been dug out and left again
+        if not wall[index] or (dig and masks.earth[index]):
+            for tile, _ in moves_from(masks, index, dig):
+                predecessors.setdefault(tile, []).append(index)
+    distance = {}
+    queue = deque()
+    for x, y in targets:
+        if is_node(tilemap, x, y) and y * width + x not in distance:
+            distance[y * width + x] = 0
+            queue.append(y * width + x)
+    while queue:
+        tile = queue.popleft()
+        for previous in predecessors.get(tile, ()):
+            if previous not in distance:
+                distance[previous] = distance[tile] + 1
+                queue.append(previous)
+    return {(index % width, index // width): steps for index, steps in distance.items()}
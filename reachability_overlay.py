@@ -0,0 +1,163 @@
+# reachability_overlay.py
+"""Live reachability overlay for the level editor
+
+Shades the tiles the player can get to from the spawn (walking, ladders,
+falling and digging EARTH, see reachability.py) and flags the diamonds and
+exits out of reach. The search runs on a background thread: every edit of
+the tilemap hands the worker a snapshot of the tiles, edits made while it
+is busy are coalesced into the next run, and a result is kept as long as
+no edit touched a tile the search looked at from a reachable tile.
+"""
+import queue
+import threading
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor
+import pygame
+from constants import *
+from reachability import reachable_from
+from tile_grid import TileGrid
+
+# Posted by the worker so the editor wakes up to draw the new result
+REACHABILITY_READY = pygame.event.custom_type()
+
+REACHABLE_COLOR = (0, 255, 0, 60)
+UNREACHABLE_COLOR = (255, 0, 0)
+
+# The tiles of a change, as offsets, whose moves (see reachability.neighbors) depend on it
+_DEPENDENT_OFFSETS = ((0, 0), (0, -1), (0, 1), (-1, 0), (1, 0), (-1, -1), (1, -1))
+
+# `reachable` is a frozenset of tiles; `shading` the overlay as one RGBA pixel per tile
+Reachability = namedtuple('Reachability', ['version', 'spawn', 'reachable', 'lost_diamonds',
+                                           'exit_reachable', 'lost_exits', 'shading'])
+
+def _positions(tiles, width, tile):
+    code = ord(tile)
+    positions = []
+    index = tiles.find(code)
+    while index >= 0:
+        positions.append((index % width, index // width))
+        index = tiles.find(code, index + 1)
+    return positions
+
+def _touches(reachable, changes):
+    for change in changes:
+        for dx, dy in _DEPENDENT_OFFSETS:
+            if (change.x + dx, change.y + dy) in reachable:
+                return True
+    return False
+
+class ReachabilityOverlay:
+    """Keeps a Reachability of a tilemap up to date on a background thread"""
+
+    def __init__(self, tilemap, spawn):
+        self.tilemap = tilemap
+        self.spawn = spawn
+        self.executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="reachability")
+        self.lock = threading.Lock()
+        # The newest (tiles, version, spawn) for the worker, and the changes since it last took one;
+        # None for the changes means the last result cannot be reused
+        self.pending = None
+        self.pending_changes = None
+        self.busy = False
+        self.finished = queue.Queue()
+        self.last = None  # the worker's latest result
+        self.result = None  # the latest result the editor collected
+        self.surface = None
+        tilemap.subscribe_batches(self._on_changes)
+        self._request(None)
+
+    def _on_changes(self, changes):
+        self._request(changes)
+
+    def update_spawn(self, spawn):
+        """Follow the player's spawn tile; cheap to call every frame"""
+        if spawn != self.spawn:
+            self.spawn = spawn
+            self._request(None)
+
+    def _request(self, changes):
+        with self.lock:
+            if self.pending is None:
+                self.pending_changes = changes
+            elif self.pending_changes is not None and changes is not None:
+                self.pending_changes = self.pending_changes + changes
+            else:
+                self.pending_changes = None
+            self.pending = (self.tilemap.snapshot(), self.tilemap.version, self.spawn)
+            if self.busy:
+                return
+            self.busy = True
+        self.executor.submit(self._work)
+
+    def _work(self):
+        while True:
+            with self.lock:
+                if self.pending is None:
+                    self.busy = False
+                    return
+                (tiles, version, spawn), changes = self.pending, self.pending_changes
+                self.pending = self.pending_changes = None
+            self.last = self._compute(tiles, version, spawn, changes)
+            self.finished.put(self.last)
+            try:
+                pygame.event.post(pygame.event.Event(REACHABILITY_READY))
+            except pygame.error:
+                pass  # no display, nobody is waiting for it
+
+    def _compute(self, tiles, version, spawn, changes):
+        last = self.last
+        if (last is not None and last.reachable and changes is not None and last.spawn == spawn
+                and not _touches(last.reachable, changes)):
+            reachable, shading = last.reachable, last.shading
+        else:
+            grid = TileGrid(tiles)
+            reachable = frozenset(reachable_from(grid, spawn)) if spawn else frozenset()
+            shading = bytearray(GRID_WIDTH * GRID_HEIGHT * 4)
+            color = bytes(REACHABLE_COLOR)
+            for x, y in reachable:
+                index = (y * GRID_WIDTH + x) * 4
+                shading[index:index + 4] = color
+            shading = bytes(shading)
+        exits = _positions(tiles, GRID_WIDTH, EXIT)
+        lost_exits = tuple(tile for tile in exits if tile not in reachable)
+        exit_reachable = len(lost_exits) < len(exits) or any(y == 0 for _, y in reachable)
+        lost_diamonds = tuple(tile for tile in _positions(tiles, GRID_WIDTH, DIAMOND) if tile not in reachable)
+        return Reachability(version, spawn, reachable, lost_diamonds, exit_reachable, lost_exits, shading)
+
+    def collect(self):
+        """Take over the newest result of the worker. Returns True if there was one"""
+        result = None
+        while not self.finished.empty():
+            result = self.finished.get()
+        if result is None:
+            return False
+        if self.result is None or result.shading is not self.result.shading:
+            surface = pygame.image.frombuffer(result.shading, (GRID_WIDTH, GRID_HEIGHT), 'RGBA')
+            self.surface = pygame.transform.scale(surface, (GRID_WIDTH * TILE_SIZE, GRID_HEIGHT * TILE_SIZE))
+        self.result = result
+        return True
+
+    def status(self):
+        """One line about whether the level can be won, for the status bar"""
+        result = self.result
+        if result is None:
+            return "Reach: ..."
+        if result.spawn is None:
+            return "Reach: no player"
+        problems = []
+        if result.lost_diamonds:
+            problems.append(f"{len(result.lost_diamonds)} diamonds out of reach")
+        if not result.exit_reachable:
+            problems.append("no way out")
+        return "Reach: " + (", ".join(problems) if problems else "solvable")
+
+    def draw(self, screen):
+        if self.surface is not None:
+            screen.blit(self.surface, (0, 0))
+        if self.result is not None:
+            for x, y in self.result.lost_diamonds + self.result.lost_exits:
+                pygame.draw.rect(screen, UNREACHABLE_COLOR, (x * TILE_SIZE, y * TILE_SIZE, TILE_SIZE, TILE_SIZE), 2)
+
+    def close(self):
+        self.tilemap.unsubscribe_batches(self._on_changes)
+        self.executor.shutdown(wait=False)
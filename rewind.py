@@ -0,0 +1,147 @@
+# rewind.py
+import struct
+from collections import deque
+from constants import CHARACTER_STATES
+
+_STATE_CODES = {state: code for code, state in enumerate(CHARACTER_STATES)}
+
+# Tick header: character records, tile records, diamonds remaining, diamonds collected, time remaining
+_HEADER = struct.Struct('<BHHHd')
+# Character record: character index, rect x, rect y, vx, vy, state code, facing
+_CHARACTER = struct.Struct('<Bhhddbb')
+# Tile record: tile index, old tile code
+_TILE = struct.Struct('<HB')
+
+class RewindBuffer:
+    """Ring buffer of reversible per-tick deltas that lets the game step back in time
+
+    Each recorded tick stores only the previous values of what changed during
+    that tick (characters, tiles from the tilemap's change journal, diamond
+    counters and the timer), packed into one small bytes object. History is
+    split into segments that start with a full keyframe every
+    `keyframe_interval` ticks.
+    Stepping back undoes a single delta, and arriving at the start of a segment
+    restores its keyframe. Whole segments are dropped once `max_seconds` of
+    history is stored, so memory stays bounded (about 3 MB for 5 minutes at
+    60 Hz with a handful of opponents).
+    """
+
+    def __init__(self, game, keyframe_interval=120, max_seconds=300, tick_rate=60):
+        self.game = game
+        self.keyframe_interval = keyframe_interval
+        max_segments = max(1, max_seconds * tick_rate // keyframe_interval)
+        self.segments = deque(maxlen=max_segments)  # (keyframe, list of packed deltas)
+        self._sync()
+        self._start_segment()
+
+    def _characters(self):
+        return [self.game.player] + self.game.opponents
+
+    def _character_states(self):
+        return [
+            (c.rect.x, c.rect.y, c.vx, c.vy, _STATE_CODES.get(c.state, 0), c.facing)
+            for c in self._characters()
+        ]
+
+    def _counters(self):
+        return (self.game.diamonds_remaining, self.game.diamonds_collected, self.game.time_remaining)
+
+    def _sync(self):
+        """Remember the current state as the base for the next delta"""
+        self.last_characters = self._character_states()
+        self.last_counters = self._counters()
+        self.tiles_version = self.game.tilemap.version
+
+    def _start_segment(self):
+        keyframe = (self.game.tilemap.snapshot(), self.last_characters, self.last_counters)
+        self.segments.append((keyframe, []))
+
+    def record(self):
+        """Store the changes made by the tick that just ran"""
+        tilemap = self.game.tilemap
+        changes = tilemap.changes_since(self.tiles_version)
+        if changes is None:
+            # More tile changes than the journal holds: the tick cannot be
+            # undone, so history starts over from here
+            self.segments.clear()
+            self._sync()
+            self._start_segment()
+            return
+        tiles = [(change.y * tilemap.width + change.x, ord(change.old)) for change in changes]
+
+        characters = self._character_states()
+        changed = [
+            (index,) + old
+            for index, (old, new) in enumerate(zip(self.last_characters, characters))
+            if old != new
+        ]
+        parts = [_HEADER.pack(len(changed), len(tiles), *self.last_counters)]
+        parts.extend(_CHARACTER.pack(*record) for record in changed)
+        parts.extend(_TILE.pack(*record) for record in tiles)
+
+        self.segments[-1][1].append(b''.join(parts))
+        self.last_characters = characters
+        self.last_counters = self._counters()
+        self.tiles_version = tilemap.version
+        if len(self.segments[-1][1]) >= self.keyframe_interval:
+            self._start_segment()
+
+    def step_back(self):
+        """Undo the most recent tick. Returns False when there is no history left"""
+        keyframe, deltas = self.segments[-1]
+        if not deltas:
+            if len(self.segments) == 1:
+                return False
+            # The previous segment ends in the state this keyframe starts from
+            self.segments.pop()
+            keyframe, deltas = self.segments[-1]
+
+        delta = deltas.pop()
+        if deltas:
+            self._apply_delta(delta)
+        else:
+            self._restore_keyframe(keyframe)
+        # Restoring tiles goes through TileMap.set, which must not count as a new
+        # change: _sync() moves past those journal entries
+        self._sync()
+        return True
+
+    def _apply_delta(self, delta):
+        num_characters, num_tiles, *counters = _HEADER.unpack_from(delta)
+        offset = _HEADER.size
+        characters = self._characters()
+        for _ in range(num_characters):
+            index, *state = _CHARACTER.unpack_from(delta, offset)
+            self._set_character_state(characters[index], state)
+            offset += _CHARACTER.size
+        tilemap = self.game.tilemap
+        for _ in range(num_tiles):
+            index, code = _TILE.unpack_from(delta, offset)
+            tilemap.set(index % tilemap.width, index // tilemap.width, chr(code))
+            offset += _TILE.size
+        self._set_counters(counters)
+
+    def _restore_keyframe(self, keyframe):
+        tiles, character_states, counters = keyframe
+        tilemap = self.game.tilemap
+        if tilemap.tiles != tiles:
+            for index, code in enumerate(tiles):
+                if tilemap.tiles[index] != code:
+                    tilemap.set(index % tilemap.width, index // tilemap.width, chr(code))
+        for character, state in zip(self._characters(), character_states):
+            self._set_character_state(character, state)
+        self._set_counters(counters)
+
+    def _set_character_state(self, character, state):
+        x, y, vx, vy, state_code, facing = state
+        character.rect.x = x
+        character.rect.y = y
+        character.vx = vx
+        character.vy = vy
+        character.state = CHARACTER_STATES[state_code]
+        character.facing = facing
+
+    def _set_counters(self, counters):
+        game = self.game
+        game.diamonds_remaining, game.diamonds_collected, game.time_remaining = counters
+        game.start_timer()
@@ -0,0 +1,135 @@
+# sim.py
+"""Pygame-free copy of a running game, for lookahead planning and bots
+
+A SimGame holds only what the rules need: a TileGrid and, per character, the
+position, velocity, facing and state. It steps with the same MovementRules
+and GameRules as Game, copies in a few microseconds and needs no display.
+"""
+from constants import *
+from game_rules import GameRules
+from greedy_ai import decide_keys
+from movement import MovementRules
+
+def _round(value):
+    """Round like pygame.Rect does when a float is assigned: half away from zero"""
+    if value >= 0:
+        return int(value + 0.5)
+    return -int(-value + 0.5)
+
+class SimRect:
+    """The part of pygame.Rect the movement rules use, for a TILE_SIZE square"""
+    __slots__ = ('_x', '_y')
+
+    def __init__(self, x, y):
+        self._x = x
+        self._y = y
+
+    @property
+    def x(self):
+        return self._x
+
+    @x.setter
+    def x(self, value):
+        self._x = value if type(value) is int else _round(value)
+
+    @property
+    def y(self):
+        return self._y
+
+    @y.setter
+    def y(self, value):
+        self._y = value if type(value) is int else _round(value)
+
+    @property
+    def top(self):
+        return self._y
+
+    @property
+    def bottom(self):
+        return self._y + TILE_SIZE
+
+    @property
+    def centerx(self):
+        return self._x + TILE_SIZE // 2
+
+    @property
+    def centery(self):
+        return self._y + TILE_SIZE // 2
+
+    def colliderect(self, other):
+        return (self._x < other._x + TILE_SIZE and other._x < self._x + TILE_SIZE
+                and self._y < other._y + TILE_SIZE and other._y < self._y + TILE_SIZE)
+
+# Keys of a SimCharacter are a tuple of five booleans indexed by these codes
+SIM_KEY_LEFT, SIM_KEY_RIGHT, SIM_KEY_UP, SIM_KEY_DOWN, SIM_KEY_SPACE = range(5)
+NO_KEYS = (False,) * 5
+
+def sim_keys(pressed):
+    """Turn a collection of SIM_KEY_* codes into a keys tuple"""
+    return tuple(code in pressed for code in range(5))
+
+class SimCharacter(MovementRules):
+    KEY_LEFT = SIM_KEY_LEFT
+    KEY_RIGHT = SIM_KEY_RIGHT
+    KEY_UP = SIM_KEY_UP
+    KEY_DOWN = SIM_KEY_DOWN
+    KEY_SPACE = SIM_KEY_SPACE
+
+    __slots__ = ('rect', 'vx', 'vy', 'facing', 'state')
+
+    def __init__(self, x, y, vx=0, vy=0, facing=DIR_RIGHT, state="idle"):
+        self.rect = SimRect(x, y)
+        self.vx = vx
+        self.vy = vy
+        self.facing = facing
+        self.state = state
+
+    @classmethod
+    def from_character(cls, character):
+        rect = character.rect
+        return cls(rect.x, rect.y, character.vx, character.vy, character.facing, character.state)
+
+    def copy(self):
+        return SimCharacter(self.rect._x, self.rect._y, self.vx, self.vy, self.facing, self.state)
+
+class SimGame(GameRules):
+    """A game state that can be copied and stepped without pygame
+
+    The timer does not run: a simulation covers a few seconds at most.
+    """
+
+    def __init__(self, tilemap, player, opponents, diamonds_remaining=0, diamonds_collected=0,
+                 time_remaining=float('inf')):
+        self.tilemap = tilemap
+        self.player = player
+        self.opponents = opponents
+        self.diamonds_remaining = diamonds_remaining
+        self.diamonds_collected = diamonds_collected
+        self.time_remaining = time_remaining
+
+    @classmethod
+    def from_game(cls, game):
+        return cls(game.tilemap.copy(), SimCharacter.from_character(game.player),
+                   [SimCharacter.from_character(opponent) for opponent in game.opponents],
+                   game.diamonds_remaining, game.diamonds_collected)
+
+    def copy(self):
+        return SimGame(self.tilemap.copy(), self.player.copy(), [opponent.copy() for opponent in self.opponents],
+                       self.diamonds_remaining, self.diamonds_collected, self.time_remaining)
+
+    def _player_caught(self):
+        rect = self.player.rect
+        return any(rect.colliderect(opponent.rect) for opponent in self.opponents)
+
+    def greedy_keys(self, opponent):
+        """Keys the greedy opponent AI would press for an opponent of this simulation"""
+        pressed = decide_keys(opponent.get_tile_position(), self.player.get_tile_position(), self.tilemap, SimCharacter)
+        return sim_keys(pressed)
+
+    def step(self, player_keys, opponent_keys=None):
+        """Advance one frame like Game.update, with greedy opponents unless their keys are given"""
+        self.player.handle_input(player_keys, self.tilemap, 0)
+        self.check_diamond_collection()
+        for index, opponent in enumerate(self.opponents):
+            keys = opponent_keys[index] if opponent_keys else None
+            opponent.handle_input(keys or self.greedy_keys(opponent), self.tilemap, 0)
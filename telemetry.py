@@ -0,0 +1,216 @@
+# telemetry.py
+"""Gameplay telemetry: where players die, stall, dig and pick up diamonds
+
+Events are appended to an in-memory queue during play; a background thread
+writes them to TELEMETRY_FILE in batches, one JSON object per line, so the
+frame never waits for the disk. `aggregate` turns the event log into
+per-level heatmaps, which the level editor can show over the map (H key).
+
+Usage:
+    python telemetry.py aggregate [events.jsonl] [heatmaps.json]
+"""
+import argparse
+import atexit
+import json
+import os
+import threading
+import time
+from collections import Counter, deque
+from constants import *
+
+TELEMETRY_DIR = "telemetry"
+TELEMETRY_FILE = os.path.join(TELEMETRY_DIR, "events.jsonl")
+HEATMAP_FILE = os.path.join(TELEMETRY_DIR, "heatmaps.json")
+
+FLUSH_SECONDS = 2.0   # the writer thread flushes at least this often
+FLUSH_EVENTS = 256    # ... and as soon as this many events are waiting
+STALL_FRAMES = 300    # staying on one tile for this many played frames (5 s at 60 Hz) counts as a stall
+
+# Event kinds. Deaths carry the reason as value, completions the seconds played
+EVENT_KINDS = ("death", "stall", "dig", "diamond", "complete")
+
+def level_name(filename):
+    """The name events are filed under: the level file's base name"""
+    return os.path.basename(filename)
+
+class Telemetry:
+    """Event buffer with a background writer thread"""
+
+    def __init__(self, filename=TELEMETRY_FILE):
+        self.filename = filename
+        # deque appends and pops are thread-safe, so the game thread never takes a lock
+        self.events = deque()
+        self.wake = threading.Event()
+        self.stopping = False
+        self.written = 0
+        self.dropped = 0
+        self.error = None  # the OSError of the last failed write, until a write succeeds
+        self.thread = threading.Thread(target=self._run, name="telemetry", daemon=True)
+        self.thread.start()
+        atexit.register(self.shutdown)
+
+    def log(self, kind, level, x, y, value=None):
+        self.events.append({'kind': kind, 'level': level, 'x': x, 'y': y, 'value': value, 'time': round(time.time(), 3)})
+        if len(self.events) >= FLUSH_EVENTS:
+            self.wake.set()
+
+    def track(self, game, level):
+        """Start recording the events of a game of `level`. Returns its GameTracker"""
+        return GameTracker(self, game, level)
+
+    def _run(self):
+        while not self.stopping:
+            self.wake.wait(FLUSH_SECONDS)
+            self.wake.clear()
+            self._flush()
+        self._flush()
+
+    def _flush(self):
+        lines = []
+        while self.events:
+            lines.append(json.dumps(self.events.popleft()) + "\n")
+        if not lines:
+            return
+        try:
+            directory = os.path.dirname(self.filename)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            with open(self.filename, 'a') as f:
+                f.write(''.join(lines))
+        except OSError as error:
+            # Drop the batch but keep the thread: the game must not stall or
+            # grow the queue forever because the disk is full or read-only
+            if self.error is None:
+                print(f"Telemetry: could not write {self.filename} ({error}), dropping events")
+            self.error = error
+            self.dropped += len(lines)
+            return
+        if self.error is not None:
+            print(f"Telemetry: writing {self.filename} again, {self.dropped} events were dropped")
+            self.error = None
+        self.written += len(lines)
+
+    def shutdown(self):
+        # Write what is still buffered before the process exits
+        if not self.stopping:
+            self.stopping = True
+            self.wake.set()
+            self.thread.join()
+
+class GameTracker:
+    """Turns what happens in one game into telemetry events
+
+    Digs and diamond pickups come from the tilemap's change subscription.
+    Each tile is logged at most once per game, so rewinding past a dig or a
+    pickup and repeating it does not count twice. Call frame() once per
+    played frame (not for rewound ones) for stall detection and finish()
+    when the game is over or won.
+    """
+
+    def __init__(self, telemetry, game, level):
+        self.telemetry = telemetry
+        self.game = game
+        self.level = level
+        self.tile = None
+        self.frames_on_tile = 0
+        self.stalled = False
+        self.logged = set()  # (kind, x, y) of the digs and pickups already logged
+        self.finished = False
+        game.tilemap.subscribe(self._on_change)
+
+    def _on_change(self, change):
+        if change.new != AIR:
+            return
+        kind = {EARTH: "dig", DIAMOND: "diamond"}.get(change.old)
+        if kind is not None and (kind, change.x, change.y) not in self.logged:
+            self.logged.add((kind, change.x, change.y))
+            self.telemetry.log(kind, self.level, change.x, change.y)
+
+    def frame(self):
+        tile = self.game.player.get_tile_position()
+        if tile != self.tile:
+            self.tile = tile
+            self.frames_on_tile = 0
+            self.stalled = False
+            return
+        self.frames_on_tile += 1
+        if not self.stalled and self.frames_on_tile >= STALL_FRAMES:
+            self.stalled = True
+            self.telemetry.log("stall", self.level, *tile)
+
+    def finish(self):
+        """Record how the game ended, once, and stop listening to the map"""
+        if self.finished:
+            return
+        self.finished = True
+        self.game.tilemap.unsubscribe(self._on_change)
+        game = self.game
+        x, y = game.player.get_tile_position()
+        if game.check_win_condition():
+            played = round(game.timer_seconds - game.time_remaining, 2)
+            self.telemetry.log("complete", self.level, x, y, played)
+        else:
+            reason = game.game_over_reason()
+            if reason is not None:
+                self.telemetry.log("death", self.level, x, y, reason)
+
+def read_events(filename=TELEMETRY_FILE):
+    """Yield the logged events, skipping a line cut short by a crash"""
+    with open(filename) as f:
+        for line in f:
+            try:
+                yield json.loads(line)
+            except ValueError:
+                continue
+
+def aggregate(events):
+    """Return {level: {kind: {(x, y): count}}} and {level: [completion seconds]}"""
+    heatmaps = {}
+    completions = {}
+    for event in events:
+        counts = heatmaps.setdefault(event['level'], {}).setdefault(event['kind'], Counter())
+        counts[(event['x'], event['y'])] += 1
+        if event['kind'] == "complete":
+            completions.setdefault(event['level'], []).append(event['value'])
+    return heatmaps, completions
+
+def save_heatmaps(heatmaps, completions, filename=HEATMAP_FILE):
+    data = {}
+    for level, kinds in heatmaps.items():
+        times = sorted(completions.get(level, []))
+        data[level] = {
+            'heatmaps': {kind: [[x, y, count] for (x, y), count in counts.most_common()]
+                         for kind, counts in kinds.items()},
+            'completions': len(times),
+            'median_completion_seconds': times[len(times) // 2] if times else None,
+        }
+    with open(filename, 'w') as f:
+        json.dump(data, f, indent=1)
+
+def load_heatmaps(filename=HEATMAP_FILE):
+    """Return {level: {kind: {(x, y): count}}} from a heatmap file, or {} if there is none"""
+    try:
+        with open(filename) as f:
+            data = json.load(f)
+    except (OSError, ValueError):
+        return {}
+    return {level: {kind: {(x, y): count for x, y, count in cells} for kind, cells in entry['heatmaps'].items()}
+            for level, entry in data.items()}
+
+def main():
+    parser = argparse.ArgumentParser(description='Aggregate Climb Up gameplay telemetry')
+    commands = parser.add_subparsers(dest='command', required=True)
+    build = commands.add_parser('aggregate', help='Build per-level heatmaps from the event log')
+    build.add_argument('events', nargs='?', default=TELEMETRY_FILE)
+    build.add_argument('output', nargs='?', default=HEATMAP_FILE)
+    args = parser.parse_args()
+
+    heatmaps, completions = aggregate(read_events(args.events))
+    save_heatmaps(heatmaps, completions, args.output)
+    for level in sorted(heatmaps):
+        counts = {kind: sum(cells.values()) for kind, cells in heatmaps[level].items()}
+        print(f"{level}: {counts}")
+    print(f"Wrote heatmaps for {len(heatmaps)} levels to {args.output}")
+
+if __name__ == "__main__":
+    main()
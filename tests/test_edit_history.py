@@ -0,0 +1,75 @@
+import random
+from constants import *
+from edit_history import EditHistory
+from tile_grid import TileGrid
+
+_TILE_CHOICES = (AIR, EARTH, STONE, LADDER, DIAMOND)
+
+def random_edit(grid, rng):
+    """One editor action: a few set() and write() calls in a batch"""
+    with grid.batch():
+        for _ in range(rng.randint(1, 5)):
+            x, y = rng.randrange(GRID_WIDTH), rng.randrange(GRID_HEIGHT)
+            if rng.random() < 0.5:
+                grid.set(x, y, rng.choice(_TILE_CHOICES))
+            else:
+                grid.write(x, y, rng.choice(_TILE_CHOICES).encode() * rng.randint(1, 8))
+
+def test_undo_and_redo_round_trip():
+    rng = random.Random(1)
+    grid = TileGrid(bytes(ord(rng.choice(_TILE_CHOICES)) for _ in range(GRID_WIDTH * GRID_HEIGHT)))
+    history = EditHistory(grid)
+    states = [grid.snapshot()]
+    for _ in range(50):
+        history.begin((None, ()))
+        random_edit(grid, rng)
+        history.end((None, ()))
+        if grid.snapshot() != states[-1]:
+            states.append(grid.snapshot())
+    assert len(history.undo_stack) == len(states) - 1
+    for state in reversed(states[:-1]):
+        assert history.undo() is not None
+        assert grid.snapshot() == state
+    assert history.undo() is None
+    for state in states[1:]:
+        assert history.redo() is not None
+        assert grid.snapshot() == state
+    assert history.redo() is None
+
+def test_undo_restores_a_tile_changed_twice_in_one_action():
+    grid = TileGrid(ord(AIR).to_bytes(1, 'little') * (GRID_WIDTH * GRID_HEIGHT))
+    history = EditHistory(grid)
+    history.begin((None, ()))
+    grid.set(2, 2, EARTH)
+    grid.set(2, 2, LADDER)
+    history.end((None, ()))
+    history.undo()
+    assert grid.get(2, 2) == AIR
+    history.redo()
+    assert grid.get(2, 2) == LADDER
+
+def test_entities_and_new_edits():
+    grid = TileGrid(ord(AIR).to_bytes(1, 'little') * (GRID_WIDTH * GRID_HEIGHT))
+    history = EditHistory(grid)
+    history.begin(((1, 1), ((5, 5), (6, 6))))
+    history.end(((2, 1), ((6, 6), (7, 7))))
+    edit = history.undo()
+    assert (edit.player_before, edit.player_after) == ((1, 1), (2, 1))
+    assert (edit.opponents_removed, edit.opponents_added) == (((5, 5),), ((7, 7),))
+    # A change made outside an action is recorded on its own and drops the redo stack
+    grid.set(0, 0, EARTH)
+    assert history.redo() is None
+    assert history.undo() is not None and grid.get(0, 0) == AIR
+
+def test_history_is_bounded():
+    grid = TileGrid(ord(AIR).to_bytes(1, 'little') * (GRID_WIDTH * GRID_HEIGHT))
+    history = EditHistory(grid, steps=3)
+    for x in range(5):
+        grid.set(x, 0, EARTH)
+    assert len(history.undo_stack) == 3
+    while history.undo():
+        pass
+    assert [grid.get(x, 0) for x in range(5)] == [EARTH, EARTH, AIR, AIR, AIR]
+    history.close()
+    grid.set(9, 9, EARTH)
+    assert history.undo() is None
@@ -0,0 +1,62 @@
+import glob
+import os
+from level_pack import LevelPack, build_pack, level_id_from_path
+from level_parser import load_level
+
+LEVELS_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "levels")
+
+def level_fields(snapshot):
+    """What a level plays like, without its name and parse errors"""
+    return (snapshot.tiles, snapshot.player_spawn, snapshot.opponent_spawns, snapshot.diamond_count,
+            snapshot.timer_seconds, snapshot.diamond_positions)
+
+def source_levels():
+    return {level_id_from_path(filename): load_level(filename)
+            for filename in glob.glob(os.path.join(LEVELS_DIR, "level*.lvl"))}
+
+def test_pack_holds_the_levels_it_was_built_from(tmp_path):
+    levels = source_levels()
+    pack_filename = str(tmp_path / "levels.pack")
+    assert build_pack(LEVELS_DIR, pack_filename) == len(levels)
+    pack = LevelPack(pack_filename)
+    try:
+        assert pack.level_ids() == sorted(levels)
+        for level_id, snapshot in levels.items():
+            assert pack.exists(level_id)
+            assert level_fields(pack.load(level_id)) == level_fields(snapshot)
+        assert not pack.exists(max(levels) + 1)
+        assert pack.name(1) == "levels.pack:level001.lvl"
+    finally:
+        pack.close()
+
+def test_extracted_levels_load_like_the_originals(tmp_path):
+    pack_filename = str(tmp_path / "levels.pack")
+    build_pack(LEVELS_DIR, pack_filename)
+    pack = LevelPack(pack_filename)
+    try:
+        pack.extract(str(tmp_path / "extracted"))
+    finally:
+        pack.close()
+    for level_id, snapshot in source_levels().items():
+        extracted = load_level(str(tmp_path / "extracted" / f"level{level_id:03d}.lvl"))
+        assert level_fields(extracted) == level_fields(snapshot)
+
+def test_versions_follow_the_level_contents(tmp_path):
+    first = str(tmp_path / "first.pack")
+    build_pack(LEVELS_DIR, first)
+    edited_dir = tmp_path / "edited"
+    edited_dir.mkdir()
+    for filename in glob.glob(os.path.join(LEVELS_DIR, "level*.lvl")):
+        with open(filename, 'rb') as f:
+            (edited_dir / os.path.basename(filename)).write_bytes(f.read())
+    source = edited_dir / "level001.lvl"
+    source.write_bytes(source.read_bytes().replace(b' ', b'#', 1))
+    second = str(tmp_path / "second.pack")
+    build_pack(str(edited_dir), second)
+    packs = LevelPack(first), LevelPack(second)
+    try:
+        assert packs[0].version(1) != packs[1].version(1)
+        assert packs[0].version(2) == packs[1].version(2)
+    finally:
+        for pack in packs:
+            pack.close()
@@ -0,0 +1,55 @@
+import os
+import struct
+import zlib
+import pytest
+
+pytest.importorskip("pygame")
+
+from constants import *
+from game_state import Game
+from level_parser import load_level
+from quicksave import deserialize_game, read_state, serialize_game
+
+LEVEL_FILE = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "levels", "level001.lvl")
+
+def played_game():
+    """A game of level001 that is not at its start any more"""
+    game = Game(load_level(LEVEL_FILE))
+    game.tilemap.set(0, 0, AIR)
+    game.player.rect.x += 3
+    game.player.vx = 2
+    game.diamonds_collected = 2
+    game.diamonds_remaining -= 2
+    game.time_remaining = game.timer_seconds - 17.5
+    return game
+
+def character_state(character):
+    return (character.rect.x, character.rect.y, character.vx, character.vy, character.facing,
+            character.state, character.anim_frame)
+
+def test_round_trip():
+    game = played_game()
+    level_index, restored = deserialize_game(serialize_game(game, level_index=7))
+    assert level_index == 7
+    assert restored.tilemap.tiles == game.tilemap.tiles
+    assert character_state(restored.player) == character_state(game.player)
+    assert [character_state(opponent) for opponent in restored.opponents] == \
+        [character_state(opponent) for opponent in game.opponents]
+    assert (restored.diamonds_remaining, restored.diamonds_collected, restored.total_diamonds) == \
+        (game.diamonds_remaining, game.diamonds_collected, game.total_diamonds)
+    assert restored.timer_seconds == game.timer_seconds
+    assert restored.time_remaining == pytest.approx(game.time_remaining, abs=0.01)
+
+@pytest.mark.parametrize("cut", [4, 20, -1, -100])
+def test_truncated_saves_are_rejected(cut):
+    blob = serialize_game(played_game())
+    with pytest.raises((ValueError, struct.error, zlib.error)):
+        deserialize_game(blob[:cut])
+
+def test_unreadable_save_reads_as_none(tmp_path):
+    filename = tmp_path / "quicksave.bin"
+    filename.write_bytes(serialize_game(played_game())[:-10])
+    assert read_state(str(filename)) is None
+    assert read_state(str(tmp_path / "missing.bin")) is None
+    filename.write_bytes(serialize_game(played_game(), level_index=3))
+    assert read_state(str(filename))[0] == 3
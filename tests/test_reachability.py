@@ -0,0 +1,89 @@
+import os
+import random
+from collections import deque
+import pytest
+from constants import *
+from level_parser import load_level
+from reachability import is_node, neighbors, reachable_from, distances_to
+from tile_grid import TileGrid
+
+_TILE_CHOICES = (AIR, AIR, AIR, EARTH, STONE, LADDER, LADDER, DIAMOND)
+
+def random_grid(rng):
+    return TileGrid(bytes(ord(rng.choice(_TILE_CHOICES)) for _ in range(GRID_WIDTH * GRID_HEIGHT)))
+
+def search_neighbors(grid, start, dig):
+    """Breadth-first search over neighbors(), the graph reachable_from must match"""
+    if not is_node(grid, *start):
+        return {}
+    steps = {start: 0}
+    queue = deque([start])
+    while queue:
+        tile = queue.popleft()
+        for x, y, _ in neighbors(grid, *tile, dig=dig):
+            if (x, y) not in steps:
+                steps[(x, y)] = steps[tile] + 1
+                queue.append((x, y))
+    return steps
+
+def reverse_search_neighbors(grid, targets, dig):
+    """Moves from every tile to the nearest target, searching backwards along neighbors()"""
+    predecessors = {}
+    for y in range(grid.height - 1):
+        for x in range(grid.width):
+            # With dig, an EARTH tile is also a place a character can be (once dug out)
+            if is_node(grid, x, y) or (dig and grid.get(x, y) == EARTH):
+                for nx, ny, _ in neighbors(grid, x, y, dig=dig):
+                    predecessors.setdefault((nx, ny), []).append((x, y))
+    distances = {target: 0 for target in targets if is_node(grid, *target)}
+    queue = deque(distances)
+    while queue:
+        tile = queue.popleft()
+        for previous in predecessors.get(tile, ()):
+            if previous not in distances:
+                distances[previous] = distances[tile] + 1
+                queue.append(previous)
+    return distances
+
+@pytest.mark.parametrize("dig", [False, True])
+def test_reachable_from_matches_neighbors_on_random_maps(dig):
+    rng = random.Random(1)
+    for _ in range(50):
+        grid = random_grid(rng)
+        start = (rng.randrange(GRID_WIDTH), rng.randrange(GRID_HEIGHT - 1))
+        assert reachable_from(grid, start, dig=dig) == search_neighbors(grid, start, dig)
+
+@pytest.mark.parametrize("dig", [False, True])
+def test_distances_to_matches_neighbors(dig):
+    rng = random.Random(2)
+    for _ in range(20):
+        grid = random_grid(rng)
+        targets = [(rng.randrange(GRID_WIDTH), rng.randrange(GRID_HEIGHT - 1)) for _ in range(3)]
+        assert distances_to(grid, targets, dig=dig) == reverse_search_neighbors(grid, targets, dig)
+
+def test_player_reaches_the_diamonds_of_level_one():
+    level = load_level(os.path.join(os.path.dirname(__file__), "..", "levels", "level001.lvl"))
+    reachable = reachable_from(TileGrid(level.tiles), level.player_spawn)
+    assert all(diamond in reachable for diamond in level.diamond_positions)
+
+def test_bottom_row_and_walls_are_not_nodes():
+    grid = TileGrid(bytes(ord(STONE) for _ in range(GRID_WIDTH * GRID_HEIGHT)))
+    assert neighbors(grid, 0, 0) == []
+    assert reachable_from(grid, (0, 0)) == {}
+    assert not is_node(grid, 0, GRID_HEIGHT - 1)
+
+def test_moves_follow_the_movement_rules():
+    rows = [[AIR] * GRID_WIDTH for _ in range(GRID_HEIGHT)]
+    rows[5][3] = LADDER
+    rows[4][3] = LADDER
+    for x in range(GRID_WIDTH):
+        rows[6][x] = EARTH
+    grid = TileGrid(''.join(''.join(row) for row in rows).encode('ascii'))
+    # Standing on earth: walk either way, nothing else
+    assert sorted(neighbors(grid, 1, 5)) == [(0, 5, "left"), (2, 5, "right")]
+    # With dig, the earth below either neighbour can be dug into
+    assert (2, 6, "dig_right") in neighbors(grid, 1, 5, dig=True)
+    # On a ladder: climb up as well
+    assert (3, 4, "up") in neighbors(grid, 3, 5)
+    # Without support: only fall
+    assert neighbors(grid, 1, 2) == [(1, 3, "fall")]
@@ -0,0 +1,72 @@
+import random
+from constants import *
+from ladder_index import LadderIndex
+from tile_grid import JOURNAL_SIZE, TileChange, TileGrid
+
+def empty_grid():
+    return TileGrid(ord(AIR).to_bytes(1, 'little') * (GRID_WIDTH * GRID_HEIGHT))
+
+def test_batch_notifies_once_at_the_end():
+    grid = empty_grid()
+    changes, batches = [], []
+    grid.subscribe(changes.append)
+    grid.subscribe_batches(batches.append)
+    with grid.batch():
+        grid.set(1, 2, EARTH)
+        with grid.batch():
+            grid.write(3, 4, (LADDER * 3).encode())
+        grid.set(1, 2, EARTH)  # unchanged, not reported
+        assert grid.get(1, 2) == EARTH and grid.version == 4
+        assert changes == [] and batches == []
+    expected = [TileChange(1, 2, AIR, EARTH)] + [TileChange(x, 4, AIR, LADDER) for x in (3, 4, 5)]
+    assert changes == expected
+    assert batches == [expected]
+
+def test_set_outside_a_batch_is_an_edit_of_its_own():
+    grid = empty_grid()
+    batches = []
+    grid.subscribe_batches(batches.append)
+    grid.set(0, 0, STONE)
+    grid.set(0, 0, AIR)
+    assert batches == [[TileChange(0, 0, AIR, STONE)], [TileChange(0, 0, STONE, AIR)]]
+
+def test_write_is_clipped_to_the_grid():
+    grid = empty_grid()
+    grid.write(-2, 0, (EARTH * 4).encode())
+    grid.write(GRID_WIDTH - 1, 1, (EARTH * 4).encode())
+    grid.write(0, GRID_HEIGHT, (EARTH * 4).encode())
+    assert [x for x in range(GRID_WIDTH) if grid.get(x, 0) == EARTH] == [0, 1]
+    assert [x for x in range(GRID_WIDTH) if grid.get(x, 1) == EARTH] == [GRID_WIDTH - 1]
+    assert grid.version == 3
+
+def test_changes_since():
+    grid = empty_grid()
+    grid.set(5, 5, EARTH)
+    version = grid.version
+    with grid.batch():
+        grid.set(6, 5, EARTH)
+        grid.set(5, 5, AIR)
+    assert grid.changes_since(version) == [TileChange(6, 5, AIR, EARTH), TileChange(5, 5, EARTH, AIR)]
+    assert grid.changes_since(grid.version) == []
+    assert grid.changes_since(0)[0] == TileChange(5, 5, AIR, EARTH)
+
+def test_changes_since_reports_when_the_journal_is_too_short():
+    grid = empty_grid()
+    for i in range(JOURNAL_SIZE + 1):
+        grid.set(0, 0, EARTH if i % 2 == 0 else AIR)
+    assert grid.changes_since(0) is None
+    assert len(grid.changes_since(1)) == JOURNAL_SIZE
+
+def test_copies_share_the_ladder_index_until_one_changes():
+    rng = random.Random(3)
+    grid = TileGrid(bytes(ord(rng.choice((AIR, AIR, EARTH, STONE, LADDER))) for _ in range(GRID_WIDTH * GRID_HEIGHT)))
+    index = grid.ladder_index()
+    copy = grid.copy()
+    assert copy.ladder_index() is index
+    copy.set(3, 3, LADDER)
+    grid.set(4, 4, LADDER)
+    for tiles in (grid, copy):
+        fresh = LadderIndex(TileGrid(tiles.tiles))
+        kept = tiles.ladder_index()
+        assert (kept.rows, kept.columns, kept.walls) == (fresh.rows, fresh.columns, fresh.walls)
+    assert grid.ladder_index() is not copy.ladder_index()
@@ -0,0 +1,186 @@
+# tile_grid.py
+from collections import deque, namedtuple
+from contextlib import contextmanager
+from itertools import islice
+from constants import *
+from ladder_index import LadderIndex
+
+# Tiles are stored one byte per cell (the tile character's code), so a whole
+# map can be copied or snapshotted as a single buffer
+_CODE_TO_TILE = tuple(chr(code) for code in range(256))
+
+# Number of tile changes kept in a TileGrid's journal
+JOURNAL_SIZE = 4096
+
+# One entry of the change journal, old and new as tile characters
+TileChange = namedtuple('TileChange', ['x', 'y', 'old', 'new'])
+
+class TileGrid:
+    """The tiles of a level and the queries the game rules need, without pygame
+
+    TileMap adds loading, drawing and saving on top. Simulations and worker
+    processes use TileGrid directly.
+    """
+
+    def __init__(self, tiles):
+        self.tiles = bytearray(tiles)
+        self.height = GRID_HEIGHT
+        self.width = GRID_WIDTH
+        # Incremented by every set() that changes a tile, so consumers can tell
+        # whether anything they derived from the map is still valid
+        self.version = 0
+        # The last JOURNAL_SIZE changes, the newest (made at `version`) last
+        self.journal = deque(maxlen=JOURNAL_SIZE)
+        # Callables invoked with the TileChange whenever set() changes a tile
+        self.subscribers = []
+        # Callables invoked once per edit with the list of its TileChanges (see batch())
+        self.batch_subscribers = []
+        self._batch_depth = 0
+        self._batch_changes = []
+        self._ladder_index = None
+        # True while the ladder index is shared with copies of this grid: it is
+        # then frozen, and whichever grid changes first gets a private copy
+        self._ladder_index_shared = False
+
+    def get(self, x, y):
+        if 0 <= x < GRID_WIDTH and 0 <= y < GRID_HEIGHT:
+            return _CODE_TO_TILE[self.tiles[y * GRID_WIDTH + x]]
+        return STONE
+
+    def get_tile_by_pixel_coords(self, px, py):
+        return self.get(int(px // TILE_SIZE), int(py // TILE_SIZE))
+
+    def get_pixel_coords_of_tile(self, tx, ty):
+        return (tx * TILE_SIZE, ty * TILE_SIZE)
+
+    def is_ground(self, tile):
+        return tile in [EARTH, STONE]
+
+    def is_standable(self, tile):
+        return tile in [EARTH, STONE, LADDER]
+
+    def set(self, x, y, value):
+        if 0 <= x < GRID_WIDTH and 0 <= y < GRID_HEIGHT:
+            index = y * GRID_WIDTH + x
+            old = self.tiles[index]
+            if old != ord(value):
+                self._unshare_ladder_index()
+                self.tiles[index] = ord(value)
+                self.version += 1
+                change = TileChange(x, y, _CODE_TO_TILE[old], value)
+                self.journal.append(change)
+                if self._batch_depth:
+                    self._batch_changes.append(change)
+                else:
+                    self._notify([change])
+
+    def write(self, x, y, codes):
+        """Write a horizontal run of tile codes (bytes) starting at (x, y), clipped to the grid
+
+        The same as set() for every tile of the run, but the run is compared
+        and copied as a whole, which makes bulk edits cheap.
+        """
+        if not 0 <= y < GRID_HEIGHT:
+            return
+        if x < 0:
+            codes, x = codes[-x:], 0
+        codes = codes[:max(GRID_WIDTH - x, 0)]
+        start = y * GRID_WIDTH + x
+        old = self.tiles[start:start + len(codes)]
+        if old == codes:
+            return
+        changes = [TileChange(x + offset, y, _CODE_TO_TILE[before], _CODE_TO_TILE[after])
+                   for offset, (before, after) in enumerate(zip(old, codes)) if before != after]
+        self._unshare_ladder_index()
+        self.tiles[start:start + len(codes)] = codes
+        self.version += len(changes)
+        self.journal.extend(changes)
+        if self._batch_depth:
+            self._batch_changes.extend(changes)
+        else:
+            self._notify(changes)
+
+    def _notify(self, changes):
+        for change in changes:
+            for subscriber in self.subscribers:
+                subscriber(change)
+        for subscriber in self.batch_subscribers:
+            subscriber(changes)
+
+    @contextmanager
+    def batch(self):
+        """Make the set() calls inside a `with tilemap.batch():` block one edit
+
+        The tiles, version and journal change right away, but subscribers
+        hear about the changes when the outermost batch ends, and batch
+        subscribers get all of them in one call.
+        """
+        self._batch_depth += 1
+        try:
+            yield self
+        finally:
+            self._batch_depth -= 1
+            if self._batch_depth == 0 and self._batch_changes:
+                changes, self._batch_changes = self._batch_changes, []
+                self._notify(changes)
+
+    def subscribe(self, subscriber):
+        """Call subscriber(change) for every future tile change"""
+        self.subscribers.append(subscriber)
+
+    def unsubscribe(self, subscriber):
+        self.subscribers.remove(subscriber)
+
+    def subscribe_batches(self, subscriber):
+        """Call subscriber(changes) once per edit: a batch, or a single set() outside one"""
+        self.batch_subscribers.append(subscriber)
+
+    def unsubscribe_batches(self, subscriber):
+        self.batch_subscribers.remove(subscriber)
+
+    def changes_since(self, version):
+        """Return the TileChanges made after `version`, oldest first
+
+        Returns None if the journal no longer reaches back that far, in which
+        case the caller has to rebuild whatever it derived from the map.
+        """
+        count = self.version - version
+        if count > len(self.journal):
+            return None
+        if count <= 0:
+            return []
+        return list(islice(reversed(self.journal), count))[::-1]
+
+    def ladder_index(self):
+        """Return the map's LadderIndex, built on first use and kept current afterwards"""
+        if self._ladder_index is None:
+            self._ladder_index = LadderIndex(self)
+        return self._ladder_index
+
+    def _unshare_ladder_index(self):
+        """Called before a tile changes: replace a shared (frozen) index by a private one"""
+        if self._ladder_index_shared:
+            self._ladder_index = self._ladder_index.copy(self)
+            self._ladder_index_shared = False
+
+    def snapshot(self):
+        """Return an immutable copy of the tile buffer"""
+        return bytes(self.tiles)
+
+    def copy(self):
+        """Return a TileGrid with a copy of the tiles, e.g. for a simulation
+
+        The copy shares this grid's ladder index, which stays frozen while it
+        is shared: the first of the grids to change a tile (e.g. by digging)
+        gets a private copy of the index first. Rollouts that never dig
+        therefore never copy or rebuild it.
+        """
+        grid = TileGrid(self.tiles)
+        grid.version = self.version
+        if self._ladder_index is not None:
+            if not self._ladder_index_shared:
+                self.unsubscribe(self._ladder_index._on_change)
+                self._ladder_index_shared = True
+            grid._ladder_index = self._ladder_index
+            grid._ladder_index_shared = True
+        return grid
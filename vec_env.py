@@ -0,0 +1,273 @@
+# vec_env.py
+"""Batch environments for bots: many games stepped in lockstep, headless
+
+    env = VecEnv(["levels/level001.lvl"], num_envs=64)
+    observations = env.reset()
+    observations, rewards, dones, infos = env.step([ACTION_RIGHT] * 64)
+
+Each environment is a SimGame with greedy opponents, so nothing here needs
+pygame or a display. An action is an index into ACTIONS. Finished games are
+reset automatically; their info dict tells how the episode ended (`reason`
+is "won", "caught", "timeout" or "fell"). In VecEnv the observation tiles
+are read-only views of the live games, valid until the next step or reset.
+
+SubprocVecEnv has the same interface and spreads the environments over
+processes, which write their results into one shared memory block. Only a
+one-byte command and the infos of finished episodes go through the pipes.
+Its observations hold copies of the tiles, so the block can be freed on close.
+"""
+import multiprocessing
+import os
+from collections import namedtuple
+from multiprocessing import shared_memory
+from constants import *
+from level_parser import LevelSnapshot, load_level
+from sim import (SimCharacter, SimGame, sim_keys,
+                 SIM_KEY_LEFT, SIM_KEY_RIGHT, SIM_KEY_UP, SIM_KEY_DOWN, SIM_KEY_SPACE)
+from tile_grid import TileGrid
+
+# Actions are indices into ACTIONS
+(ACTION_NONE, ACTION_LEFT, ACTION_RIGHT, ACTION_UP, ACTION_DOWN, ACTION_DIG,
+ ACTION_UP_LEFT, ACTION_UP_RIGHT, ACTION_DOWN_LEFT, ACTION_DOWN_RIGHT) = range(10)
+ACTION_KEYS = (
+    (), (SIM_KEY_LEFT,), (SIM_KEY_RIGHT,), (SIM_KEY_UP,), (SIM_KEY_DOWN,), (SIM_KEY_SPACE,),
+    (SIM_KEY_UP, SIM_KEY_LEFT), (SIM_KEY_UP, SIM_KEY_RIGHT), (SIM_KEY_DOWN, SIM_KEY_LEFT), (SIM_KEY_DOWN, SIM_KEY_RIGHT))
+ACTIONS = tuple(sim_keys(pressed) for pressed in ACTION_KEYS)
+
+# Game time per step; the game runs at 60 frames per second
+STEP_SECONDS = 1 / 60
+
+REWARD_DIAMOND = 1.0
+REWARD_WIN = 10.0
+REWARD_LOSS = -10.0
+
+# What a bot sees of one game. `tiles` is the tile buffer (one tile code per
+# byte, see TileGrid), player and opponents are pixel positions.
+Observation = namedtuple('Observation', ['tiles', 'player', 'opponents', 'diamonds_remaining', 'time_remaining'])
+
+def _load(level):
+    return level if isinstance(level, LevelSnapshot) else load_level(level)
+
+class _Env:
+    """One game of a VecEnv, restarted from its level snapshot"""
+
+    def __init__(self, snapshot):
+        if snapshot.player_spawn is None:
+            raise ValueError(f"level {snapshot.name} has no player")
+        self.snapshot = snapshot
+        # Built once with its ladder index, which every reset shares
+        self.grid = TileGrid(snapshot.tiles)
+        self.grid.ladder_index()
+        self.reset()
+
+    def reset(self):
+        snapshot = self.snapshot
+        x, y = snapshot.player_spawn
+        self.game = SimGame(self.grid.copy(), SimCharacter(x * TILE_SIZE, y * TILE_SIZE),
+                            [SimCharacter(x * TILE_SIZE, y * TILE_SIZE) for x, y in snapshot.opponent_spawns],
+                            snapshot.diamond_count, 0, snapshot.timer_seconds)
+        self.steps = 0
+
+    def step(self, action):
+        """Advance one frame. Returns (reward, info), where info is None while the game goes on"""
+        game = self.game
+        collected = game.diamonds_collected
+        game.step(ACTIONS[action])
+        game.time_remaining -= STEP_SECONDS
+        self.steps += 1
+        reward = REWARD_DIAMOND * (game.diamonds_collected - collected)
+        if game.check_win_condition():
+            reward += REWARD_WIN
+            reason = "won"
+        else:
+            reason = game.game_over_reason()
+            if reason is None:
+                return reward, None
+            reward += REWARD_LOSS
+        info = {'won': reason == "won", 'reason': reason, 'steps': self.steps, 'diamonds': game.diamonds_collected,
+                'position': game.player.get_tile_position(), 'level': self.snapshot.name}
+        self.reset()
+        return reward, info
+
+    def observation(self):
+        game = self.game
+        return Observation(memoryview(game.tilemap.tiles).toreadonly(),
+                           (game.player.rect.x, game.player.rect.y),
+                           tuple((opponent.rect.x, opponent.rect.y) for opponent in game.opponents),
+                           game.diamonds_remaining, game.time_remaining)
+
+class VecEnv:
+    """`num_envs` games in this process; game i plays levels[i % len(levels)]
+
+    Levels are file names or LevelSnapshots.
+    """
+
+    def __init__(self, levels, num_envs=None):
+        snapshots = [_load(level) for level in levels]
+        self.num_envs = num_envs or len(snapshots)
+        self.envs = [_Env(snapshots[index % len(snapshots)]) for index in range(self.num_envs)]
+
+    def reset(self):
+        for env in self.envs:
+            env.reset()
+        return self.observations()
+
+    def step(self, actions):
+        """Apply one action per game. Returns (observations, rewards, dones, infos)"""
+        rewards = []
+        dones = []
+        infos = []
+        for env, action in zip(self.envs, actions):
+            reward, info = env.step(action)
+            rewards.append(reward)
+            dones.append(info is not None)
+            infos.append(info or {})
+        return self.observations(), rewards, dones, infos
+
+    def observations(self):
+        return [env.observation() for env in self.envs]
+
+    def close(self):
+        pass
+
+# Layout of SubprocVecEnv's shared memory, one record per game in each section:
+# floats (reward, time remaining), ints (player x and y, diamonds remaining,
+# opponent count, then x and y per opponent), tiles, and the action byte.
+_FLOATS = 2
+_INTS = 4
+
+class _SharedLayout:
+    def __init__(self, num_envs, max_opponents):
+        self.num_envs = num_envs
+        self.int_stride = _INTS + 2 * max_opponents
+        self.tile_size = GRID_WIDTH * GRID_HEIGHT
+        self.int_offset = num_envs * _FLOATS * 8
+        self.tile_offset = self.int_offset + num_envs * self.int_stride * 4
+        self.action_offset = self.tile_offset + num_envs * self.tile_size
+        self.size = self.action_offset + num_envs
+
+    def views(self, buf):
+        """Return (floats, ints, tiles, actions) views of a shared buffer"""
+        return (buf[:self.int_offset].cast('d'), buf[self.int_offset:self.tile_offset].cast('i'),
+                buf[self.tile_offset:self.action_offset], buf[self.action_offset:self.size])
+
+def _write(env, index, layout, floats, ints, tiles, reward):
+    game = env.game
+    floats[index * _FLOATS] = reward
+    floats[index * _FLOATS + 1] = game.time_remaining
+    base = index * layout.int_stride
+    ints[base] = game.player.rect.x
+    ints[base + 1] = game.player.rect.y
+    ints[base + 2] = game.diamonds_remaining
+    ints[base + 3] = len(game.opponents)
+    for offset, opponent in enumerate(game.opponents):
+        ints[base + _INTS + 2 * offset] = opponent.rect.x
+        ints[base + _INTS + 2 * offset + 1] = opponent.rect.y
+    tiles[index * layout.tile_size:(index + 1) * layout.tile_size] = game.tilemap.tiles
+
+def _run_worker(conn, memory_name, layout, snapshots, first):
+    """Step the games first .. first + len(snapshots) - 1 on command from the SubprocVecEnv"""
+    memory = shared_memory.SharedMemory(name=memory_name)
+    floats, ints, tiles, actions = layout.views(memory.buf)
+    envs = [_Env(snapshot) for snapshot in snapshots]
+    indices = range(first, first + len(envs))
+    try:
+        while True:
+            command = conn.recv_bytes()
+            infos = []
+            if command == b'step':
+                for index, env in zip(indices, envs):
+                    reward, info = env.step(actions[index])
+                    if info is not None:
+                        infos.append((index, info))
+                    _write(env, index, layout, floats, ints, tiles, reward)
+            elif command == b'reset':
+                for index, env in zip(indices, envs):
+                    env.reset()
+                    _write(env, index, layout, floats, ints, tiles, 0.0)
+            else:
+                break
+            conn.send(infos)
+    finally:
+        del floats, ints, tiles, actions
+        memory.close()
+        conn.close()
+
+class SubprocVecEnv:
+    """A VecEnv whose games run in `processes` worker processes"""
+
+    def __init__(self, levels, num_envs=None, processes=None):
+        snapshots = [_load(level) for level in levels]
+        self.num_envs = num_envs or len(snapshots)
+        processes = min(self.num_envs, processes or os.cpu_count() or 1)
+        max_opponents = max(len(snapshot.opponent_spawns) for snapshot in snapshots)
+        self.layout = _SharedLayout(self.num_envs, max_opponents)
+        self.memory = shared_memory.SharedMemory(create=True, size=self.layout.size)
+        self.floats, self.ints, self.tiles, self.actions = self.layout.views(self.memory.buf)
+
+        # Spawned rather than forked, like the AI workers
+        context = multiprocessing.get_context("spawn")
+        self.connections = []
+        self.processes = []
+        for worker in range(processes):
+            first = worker * self.num_envs // processes
+            last = (worker + 1) * self.num_envs // processes
+            parent, child = context.Pipe()
+            process = context.Process(
+                target=_run_worker, daemon=True,
+                args=(child, self.memory.name, self.layout,
+                      [snapshots[index % len(snapshots)] for index in range(first, last)], first))
+            process.start()
+            child.close()
+            self.connections.append(parent)
+            self.processes.append(process)
+
+    def _command(self, command):
+        for conn in self.connections:
+            conn.send_bytes(command)
+        infos = [{} for _ in range(self.num_envs)]
+        for conn in self.connections:
+            for index, info in conn.recv():
+                infos[index] = info
+        return infos
+
+    def reset(self):
+        self._command(b'reset')
+        return self.observations()
+
+    def step(self, actions):
+        """Apply one action per game. Returns (observations, rewards, dones, infos)"""
+        self.actions[:] = bytes(actions)
+        infos = self._command(b'step')
+        rewards = self.floats[::_FLOATS].tolist()
+        dones = [bool(info) for info in infos]
+        return self.observations(), rewards, dones, infos
+
+    def observations(self):
+        layout = self.layout
+        tiles = self.tiles
+        observations = []
+        for index in range(self.num_envs):
+            base = index * layout.int_stride
+            player_x, player_y, diamonds, count = self.ints[base:base + _INTS]
+            coords = self.ints[base + _INTS:base + _INTS + 2 * count]
+            observations.append(Observation(
+                bytes(tiles[index * layout.tile_size:(index + 1) * layout.tile_size]),
+                (player_x, player_y), tuple(zip(coords[::2], coords[1::2])),
+                diamonds, self.floats[index * _FLOATS + 1]))
+        return observations
+
+    def close(self):
+        if self.memory is None:
+            return
+        for conn in self.connections:
+            try:
+                conn.send_bytes(b'close')
+            except (BrokenPipeError, OSError):
+                pass
+        for process in self.processes:
+            process.join()
+        del self.floats, self.ints, self.tiles, self.actions
+        self.memory.close()
+        self.memory.unlink()
+        self.memory = None